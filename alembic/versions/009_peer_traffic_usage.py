@@ -0,0 +1,40 @@
+"""Per-peer traffic accounting per billing period.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "peer_traffic_usage",
+        sa.Column("peer_id", sa.Integer(), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("rx_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("tx_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("last_rx_counter", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("last_tx_counter", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["peer_id"], ["peers_devices.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("peer_id", "period_start", name="pk_peer_traffic_usage"),
+    )
+    op.create_index("ix_peer_traffic_usage_period_start", "peer_traffic_usage", ["period_start"], unique=False)
+    # Counter ingest resolves peers by public key in bulk.
+    op.create_index("ix_peers_devices_public_key", "peers_devices", ["public_key"], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_peers_devices_public_key", table_name="peers_devices", if_exists=True)
+    op.drop_index("ix_peer_traffic_usage_period_start", table_name="peer_traffic_usage")
+    op.drop_table("peer_traffic_usage")
@@ -0,0 +1,27 @@
+"""Composite (sort column, id) indexes for keyset pagination of peers_devices.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_peers_devices_name_id", "peers_devices", ["name", "id"], unique=False, if_not_exists=True)
+    op.create_index("ix_peers_devices_created_at_id", "peers_devices", ["created_at", "id"], unique=False, if_not_exists=True)
+    op.create_index("ix_peers_devices_updated_at_id", "peers_devices", ["updated_at", "id"], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_peers_devices_updated_at_id", table_name="peers_devices", if_exists=True)
+    op.drop_index("ix_peers_devices_created_at_id", table_name="peers_devices", if_exists=True)
+    op.drop_index("ix_peers_devices_name_id", table_name="peers_devices", if_exists=True)
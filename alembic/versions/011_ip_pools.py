@@ -0,0 +1,33 @@
+"""ip_pools: persistent free-bitmap per peer CIDR.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are created lazily from peers_devices on first allocation (see IpPoolService).
+    op.create_table(
+        "ip_pools",
+        sa.Column("cidr", sa.String(length=43), nullable=False),
+        sa.Column("bitmap", sa.LargeBinary(), nullable=False),
+        sa.Column("next_hint", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("free_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("cidr"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ip_pools")
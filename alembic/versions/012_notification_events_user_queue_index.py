@@ -0,0 +1,35 @@
+"""Index of outstanding notification_events per user (per-user delivery order).
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_OUTSTANDING = sa.text("status IN ('pending', 'retry')")
+
+
+def upgrade() -> None:
+    # deliver_pending only takes the oldest outstanding event of each user (NOT EXISTS on user_id, id).
+    op.create_index(
+        "ix_notification_events_user_outstanding",
+        "notification_events",
+        ["user_id", "id"],
+        unique=False,
+        postgresql_where=_OUTSTANDING,
+        sqlite_where=_OUTSTANDING,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_events_user_outstanding", table_name="notification_events", if_exists=True)
@@ -0,0 +1,26 @@
+"""notification_events: claim lease (locked_until/locked_by) for multi-worker delivery.
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("notification_events", sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("notification_events", sa.Column("locked_by", sa.String(length=128), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("notification_events", "locked_by")
+    op.drop_column("notification_events", "locked_until")
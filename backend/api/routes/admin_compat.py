@@ -30,12 +30,14 @@ from backend.api.routes.v1.peers_monitoring import (
     peers_delete,
     peers_disable,
     peers_enable,
+    peers_export,
     peers_get,
     peers_import_by_ip,
     peers_list,
     peers_qr,
     peers_stats,
     peers_update,
+    server_profile_refresh,
 )
 from backend.db.session import get_session
 from backend.services.bot_service import build_bot_service
@@ -169,6 +171,19 @@ async def compat_peers_batch(
     return peers_batch_create(payload=payload, request=request, actor=user, session=session)
 
 
+@router.get("/peers/export")
+def compat_peers_export(request: Request, user=Depends(get_current_user), session=Depends(_db_session)):
+    return peers_export(
+        request=request,
+        status=request.query_params.get("status"),
+        group=request.query_params.get("group"),
+        ids=request.query_params.get("ids"),
+        include=request.query_params.get("include"),
+        actor=user,
+        session=session,
+    )
+
+
 @router.get("/peers/stats")
 def compat_peers_stats(user=Depends(get_current_user), session=Depends(_db_session)):
     return peers_stats(_=user, session=session)
@@ -206,13 +221,13 @@ def compat_peers_enable(peer_id: int, request: Request, user=Depends(get_current
 
 
 @router.get("/peers/{peer_id}/config")
-def compat_peers_config(peer_id: int, user=Depends(get_current_user), session=Depends(_db_session)):
-    return peers_config(peer_id=peer_id, _=user, session=session)
+def compat_peers_config(peer_id: int, request: Request, user=Depends(get_current_user), session=Depends(_db_session)):
+    return peers_config(peer_id=peer_id, request=request, _=user, session=session)
 
 
 @router.get("/peers/by-ip/{peer_ip}/config")
-def compat_peers_config_by_ip(peer_ip: str, user=Depends(get_current_user), session=Depends(_db_session)):
-    return peers_config_by_ip(peer_ip=peer_ip, _=user, session=session)
+def compat_peers_config_by_ip(peer_ip: str, request: Request, user=Depends(get_current_user), session=Depends(_db_session)):
+    return peers_config_by_ip(peer_ip=peer_ip, request=request, _=user, session=session)
 
 
 @router.post("/peers/by-ip/{peer_ip}/import")
@@ -221,8 +236,13 @@ def compat_peers_import(peer_ip: str, request: Request, user=Depends(get_current
 
 
 @router.get("/peers/{peer_id}/qr")
-def compat_peers_qr(peer_id: int, user=Depends(get_current_user), session=Depends(_db_session)):
-    return peers_qr(peer_id=peer_id, _=user, session=session)
+def compat_peers_qr(peer_id: int, request: Request, user=Depends(get_current_user), session=Depends(_db_session)):
+    return peers_qr(peer_id=peer_id, request=request, _=user, session=session)
+
+
+@router.post("/server-profile/refresh")
+def compat_server_profile_refresh(request: Request, user=Depends(get_current_user), session=Depends(_db_session)):
+    return server_profile_refresh(request=request, actor=user, session=session)
 
 
 @router.get("/monitoring/data")
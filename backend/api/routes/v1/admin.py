@@ -1049,7 +1049,7 @@ def broadcasts_create(
         action="admin_broadcast_created",
         user_id=actor.id,
         target=f"broadcast:{campaign.id}",
-        details={"segment": campaign.segment, "total_targets": campaign.total_targets},
+        details={"segment": campaign.segment},
         ip_address=request.client.host if request.client else None,
     )
     return _campaign_payload(campaign)
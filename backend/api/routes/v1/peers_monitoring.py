@@ -2,25 +2,43 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
 from datetime import date, datetime
 import io
 import json
+import logging
 import os
 from pathlib import Path
 import re
-import secrets
-import subprocess
+import signal
 import time
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, defer
 
 from backend.api.routes.v1.admin import _db_session, require_permission
+from backend.core.amnezia import amnezia_payload
+from backend.core.artifact_cache import ArtifactCache, artifact_key, etag_for, etag_matches, profile_hash
+from backend.core.config import get_settings
+from backend.core.config_catalog import ConfigCatalog
+from backend.core.ip_pool import address_prefix, parse_pool_cidrs
+from backend.core.monitor_push import SnapshotListener
+from backend.core.server_profile import ServerProfileCache
+from backend.core.wg_dump import PeerMetricsSnapshot
+from backend.core.wg_keys import generate_keypair
+from backend.core.zip_stream import render_ordered, stream_zip
+from backend.db.session import get_session
 from backend.models import PeerDevice, Setting, User
 from backend.services.audit_service import write_audit_event
+from backend.services.ip_pool_service import IpPoolService
+from backend.services.peer_monitor_service import DEFAULT_KNOWN_HOSTS, PeerMonitor, SSHTarget, resolve_key_path
+from backend.services.traffic_accounting_service import TrafficAccountingService
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["admin-peers"])
 
@@ -31,6 +49,31 @@ MONITOR_DATA_FALLBACK_PATH = CONFIGS_DIR / "data.json"
 ENV_PATH = PROJECT_ROOT / ".env"
 KEYS_ENV_PATH = CONFIGS_DIR / "keys.env"
 MONITOR_STALE_SEC = int(os.environ.get("ADMIN_MONITOR_STALE_SEC", "90"))
+PEER_METRICS_INTERVAL_SEC = float(os.environ.get("ADMIN_PEER_METRICS_INTERVAL_SEC", "5"))
+PEER_ONLINE_HANDSHAKE_SEC = max(15, int(os.environ.get("ADMIN_PEER_ONLINE_HANDSHAKE_SEC", "55")))
+# Collector push listener, started from the app lifespan (None = data.json only).
+_monitor_push: SnapshotListener | None = None
+# Background wg dump collector, started from the app lifespan (None = no live peer data).
+_peer_monitor: PeerMonitor | None = None
+# Index of *.conf peers in CONFIGS_DIR (shared implementation with admin-server).
+_config_catalog = ConfigCatalog(CONFIGS_DIR)
+# Rendered configs/QR codes, keyed by everything they are built from (see backend/core/artifact_cache.py).
+_artifacts = ArtifactCache(CONFIGS_DIR / ".artifact-cache" / "backend")
+# Artifacts carry private keys: clients must revalidate and shared caches must not store them.
+ARTIFACT_CACHE_CONTROL = "private, no-cache"
+_ip_pools = IpPoolService(parse_pool_cidrs(get_settings().PEER_IP_POOLS))
+NO_FREE_PEER_IP_ERROR = f"No available IPs in peer pools ({', '.join(_ip_pools.cidrs)})"
+
+PEERS_PAGE_MAX_LIMIT = 1000
+PEERS_STREAM_BATCH = 1000
+# Keyset sort keys; the cursor is (column, id) so non-unique columns page stably.
+PEER_SORT_COLUMNS = {
+    "id": PeerDevice.id,
+    "name": PeerDevice.name,
+    "ip": PeerDevice.ip,
+    "created_at": PeerDevice.created_at,
+    "updated_at": PeerDevice.updated_at,
+}
 
 MTU_BY_TYPE: dict[str, int] = {
     "phone": 1280,
@@ -129,6 +172,11 @@ def _extract_template_from_config(path: Path) -> dict[str, str]:
 
 
 def _load_config_defaults() -> dict[str, str]:
+    """Resolved server profile for config rendering (cached, see _server_profile)."""
+    return _server_profile.get()
+
+
+def _read_config_defaults() -> dict[str, str]:
     defaults: dict[str, str] = {}
     defaults.update(_read_kv_file(KEYS_ENV_PATH))
     defaults.update(_read_kv_file(ENV_PATH))
@@ -159,96 +207,12 @@ def _load_config_defaults() -> dict[str, str]:
     return defaults
 
 
-def _generate_keypair() -> tuple[str, str]:
-    for binary in ("awg", "wg"):
-        try:
-            priv_proc = subprocess.run(
-                [binary, "genkey"],
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            priv = priv_proc.stdout.strip()
-            if not priv:
-                continue
-            pub_proc = subprocess.run(
-                [binary, "pubkey"],
-                input=priv,
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            pub = pub_proc.stdout.strip()
-            if pub:
-                return priv, pub
-        except Exception:
-            continue
-
-    try:
-        from cryptography.hazmat.primitives import serialization
-        from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
-
-        key = X25519PrivateKey.generate()
-        priv_bytes = key.private_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PrivateFormat.Raw,
-            encryption_algorithm=serialization.NoEncryption(),
-        )
-        pub_bytes = key.public_key().public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw,
-        )
-        return base64.b64encode(priv_bytes).decode("ascii"), base64.b64encode(pub_bytes).decode("ascii")
-    except Exception:
-        # Fall through to pure-python RFC7748 implementation.
-        pass
-
-    # Pure Python X25519 fallback (no external dependencies).
-    p = 2**255 - 19
-    a24 = 121665
-
-    def _x25519(k: int, u: int) -> int:
-        x1 = u
-        x2, z2 = 1, 0
-        x3, z3 = u, 1
-        swap = 0
-        for t in range(254, -1, -1):
-            k_t = (k >> t) & 1
-            swap ^= k_t
-            if swap:
-                x2, x3 = x3, x2
-                z2, z3 = z3, z2
-            swap = k_t
-
-            a = (x2 + z2) % p
-            aa = (a * a) % p
-            b = (x2 - z2) % p
-            bb = (b * b) % p
-            e = (aa - bb) % p
-            c = (x3 + z3) % p
-            d = (x3 - z3) % p
-            da = (d * a) % p
-            cb = (c * b) % p
-            x3 = ((da + cb) ** 2) % p
-            z3 = (x1 * ((da - cb) ** 2)) % p
-            x2 = (aa * bb) % p
-            z2 = (e * (aa + a24 * e)) % p
-
-        if swap:
-            x2, x3 = x3, x2
-            z2, z3 = z3, z2
-        return (x2 * pow(z2, p - 2, p)) % p
-
-    priv = bytearray(secrets.token_bytes(32))
-    priv[0] &= 248
-    priv[31] &= 127
-    priv[31] |= 64
-    scalar = int.from_bytes(priv, "little")
-    pub_u = _x25519(scalar, 9)
-    pub = pub_u.to_bytes(32, "little")
-    return base64.b64encode(bytes(priv)).decode("ascii"), base64.b64encode(pub).decode("ascii")
+# Files are re-read only after the TTL, when one of them changes, or on explicit refresh.
+_server_profile = ServerProfileCache(
+    _read_config_defaults,
+    watch=(KEYS_ENV_PATH, ENV_PATH, CONFIGS_DIR / "client.conf", CONFIGS_DIR / "phone.conf"),
+)
+SERVER_PROFILE_PUBLIC_KEYS = ("Endpoint", "PublicKey", "AllowedIPs", "PersistentKeepalive", "DNS", "Jc", "Jmin", "Jmax", "S1", "S2", "H1", "H2", "H3", "H4")
 
 
 def _build_qr_base64(text: str) -> str:
@@ -269,7 +233,35 @@ def _build_qr_base64(text: str) -> str:
     return base64.b64encode(buffer.getvalue()).decode("ascii")
 
 
-def _peer_payload(peer: PeerDevice) -> dict[str, Any]:
+def _apply_runtime(payload: dict[str, Any], snapshot: PeerMetricsSnapshot | None, now: int) -> dict[str, Any]:
+    """Fill runtime fields from the collector snapshot (dict lookup, no SSH on the request path)."""
+    if snapshot is None or not snapshot.ts:
+        return payload
+    mon = snapshot.lookup(payload.get("public_key"), payload.get("ip"))
+    if mon is not None:
+        reason = "ok"
+    elif payload.get("status") in {"disabled", "revoked"}:
+        reason = "peer_disabled"
+    elif payload.get("status") == "from_config":
+        reason = "config_not_loaded_on_server"
+    else:
+        reason = "peer_missing_on_server"
+    latest_handshake = int(mon.get("latest_handshake") or 0) if mon else 0
+    handshake_age = max(0, now - latest_handshake) if latest_handshake > 0 else None
+    payload["config_runtime_active"] = mon is not None
+    payload["config_runtime_status"] = "active" if mon is not None else "inactive"
+    payload["config_runtime_reason"] = reason
+    payload["connection_status"] = (
+        "online" if handshake_age is not None and handshake_age < PEER_ONLINE_HANDSHAKE_SEC else "offline"
+    )
+    payload["handshake_age_sec"] = handshake_age
+    payload["rx_bytes"] = mon.get("rx_bytes") if mon else None
+    payload["tx_bytes"] = mon.get("tx_bytes") if mon else None
+    payload["connection_threshold_sec"] = PEER_ONLINE_HANDSHAKE_SEC
+    return payload
+
+
+def _peer_payload(peer: PeerDevice, include_private_key: bool = True) -> dict[str, Any]:
     downloaded_latest = False
     if peer.last_downloaded_config_version is not None:
         downloaded_latest = peer.last_downloaded_config_version >= (peer.config_version or 1)
@@ -281,7 +273,7 @@ def _peer_payload(peer: PeerDevice) -> dict[str, Any]:
         "type": peer.type,
         "mode": peer.mode,
         "public_key": peer.public_key,
-        "private_key": peer.private_key,
+        "private_key": peer.private_key if include_private_key else None,
         "preshared_key": None,
         "created_at": peer.created_at.isoformat() if peer.created_at else None,
         "updated_at": peer.updated_at.isoformat() if peer.updated_at else None,
@@ -304,62 +296,21 @@ def _peer_payload(peer: PeerDevice) -> dict[str, Any]:
         "handshake_age_sec": None,
         "rx_bytes": None,
         "tx_bytes": None,
-        "connection_threshold_sec": 55,
+        "connection_threshold_sec": PEER_ONLINE_HANDSHAKE_SEC,
     }
 
 
 def _scan_config_peers() -> list[dict[str, str]]:
-    peers: list[dict[str, str]] = []
-    if not CONFIGS_DIR.is_dir():
-        return peers
+    return _config_catalog.entries()
 
-    for config_path in CONFIGS_DIR.glob("*.conf"):
-        try:
-            text = config_path.read_text(encoding="utf-8", errors="replace")
-        except OSError:
-            continue
-        if _config_has_placeholders(text):
-            continue
 
-        ip = None
-        for line in text.splitlines():
-            stripped = line.strip()
-            if stripped.lower().startswith("address") and "=" in stripped:
-                rhs = stripped.split("=", 1)[1].strip()
-                value = rhs.split(",", 1)[0].strip()
-                if "/" in value:
-                    value = value.split("/", 1)[0].strip()
-                ip = value
-                break
-
-        if not ip:
-            continue
-
-        stem = config_path.stem
-        if stem.startswith("peer_"):
-            m = re.match(r"^peer_(.+)_10_9_0_\d+$", stem)
-            name = m.group(1).replace("_", "-") if m else stem[5:].replace("_", "-")
-        else:
-            name = stem.replace("_", "-")
-
-        peers.append(
-            {
-                "name": name,
-                "ip": ip,
-                "config_file": str(config_path),
-            }
-        )
-
-    return peers
+def _allocate_ips(session: Session, count: int) -> list[str]:
+    return _ip_pools.allocate(session, count)
 
 
 def _allocate_ip(session: Session) -> str | None:
-    used = {row[0] for row in session.execute(select(PeerDevice.ip)).all()}
-    for i in range(3, 255):
-        candidate = f"10.9.0.{i}"
-        if candidate not in used:
-            return candidate
-    return None
+    free = _allocate_ips(session, 1)
+    return free[0] if free else None
 
 
 def _get_dns_setting(session: Session) -> str:
@@ -367,7 +318,7 @@ def _get_dns_setting(session: Session) -> str:
     return str(dns or "10.8.0.2")
 
 
-def _build_config_content(peer: PeerDevice, defaults: dict[str, str], dns: str) -> str:
+def _server_endpoint_and_key(defaults: dict[str, str]) -> tuple[str, str]:
     endpoint = (defaults.get("Endpoint") or "").strip()
     public_key = (defaults.get("PublicKey") or "").strip()
     if not endpoint or not public_key:
@@ -380,6 +331,11 @@ def _build_config_content(peer: PeerDevice, defaults: dict[str, str], dns: str)
             status_code=500,
             detail="Server profile contains placeholder values (TODO_*).",
         )
+    return endpoint, public_key
+
+
+def _build_config_content(peer: PeerDevice, defaults: dict[str, str], dns: str) -> str:
+    endpoint, public_key = _server_endpoint_and_key(defaults)
     if not peer.private_key:
         raise HTTPException(status_code=500, detail="Peer private key is missing.")
 
@@ -389,7 +345,7 @@ def _build_config_content(peer: PeerDevice, defaults: dict[str, str], dns: str)
         f"# peer_id={peer.id}",
         f"# name={peer.name}",
         f"PrivateKey = {peer.private_key}",
-        f"Address = {peer.ip}/24",
+        f"Address = {peer.ip}/{address_prefix(_ip_pools.cidrs, peer.ip)}",
         f"DNS = {dns}",
         f"MTU = {mtu}",
     ]
@@ -419,21 +375,80 @@ def _build_config_content(peer: PeerDevice, defaults: dict[str, str], dns: str)
     return "\n".join(lines)
 
 
+def _artifact_owner(peer_id: int) -> str:
+    """Cache owner tag of a DB peer's artifacts, evicted when the peer is deleted."""
+    return f"peer-{int(peer_id)}"
+
+
+def _config_file_artifact(config_path: Path, owner: str | None = None) -> tuple[str, str]:
+    """(content, artifact key) of a .conf served as is; keyed by path + mtime + size."""
+    st = config_path.stat()
+    key = artifact_key("config-file", str(config_path), st.st_mtime_ns, st.st_size)
+    data = _artifacts.get_or_build(key, config_path.read_bytes, owner=owner)
+    return data.decode("utf-8", errors="replace"), key
+
+
+def _peer_config_artifact(
+    session: Session | None,
+    peer: PeerDevice,
+    defaults: dict[str, str] | None = None,
+    dns_value: str | None = None,
+) -> tuple[str, str]:
+    """(content, artifact key) of a DB peer config: its .conf file, or a cached live render.
+
+    Bulk callers pass ``defaults``/``dns_value`` loaded once (then ``session`` is unused).
+    """
+    config_path = Path(peer.config_file) if peer.config_file else None
+    owner = _artifact_owner(peer.id)
+    if config_path and config_path.exists():
+        _validate_path_traversal(config_path, CONFIGS_DIR)
+        content, key = _config_file_artifact(config_path, owner)
+        if content and not _config_has_placeholders(content):
+            return content, key
+
+    if defaults is None:
+        defaults = _load_config_defaults()
+    if dns_value is None:
+        dns_value = _get_dns_setting(session)
+    key = artifact_key(
+        "config",
+        peer.id,
+        peer.config_version or 1,
+        peer.name,
+        peer.ip,
+        peer.type,
+        peer.private_key or "",
+        profile_hash(defaults),
+        dns_value,
+    )
+
+    def build() -> bytes:
+        content = _build_config_content(peer, defaults=defaults, dns=dns_value)
+        if config_path:
+            config_path.parent.mkdir(parents=True, exist_ok=True)
+            config_path.write_text(content, encoding="utf-8")
+            _config_catalog.invalidate()
+        return content.encode("utf-8")
+
+    return _artifacts.get_or_build(key, build, owner=owner).decode("utf-8"), key
+
+
+def _artifact_response(request: Request, key: str, response: Response) -> Response:
+    """Attach ETag/Cache-Control, or answer 304 when If-None-Match already covers ``key``."""
+    headers = {"ETag": etag_for(key), "Cache-Control": ARTIFACT_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), key):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
+
+
 def _mark_downloaded(peer: PeerDevice) -> None:
     peer.config_download_count = int(peer.config_download_count or 0) + 1
     peer.last_downloaded_config_version = int(peer.config_version or 1)
     peer.last_config_downloaded_at = datetime.utcnow()
 
 
-@router.get("/peers")
-def peers_list(
-    status: str | None = None,
-    type: str | None = None,
-    group: str | None = None,
-    search: str | None = None,
-    _: User = Depends(require_permission("peers:read")),
-    session: Session = Depends(_db_session),
-) -> list[dict[str, Any]]:
+def _peers_filtered_stmt(status: str | None, type: str | None, group: str | None, search: str | None):
     stmt = select(PeerDevice)
     if status:
         stmt = stmt.where(PeerDevice.status == status)
@@ -444,6 +459,101 @@ def peers_list(
     if search:
         pattern = f"%{search.strip()}%"
         stmt = stmt.where((PeerDevice.name.ilike(pattern)) | (PeerDevice.ip.ilike(pattern)))
+    return stmt
+
+
+def _parse_peer_sort(sort: str | None) -> tuple[Any, bool]:
+    key = (sort or "id").strip()
+    descending = key.startswith("-")
+    column = PEER_SORT_COLUMNS.get(key.lstrip("-"))
+    if column is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort. Use one of: {', '.join(PEER_SORT_COLUMNS)} (prefix '-' for desc)")
+    return column, descending
+
+
+def _parse_peer_fields(fields: str | None) -> set[str] | None:
+    if not fields:
+        return None
+    wanted = {item.strip() for item in fields.split(",") if item.strip()}
+    wanted.add("id")
+    return wanted
+
+
+def _keyset_stmt(session: Session, stmt, column, descending: bool, after_id: int | None, anchor: tuple[Any] | None = None):
+    """Order by (column, id) and continue strictly after the `after_id` row.
+
+    `anchor` is the row's sort value when the caller already has it (streaming);
+    otherwise it is looked up by primary key.
+    """
+    if after_id is not None:
+        if column is PeerDevice.id:
+            stmt = stmt.where(PeerDevice.id < after_id if descending else PeerDevice.id > after_id)
+        else:
+            if anchor is None:
+                anchor = session.execute(select(column).where(PeerDevice.id == after_id)).first()
+            if anchor is None:
+                raise HTTPException(status_code=400, detail="after_id not found")
+            value = anchor[0]
+            if descending:
+                stmt = stmt.where(or_(column < value, and_(column == value, PeerDevice.id < after_id)))
+            else:
+                stmt = stmt.where(or_(column > value, and_(column == value, PeerDevice.id > after_id)))
+    if descending:
+        return stmt.order_by(column.desc(), PeerDevice.id.desc())
+    return stmt.order_by(column.asc(), PeerDevice.id.asc())
+
+
+def _project_peer(payload: dict[str, Any], fields: set[str] | None) -> dict[str, Any]:
+    if fields is None:
+        return payload
+    return {key: value for key, value in payload.items() if key in fields}
+
+
+@router.get("/peers", response_model=None)
+def peers_list(
+    status: str | None = None,
+    type: str | None = None,
+    group: str | None = None,
+    search: str | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    sort: str | None = None,
+    format: str | None = None,
+    _: User = Depends(require_permission("peers:read")),
+    session: Session = Depends(_db_session),
+) -> list[dict[str, Any]] | Response:
+    """Full list (legacy, incl. config-only peers) or keyset pages / NDJSON stream of DB peers.
+
+    Paging mode is enabled by any of after_id/limit/fields/sort/format. Pages carry
+    `X-Next-After-Id` while more rows remain; private keys are only returned when
+    listed in `fields`.
+    """
+    stmt = _peers_filtered_stmt(status, type, group, search)
+    if any(value is not None for value in (after_id, limit, fields, sort, format)):
+        column, descending = _parse_peer_sort(sort)
+        wanted = _parse_peer_fields(fields)
+        with_private = wanted is not None and "private_key" in wanted
+        if not with_private:
+            stmt = stmt.options(defer(PeerDevice.private_key, raiseload=True))
+        if (format or "json").lower() == "ndjson":
+            _keyset_stmt(session, stmt, column, descending, after_id)  # validate after_id before streaming
+            return StreamingResponse(
+                _stream_peers_ndjson(stmt, column, descending, after_id, wanted, with_private),
+                media_type="application/x-ndjson",
+            )
+        page_size = max(1, min(int(limit or 100), PEERS_PAGE_MAX_LIMIT))
+        page = session.scalars(_keyset_stmt(session, stmt, column, descending, after_id).limit(page_size + 1)).all()
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        snapshot = _peer_monitor.snapshot() if _peer_monitor is not None else None
+        now = int(time.time())
+        items = [
+            _project_peer(_apply_runtime(_peer_payload(peer, include_private_key=with_private), snapshot, now), wanted)
+            for peer in page
+        ]
+        headers = {"X-Next-After-Id": str(page[-1].id)} if has_more and page else {}
+        return JSONResponse(content=items, headers=headers)
 
     peers = session.scalars(stmt.order_by(PeerDevice.id.asc())).all()
     db_payload = [_peer_payload(peer) for peer in peers]
@@ -486,13 +596,45 @@ def peers_list(
                     "handshake_age_sec": None,
                     "rx_bytes": None,
                     "tx_bytes": None,
-                    "connection_threshold_sec": 55,
+                    "connection_threshold_sec": PEER_ONLINE_HANDSHAKE_SEC,
                 }
             )
 
+    snapshot = _peer_monitor.snapshot() if _peer_monitor is not None else None
+    now = int(time.time())
+    for item in db_payload:
+        _apply_runtime(item, snapshot, now)
     return db_payload
 
 
+def _stream_peers_ndjson(stmt, column, descending: bool, after_id: int | None, wanted: set[str] | None, with_private: bool):
+    """Export every matching peer as NDJSON, reading keyset batches in a session of its own."""
+    with get_session() as session:
+        cursor = after_id
+        anchor: tuple[Any] | None = None
+        while True:
+            page_stmt = _keyset_stmt(session, stmt, column, descending, cursor, anchor)
+            batch = session.scalars(page_stmt.limit(PEERS_STREAM_BATCH)).all()
+            if not batch:
+                break
+            snapshot = _peer_monitor.snapshot() if _peer_monitor is not None else None
+            now = int(time.time())
+            chunk = "".join(
+                json.dumps(
+                    _project_peer(_apply_runtime(_peer_payload(peer, include_private_key=with_private), snapshot, now), wanted),
+                    ensure_ascii=False,
+                )
+                + "\n"
+                for peer in batch
+            )
+            yield chunk.encode("utf-8")
+            if len(batch) < PEERS_STREAM_BATCH:
+                break
+            cursor = batch[-1].id
+            anchor = (getattr(batch[-1], column.key),)
+            session.expunge_all()
+
+
 @router.post("/peers")
 def peers_create(
     payload: dict[str, Any],
@@ -510,7 +652,7 @@ def peers_create(
 
     ip = _allocate_ip(session)
     if not ip:
-        raise HTTPException(status_code=507, detail="No available IPs in 10.9.0.3-254 range")
+        raise HTTPException(status_code=507, detail=NO_FREE_PEER_IP_ERROR)
 
     group_name = payload.get("group_name")
     if group_name is not None:
@@ -534,7 +676,7 @@ def peers_create(
             raise HTTPException(status_code=400, detail="traffic_limit_mb must be an integer") from exc
 
     config_path = CONFIGS_DIR / f"peer_{_safe_filename(name)}_{ip.replace('.', '_')}.conf"
-    peer_private_key, peer_public_key = _generate_keypair()
+    peer_private_key, peer_public_key = generate_keypair()
     defaults = _load_config_defaults()
     dns_value = _get_dns_setting(session)
 
@@ -579,7 +721,7 @@ def peers_batch_create(
     actor: User = Depends(require_permission("peers:write")),
     session: Session = Depends(_db_session),
 ) -> dict[str, Any]:
-    created: list[dict[str, Any]] = []
+    specs: list[tuple[str, str]] = []
     errors: list[dict[str, Any]] = []
 
     csv_data = str(payload.get("csv") or "").strip()
@@ -589,30 +731,78 @@ def peers_batch_create(
             cols = [c.strip() for c in line.split(",")]
             if not cols or cols[0].lower() == "name":
                 continue
-            name = cols[0]
-            try:
-                item = peers_create(
-                    payload={"name": name, "type": cols[1] if len(cols) > 1 else "phone"},
-                    request=request,
-                    actor=actor,
-                    session=session,
-                )
-                created.append(item)
-            except HTTPException as exc:
-                errors.append({"name": name, "error": str(exc.detail)})
+            specs.append((cols[0], cols[1] if len(cols) > 1 else "phone"))
     else:
         prefix = str(payload.get("prefix") or "peer").strip() or "peer"
         count = int(payload.get("count") or 0)
         ptype = str(payload.get("type") or "phone").strip() or "phone"
         if count <= 0:
             raise HTTPException(status_code=400, detail="count must be > 0")
-        for i in range(1, count + 1):
-            name = f"{prefix}-{i:03d}"
-            try:
-                item = peers_create(payload={"name": name, "type": ptype}, request=request, actor=actor, session=session)
-                created.append(item)
-            except HTTPException as exc:
-                errors.append({"name": name, "error": str(exc.detail)})
+        specs = [(f"{prefix}-{i:03d}", ptype) for i in range(1, count + 1)]
+
+    # One name lookup, one IP pool reservation, one profile load and one flush for the whole batch.
+    names = [name for name, _ in specs if name]
+    taken = set(session.scalars(select(PeerDevice.name).where(PeerDevice.name.in_(names)))) if names else set()
+    wanted: list[tuple[str, str]] = []
+    for name, ptype in specs:
+        if not name:
+            errors.append({"name": name, "error": "name is required"})
+        elif name in taken:
+            errors.append({"name": name, "error": f"Peer with name '{name}' already exists"})
+        else:
+            taken.add(name)
+            wanted.append((name, str(ptype or "phone").strip().lower() or "phone"))
+
+    ips = _allocate_ips(session, len(wanted))
+    for name, _ in wanted[len(ips):]:
+        errors.append({"name": name, "error": NO_FREE_PEER_IP_ERROR})
+    wanted = wanted[: len(ips)]
+
+    defaults = _load_config_defaults()
+    dns_value = _get_dns_setting(session)
+    try:
+        _server_endpoint_and_key(defaults)
+    except HTTPException as exc:
+        errors.extend({"name": name, "error": str(exc.detail)} for name, _ in wanted)
+        wanted = []
+
+    now = datetime.utcnow()
+    peers: list[PeerDevice] = []
+    for (name, ptype), ip in zip(wanted, ips):
+        peer_private_key, peer_public_key = generate_keypair()
+        peers.append(
+            PeerDevice(
+                name=name,
+                ip=ip,
+                type=ptype,
+                public_key=peer_public_key,
+                private_key=peer_private_key,
+                mode="full",
+                status="active",
+                config_file=str(CONFIGS_DIR / f"peer_{_safe_filename(name)}_{ip.replace('.', '_')}.conf"),
+                created_at=now,
+                updated_at=now,
+                config_version=1,
+                config_download_count=0,
+            )
+        )
+    session.add_all(peers)
+    session.flush()
+
+    client_host = request.client.host if request.client else None
+    created: list[dict[str, Any]] = []
+    CONFIGS_DIR.mkdir(parents=True, exist_ok=True)
+    for peer in peers:
+        Path(peer.config_file).write_text(_build_config_content(peer, defaults=defaults, dns=dns_value), encoding="utf-8")
+        write_audit_event(
+            session=session,
+            action="peer_created",
+            user_id=actor.id,
+            target=f"peer:{peer.id}",
+            details={"ip": peer.ip, "type": peer.type, "mode": "full"},
+            ip_address=client_host,
+        )
+        created.append(_peer_payload(peer))
 
     write_audit_event(
         session=session,
@@ -625,6 +815,122 @@ def peers_batch_create(
     return {"created": created, "errors": errors, "total": len(created), "failed": len(errors)}
 
 
+EXPORT_PARTS = ("conf", "qr", "amnezia")
+
+
+def _render_peer_export(
+    peer: PeerDevice,
+    export_name: str,
+    defaults: dict[str, str],
+    dns_value: str,
+    parts: tuple[str, ...],
+) -> list[tuple[str, bytes]]:
+    """Archive members of one peer (runs on the export pool, reads only loaded attributes)."""
+    content, config_key = _peer_config_artifact(None, peer, defaults, dns_value)
+    if _config_has_placeholders(content):
+        raise ValueError("config contains placeholder values (TODO_*)")
+    members: list[tuple[str, bytes]] = []
+    if "conf" in parts:
+        members.append((f"configs/{export_name}.conf", content.encode("utf-8")))
+    if "qr" in parts:
+        qr_b64 = _artifacts.get_or_build(
+            artifact_key("qr", config_key),
+            lambda: _build_qr_base64(content).encode("ascii"),
+            owner=_artifact_owner(peer.id),
+        )
+        members.append((f"qr/{export_name}.png", base64.b64decode(qr_b64)))
+    if "amnezia" in parts:
+        payload = amnezia_payload(content, peer.name or "VPN")
+        members.append((f"amnezia/{export_name}.json", json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")))
+    return members
+
+
+def _stream_peers_export(stmt, parts: tuple[str, ...], defaults: dict[str, str], dns_value: str):
+    """ZIP of the matching peers: keyset batches in a session of its own, rendering on a thread pool."""
+    errors: list[str] = []
+
+    def peers():
+        used_names: set[str] = set()
+        with get_session() as session:
+            cursor: int | None = None
+            while True:
+                page_stmt = _keyset_stmt(session, stmt, PeerDevice.id, False, cursor)
+                batch = session.scalars(page_stmt.limit(PEERS_STREAM_BATCH)).all()
+                if not batch:
+                    break
+                # Detached rows keep their loaded attributes and never lazy-load from pool threads.
+                session.expunge_all()
+                for peer in batch:
+                    name = _safe_filename(peer.name or "") or f"peer_{peer.id}"
+                    if name in used_names:
+                        name = f"{name}_{peer.id}"
+                    used_names.add(name)
+                    yield peer, name
+                if len(batch) < PEERS_STREAM_BATCH:
+                    break
+                cursor = batch[-1].id
+
+    def entries():
+        rendered = render_ordered(lambda item: _render_peer_export(item[0], item[1], defaults, dns_value, parts), peers())
+        for (peer, _name), future in rendered:
+            try:
+                yield from future.result()
+            except Exception as exc:
+                detail = exc.detail if isinstance(exc, HTTPException) else exc
+                errors.append(f"{peer.name} ({peer.ip}): {detail}")
+        if errors:
+            yield "export-errors.txt", ("\n".join(errors) + "\n").encode("utf-8")
+
+    return stream_zip(entries())
+
+
+@router.get("/peers/export")
+def peers_export(
+    request: Request,
+    status: str | None = None,
+    group: str | None = None,
+    ids: str | None = None,
+    include: str | None = None,
+    actor: User = Depends(require_permission("peers:read")),
+    session: Session = Depends(_db_session),
+) -> StreamingResponse:
+    stmt = _peers_filtered_stmt(status, None, group, None)
+    id_list: list[int] = []
+    if ids and ids.strip():
+        try:
+            id_list = sorted({int(item) for item in ids.split(",") if item.strip()})
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="ids must be a comma separated list of integers") from exc
+        stmt = stmt.where(PeerDevice.id.in_(id_list))
+    parts = tuple(p.strip() for p in (include or ",".join(EXPORT_PARTS)).split(",") if p.strip())
+    if not parts or any(p not in EXPORT_PARTS for p in parts):
+        raise HTTPException(status_code=400, detail=f"include must be a subset of {','.join(EXPORT_PARTS)}")
+
+    count = session.scalar(select(func.count()).select_from(stmt.subquery())) or 0
+    if not count:
+        raise HTTPException(status_code=404, detail="No peers match the filter")
+    defaults = _load_config_defaults()
+    dns_value = _get_dns_setting(session)
+
+    write_audit_event(
+        session=session,
+        action="peers_exported",
+        user_id=actor.id,
+        target="peers",
+        details={"count": int(count), "status": status, "group": group, "ids": id_list or None, "include": list(parts)},
+        ip_address=request.client.host if request.client else None,
+    )
+    filename = f"peers-export-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+    return StreamingResponse(
+        _stream_peers_export(stmt, parts, defaults, dns_value),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": ARTIFACT_CACHE_CONTROL,
+        },
+    )
+
+
 @router.get("/peers/{peer_id}")
 def peers_get(
     peer_id: int,
@@ -634,7 +940,8 @@ def peers_get(
     peer = session.get(PeerDevice, peer_id)
     if peer is None:
         raise HTTPException(status_code=404, detail="Peer not found")
-    return _peer_payload(peer)
+    snapshot = _peer_monitor.snapshot() if _peer_monitor is not None else None
+    return _apply_runtime(_peer_payload(peer), snapshot, int(time.time()))
 
 
 @router.put("/peers/{peer_id}")
@@ -735,7 +1042,7 @@ def peers_import_by_ip(
     if existing is not None:
         return _peer_payload(existing)
 
-    config_peer = next((item for item in _scan_config_peers() if item["ip"] == ip), None)
+    config_peer = _config_catalog.by_ip(ip)
     if config_peer is None:
         raise HTTPException(status_code=404, detail="Peer config not found")
 
@@ -760,6 +1067,7 @@ def peers_import_by_ip(
     )
     session.add(peer)
     session.flush()
+    _ip_pools.claim(session, [ip])
 
     write_audit_event(
         session=session,
@@ -791,6 +1099,8 @@ def peers_delete(
     name = peer.name
     ip = peer.ip
     session.delete(peer)
+    _ip_pools.release(session, [ip])
+    _artifacts.evict_owner(_artifact_owner(peer_id))
     write_audit_event(
         session=session,
         action="peer_deleted",
@@ -851,6 +1161,7 @@ def peers_enable(
 @router.get("/peers/{peer_id}/config")
 def peers_config(
     peer_id: int,
+    request: Request,
     _: User = Depends(require_permission("peers:read")),
     session: Session = Depends(_db_session),
 ) -> Response:
@@ -858,34 +1169,29 @@ def peers_config(
     if peer is None:
         raise HTTPException(status_code=404, detail="Peer not found")
 
-    defaults = _load_config_defaults()
-    dns_value = _get_dns_setting(session)
-
-    content = None
-    config_path = Path(peer.config_file) if peer.config_file else None
-    if config_path and config_path.exists():
-        _validate_path_traversal(config_path, CONFIGS_DIR)
-        content = config_path.read_text(encoding="utf-8", errors="replace")
-    if not content or _config_has_placeholders(content):
-        content = _build_config_content(peer, defaults=defaults, dns=dns_value)
-        if config_path:
-            config_path.parent.mkdir(parents=True, exist_ok=True)
-            config_path.write_text(content, encoding="utf-8")
+    content, key = _peer_config_artifact(session, peer)
     if _config_has_placeholders(content):
         raise HTTPException(status_code=422, detail="Config contains placeholder values (TODO_*).")
 
-    _mark_downloaded(peer)
     filename = _safe_filename(peer.name)
-    return Response(
-        content=content,
-        media_type="text/plain",
-        headers={"Content-Disposition": f'attachment; filename="{filename}.conf"'},
+    response = _artifact_response(
+        request,
+        key,
+        Response(
+            content=content,
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.conf"'},
+        ),
     )
+    if response.status_code == 200:
+        _mark_downloaded(peer)
+    return response
 
 
 @router.get("/peers/by-ip/{peer_ip}/config")
 def peers_config_by_ip(
     peer_ip: str,
+    request: Request,
     _: User = Depends(require_permission("peers:read")),
     session: Session = Depends(_db_session),
 ) -> Response:
@@ -893,9 +1199,9 @@ def peers_config_by_ip(
 
     peer = session.scalar(select(PeerDevice).where(PeerDevice.ip == ip))
     if peer is not None:
-        return peers_config(peer_id=peer.id, _=_, session=session)
+        return peers_config(peer_id=peer.id, request=request, _=_, session=session)
 
-    config_peer = next((item for item in _scan_config_peers() if item["ip"] == ip), None)
+    config_peer = _config_catalog.by_ip(ip)
     if config_peer is None:
         raise HTTPException(status_code=404, detail="Config not found")
 
@@ -904,31 +1210,44 @@ def peers_config_by_ip(
         raise HTTPException(status_code=404, detail="Config not found")
 
     _validate_path_traversal(path, CONFIGS_DIR)
-    content = path.read_text(encoding="utf-8", errors="replace")
+    content, key = _config_file_artifact(path)
     if _config_has_placeholders(content):
         raise HTTPException(status_code=422, detail="Config contains placeholder values (TODO_*).")
     filename = _safe_filename(config_peer["name"])
-    return Response(
-        content=content,
-        media_type="text/plain",
-        headers={"Content-Disposition": f'attachment; filename="{filename}.conf"'},
+    return _artifact_response(
+        request,
+        key,
+        Response(
+            content=content,
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.conf"'},
+        ),
     )
 
 
 @router.get("/peers/{peer_id}/qr")
 def peers_qr(
     peer_id: int,
+    request: Request,
     _: User = Depends(require_permission("peers:read")),
     session: Session = Depends(_db_session),
-) -> dict[str, str]:
+) -> Response:
     peer = session.get(PeerDevice, peer_id)
     if peer is None:
         raise HTTPException(status_code=404, detail="Peer not found")
-    config_response = peers_config(peer_id=peer_id, _=_, session=session)
-    content = str(config_response.body, encoding="utf-8", errors="replace")
+    content, config_key = _peer_config_artifact(session, peer)
     if _config_has_placeholders(content):
         raise HTTPException(status_code=422, detail="Config contains placeholder values (TODO_*).")
-    return {"qr_png_base64": _build_qr_base64(content)}
+
+    key = artifact_key("qr", config_key)
+    if etag_matches(request.headers.get("if-none-match"), key):
+        return _artifact_response(request, key, Response())
+    qr_b64 = _artifacts.get_or_build(
+        key, lambda: _build_qr_base64(content).encode("ascii"), owner=_artifact_owner(peer_id)
+    ).decode("ascii")
+    # Scanning the QR hands the config over, same as a download.
+    _mark_downloaded(peer)
+    return _artifact_response(request, key, JSONResponse({"qr_png_base64": qr_b64}))
 
 
 @router.get("/peers/stats")
@@ -936,9 +1255,6 @@ def peers_stats(
     _: User = Depends(require_permission("peers:read")),
     session: Session = Depends(_db_session),
 ) -> dict[str, Any]:
-    total_range = 252
-    used = session.scalar(select(func.count(PeerDevice.id))) or 0
-
     by_status_rows = session.execute(
         select(PeerDevice.status, func.count(PeerDevice.id)).group_by(PeerDevice.status)
     ).all()
@@ -947,17 +1263,107 @@ def peers_stats(
     ).all()
 
     return {
-        "total_range": total_range,
-        "used": int(used),
-        "available": max(total_range - int(used), 0),
+        **_ip_pools.stats(session),
         "by_status": {str(status): int(cnt) for status, cnt in by_status_rows},
         "by_type": {str(kind): int(cnt) for kind, cnt in by_type_rows},
     }
 
 
+def start_monitor_push_listener() -> None:
+    """Receive collector snapshots over the push socket (one per worker process)."""
+    global _monitor_push
+    if _monitor_push is None:
+        _monitor_push = SnapshotListener(f"backend-{os.getpid()}")
+        _monitor_push.start()
+
+
+def stop_monitor_push_listener() -> None:
+    global _monitor_push
+    if _monitor_push is not None:
+        _monitor_push.close()
+        _monitor_push = None
+
+
+async def start_peer_monitor() -> None:
+    """Start the wg dump collector (VPS1 credentials from env > .env > keys.env, as admin-server)."""
+    global _peer_monitor
+    if _peer_monitor is not None:
+        return
+    values = _read_kv_file(KEYS_ENV_PATH)
+    values.update(_read_kv_file(ENV_PATH))
+    values.update({key: os.environ[key] for key in ("VPS1_IP", "VPS1_USER", "VPS1_KEY", "VPS1_PASS", "VPS1_KNOWN_HOSTS") if os.environ.get(key)})
+    settings = get_settings()
+    if not settings.MONITOR_PEERS_ENABLED or not values.get("VPS1_IP"):
+        return
+    target = SSHTarget(
+        host=values["VPS1_IP"],
+        user=values.get("VPS1_USER") or "root",
+        key_path=resolve_key_path(values.get("VPS1_KEY"), PROJECT_ROOT),
+        password=values.get("VPS1_PASS") or None,
+        known_hosts=os.path.expanduser(values.get("VPS1_KNOWN_HOSTS") or DEFAULT_KNOWN_HOSTS),
+    )
+    accounting = None
+    if settings.MONITOR_PEERS_ACCOUNTING and settings.DATABASE_URL:
+        if settings.TRAFFIC_COUNTERS_URL:
+            # The worker already owns ingest; a second poller would race it on the same rows.
+            logger.warning("MONITOR_PEERS_ACCOUNTING ignored: TRAFFIC_COUNTERS_URL is set, the worker accounts traffic")
+        else:
+            accounting = TrafficAccountingService()
+    _peer_monitor = PeerMonitor(
+        target,
+        interval=PEER_METRICS_INTERVAL_SEC,
+        account_traffic=accounting,
+        enforce_limits=bool(settings.DATABASE_URL),
+    )
+    _peer_monitor.start()
+
+
+def install_server_profile_reload() -> None:
+    """SIGHUP (e.g. `systemctl reload` after a deploy) drops the cached server profile."""
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _server_profile.invalidate)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass  # no SIGHUP on Windows / no running loop
+
+
+async def stop_peer_monitor() -> None:
+    global _peer_monitor
+    if _peer_monitor is not None:
+        await _peer_monitor.stop()
+        _peer_monitor = None
+
+
+@router.post("/server-profile/refresh")
+def server_profile_refresh(
+    request: Request,
+    actor: User = Depends(require_permission("settings:write")),
+    session: Session = Depends(_db_session),
+) -> dict[str, Any]:
+    _server_profile.invalidate()
+    profile = _load_config_defaults()
+    write_audit_event(
+        session=session,
+        action="server_profile_refreshed",
+        user_id=actor.id,
+        target="server_profile",
+        details={"endpoint": profile.get("Endpoint")},
+        ip_address=request.client.host if request.client else None,
+    )
+    payload: dict[str, Any] = {key: profile[key] for key in SERVER_PROFILE_PUBLIC_KEYS if profile.get(key)}
+    payload["loaded_at"] = _server_profile.loaded_at
+    return payload
+
+
 @router.get("/monitoring/data")
 def monitoring_data(_: User = Depends(require_permission("monitoring:read"))) -> dict[str, Any]:
     monitor_path = _resolve_monitor_data_path()
+    pushed = _monitor_push.newer_than(monitor_path, MONITOR_STALE_SEC) if _monitor_push is not None else None
+    if pushed is not None:
+        payload = dict(pushed.data)
+        payload["_monitor_running"] = True
+        payload["_monitor_path"] = f"push:{_monitor_push.path}"
+        return payload
+
     if monitor_path is None:
         return {
             "error": "Monitoring data not available",
@@ -981,6 +1387,10 @@ def monitoring_data(_: User = Depends(require_permission("monitoring:read"))) ->
 
 @router.get("/monitoring/peers")
 def monitoring_peers(_: User = Depends(require_permission("monitoring:read"))) -> list[dict[str, Any]]:
-    # Stage 3: monitoring peers endpoint is kept native in new backend.
-    # TODO(stage-4): add live SSH wg-dump integration with idempotent parsing.
-    return []
+    """Peers with handshake times and traffic from VPS1 (background collector snapshot)."""
+    if _peer_monitor is None:
+        return []
+    snapshot = _peer_monitor.snapshot()
+    if snapshot.error and not snapshot.ts:
+        raise HTTPException(status_code=502, detail=f"SSH failed: {snapshot.error}")
+    return list(snapshot.peers)
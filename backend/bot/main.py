@@ -5,7 +5,9 @@ import logging
 from typing import Any
 
 from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 
+from backend.bot.pipeline import UpdatePipeline
 from backend.core.config import get_settings
 from backend.db.session import get_session
 from backend.services.bot_service import build_bot_service
@@ -13,12 +15,29 @@ from backend.services.bot_service import build_bot_service
 logger = logging.getLogger(__name__)
 settings = get_settings()
 bot_service = build_bot_service()
+# Seconds the shutdown waits for already acknowledged updates.
+UPDATE_DRAIN_TIMEOUT_SEC = 10.0
+
+
+def _handle_update(update: dict[str, Any], ip_address: str | None) -> None:
+    with get_session() as session:
+        bot_service.process_update(session=session, update=update, ip_address=ip_address)
+
+
+update_pipeline = UpdatePipeline(
+    _handle_update,
+    workers=settings.BOT_UPDATE_WORKERS,
+    max_pending=settings.BOT_UPDATE_QUEUE_MAX,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("telegram bot service started")
     yield
+    drained = await run_in_threadpool(update_pipeline.close, UPDATE_DRAIN_TIMEOUT_SEC)
+    if not drained:
+        logger.warning("telegram bot stopped with unprocessed updates: %s", update_pipeline.stats())
     logger.info("telegram bot service stopped")
 
 
@@ -43,13 +62,20 @@ async def telegram_webhook(
         if x_telegram_bot_api_secret_token != settings.TELEGRAM_WEBHOOK_SECRET_TOKEN:
             raise HTTPException(status_code=403, detail="invalid webhook secret")
     payload: dict[str, Any] = await request.json()
+    # Ack right away; the handler (DB + Bot API calls) runs on the update pipeline.
+    if not update_pipeline.submit(payload, request.client.host if request.client else None):
+        raise HTTPException(status_code=503, detail="update queue is full")
+    return {"ok": True}
+
+
+def _process_payment_webhook(provider: str, payload: dict[str, Any], ip_address: str | None) -> bool:
     with get_session() as session:
-        bot_service.process_update(
+        return bot_service.process_payment_webhook(
             session=session,
-            update=payload,
-            ip_address=request.client.host if request.client else None,
+            provider=provider,
+            payload=payload,
+            ip_address=ip_address,
         )
-    return {"ok": True}
 
 
 @app.post("/payments/test/webhook")
@@ -61,13 +87,12 @@ async def test_payment_webhook(
         raise HTTPException(status_code=403, detail="invalid payment secret")
     payload: dict[str, Any] = await request.json()
     try:
-        with get_session() as session:
-            found = bot_service.process_payment_webhook(
-                session=session,
-                provider="test",
-                payload=payload,
-                ip_address=request.client.host if request.client else None,
-            )
+        found = await run_in_threadpool(
+            _process_payment_webhook,
+            "test",
+            payload,
+            request.client.host if request.client else None,
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     if not found:
@@ -84,13 +109,12 @@ async def manual_payment_webhook(
         raise HTTPException(status_code=403, detail="invalid payment secret")
     payload: dict[str, Any] = await request.json()
     try:
-        with get_session() as session:
-            found = bot_service.process_payment_webhook(
-                session=session,
-                provider="manual",
-                payload=payload,
-                ip_address=request.client.host if request.client else None,
-            )
+        found = await run_in_threadpool(
+            _process_payment_webhook,
+            "manual",
+            payload,
+            request.client.host if request.client else None,
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     if not found:
@@ -145,6 +169,15 @@ def admin_bot_activity(
     return {"items": items, "total": len(items)}
 
 
+@app.get("/admin/bot/metrics")
+def admin_bot_metrics(
+    token: str | None = Query(default=None),
+    x_bot_internal_token: str | None = Header(default=None),
+) -> dict[str, Any]:
+    _require_internal_token(token=token, header_token=x_bot_internal_token)
+    return {"updates": update_pipeline.stats(), "telegram": bot_service.get_transport_metrics()}
+
+
 @app.get("/admin/bot/settings")
 def admin_bot_settings(
     token: str | None = Query(default=None),
@@ -164,15 +197,19 @@ async def admin_bot_settings_update(
 ) -> dict[str, Any]:
     _require_internal_token(token=token, header_token=x_bot_internal_token)
     payload: dict[str, Any] = await request.json()
-    with get_session() as session:
-        values = bot_service.update_admin_settings(
-            session=session,
-            values=payload,
-            ip_address=request.client.host if request.client else None,
-        )
+    values = await run_in_threadpool(
+        _update_admin_settings,
+        payload,
+        request.client.host if request.client else None,
+    )
     return {"items": values}
 
 
+def _update_admin_settings(values: dict[str, Any], ip_address: str | None) -> dict[str, str]:
+    with get_session() as session:
+        return bot_service.update_admin_settings(session=session, values=values, ip_address=ip_address)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,118 @@
+"""Bounded pipeline for incoming Telegram updates.
+
+The webhook only validates and enqueues an update; a thread pool runs the
+(synchronous, DB + Bot API) handler. Updates of one chat run strictly one
+after another in arrival order, different chats run in parallel up to
+``workers``. A full queue rejects the update, so the webhook answers non-2xx
+and Telegram redelivers it later instead of the service piling up work.
+"""
+
+from __future__ import annotations
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+UpdateHandler = Callable[[dict[str, Any], Optional[str]], None]
+
+
+def update_chat_key(update: dict[str, Any]) -> Hashable:
+    """Ordering key of an update: its chat, else its sender, else the update itself."""
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        chat = (update.get(field) or {}).get("chat") or {}
+        if chat.get("id") is not None:
+            return ("chat", chat["id"])
+    callback = update.get("callback_query") or {}
+    chat = (callback.get("message") or {}).get("chat") or {}
+    if chat.get("id") is not None:
+        return ("chat", chat["id"])
+    for field in ("callback_query", "inline_query", "my_chat_member", "pre_checkout_query"):
+        sender = (update.get(field) or {}).get("from") or {}
+        if sender.get("id") is not None:
+            return ("user", sender["id"])
+    return ("update", update.get("update_id"))
+
+
+class UpdatePipeline:
+    """Per-chat ordered, globally bounded executor of update handlers."""
+
+    def __init__(self, handler: UpdateHandler, *, workers: int = 8, max_pending: int = 1000):
+        self._handler = handler
+        self._max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bot-update")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Chat key -> updates waiting behind the one currently running for that chat.
+        self._chains: dict[Hashable, collections.deque[tuple[dict[str, Any], Optional[str]]]] = {}
+        self._pending = 0
+        self._closed = False
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, update: dict[str, Any], ip_address: Optional[str] = None) -> bool:
+        """Queue an update; False when the pipeline is full or shutting down."""
+        key = update_chat_key(update)
+        with self._lock:
+            if self._closed or self._pending >= self._max_pending:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            chain = self._chains.get(key)
+            if chain is not None:
+                chain.append((update, ip_address))
+                return True
+            self._chains[key] = collections.deque()
+        self._executor.submit(self._run, key, update, ip_address)
+        return True
+
+    def _run(self, key: Hashable, update: dict[str, Any], ip_address: Optional[str]) -> None:
+        ok = True
+        try:
+            self._handler(update, ip_address)
+        except Exception:
+            ok = False
+            logger.exception("telegram update failed update_id=%s", update.get("update_id"))
+        with self._lock:
+            self._pending -= 1
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+            chain = self._chains[key]
+            if not chain:
+                del self._chains[key]
+                if not self._pending:
+                    self._idle.notify_all()
+                return
+            next_update, next_ip = chain.popleft()
+        # Re-queue instead of looping, so a busy chat cannot hold a worker against other chats.
+        self._executor.submit(self._run, key, next_update, next_ip)
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every queued update has been handled; False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Stop accepting updates and drain the queue (up to ``timeout`` seconds)."""
+        with self._lock:
+            self._closed = True
+        drained = self.join(timeout)
+        self._executor.shutdown(wait=drained, cancel_futures=not drained)
+        return drained
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "active_chats": len(self._chains),
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_pending": self._max_pending,
+            }
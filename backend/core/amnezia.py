@@ -0,0 +1,97 @@
+"""AmneziaVPN import formats (JSON profile and vpn:// share URL) built from a .conf text.
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library. The JSON layout matches
+amnezia_write_json in lib/common.sh.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any
+
+
+def parse_conf_sections(conf_text: str) -> tuple[dict[str, str], dict[str, str]]:
+    """Parse WireGuard-like config text into Interface/Peer key-value maps."""
+    iface: dict[str, str] = {}
+    peer: dict[str, str] = {}
+    section = ""
+    for raw in conf_text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1].strip().lower()
+            continue
+        if "=" not in line:
+            continue
+        key, _, val = line.partition("=")
+        key = key.strip()
+        val = val.strip()
+        if section == "interface":
+            iface[key] = val
+        elif section == "peer":
+            peer[key] = val
+    return iface, peer
+
+
+def amnezia_payload(conf_text: str, description: str = "VPN", fallback_host: str = "") -> dict[str, Any]:
+    """AmneziaVPN profile (amnezia-awg container) for a .conf; ``fallback_host`` is used without Endpoint."""
+    iface, peer = parse_conf_sections(conf_text)
+
+    endpoint = peer.get("Endpoint", "")
+    host = endpoint
+    port = "51820"
+    if ":" in endpoint:
+        host, _, ep_port = endpoint.rpartition(":")
+        if host:
+            port = ep_port or port
+
+    last_cfg_lines = [
+        "[Interface]",
+        f"Address = {iface.get('Address', '')}",
+        f"DNS = {iface.get('DNS', '10.8.0.2')}",
+        f"PrivateKey = {iface.get('PrivateKey', '')}",
+        f"MTU = {iface.get('MTU', '1280')}",
+        "",
+        "[Peer]",
+        f"PublicKey = {peer.get('PublicKey', '')}",
+        f"AllowedIPs = {peer.get('AllowedIPs', '0.0.0.0/0')}",
+        f"PersistentKeepalive = {peer.get('PersistentKeepalive', '25')}",
+        f"Endpoint = {endpoint}",
+    ]
+    last_config = "\n".join(last_cfg_lines) + "\n"
+
+    awg: dict[str, str] = {
+        "H1": iface.get("H1", ""),
+        "H2": iface.get("H2", ""),
+        "H3": iface.get("H3", ""),
+        "H4": iface.get("H4", ""),
+        "Jc": iface.get("Jc", ""),
+        "Jmax": iface.get("Jmax", ""),
+        "Jmin": iface.get("Jmin", ""),
+        "S1": iface.get("S1", ""),
+        "S2": iface.get("S2", ""),
+        "last_config": last_config,
+        "port": port,
+        "transport_proto": "udp",
+    }
+
+    return {
+        "containers": [{
+            "awg": awg,
+            "container": "amnezia-awg",
+        }],
+        "defaultContainer": "amnezia-awg",
+        "description": description,
+        "dns1": iface.get("DNS", "10.8.0.2"),
+        "dns2": "8.8.8.8",
+        "hostName": host or fallback_host,
+    }
+
+
+def amnezia_share_url(conf_text: str, description: str = "VPN", fallback_host: str = "") -> str:
+    """Build Amnezia share URL (vpn://base64(json)) from a .conf content."""
+    raw = json.dumps(amnezia_payload(conf_text, description, fallback_host), ensure_ascii=False, separators=(",", ":"))
+    return "vpn://" + base64.b64encode(raw.encode("utf-8")).decode("utf-8")
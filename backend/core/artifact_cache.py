@@ -0,0 +1,215 @@
+"""Content-addressed cache of rendered peer artifacts (config text, QR PNG, vpn:// URL).
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library.
+
+A key is a hash of everything the artifact is rendered from (peer id,
+``config_version``, a hash of the server profile, or the stat of a config file
+served as is), so entries never need invalidation: a change of any input
+produces a new key and old entries age out. Hits are served from an in-memory
+LRU, then from disk (one file per key, 0600, since configs carry private
+keys); a miss is built once even when several requests ask for it at the same
+time. The key doubles as the HTTP ETag.
+
+Entries may be tagged with an ``owner`` (e.g. ``peer-42``): they are stored in
+the owner's own directory, so ``evict_owner`` drops all of them at once when the
+peer is deleted instead of leaving its private keys on disk until the TTL.
+"""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import threading
+import time
+from typing import Any, Callable, Mapping
+
+ARTIFACT_CACHE_MEMORY_ITEMS = int(os.environ.get("ARTIFACT_CACHE_MEMORY_ITEMS", "512"))
+ARTIFACT_CACHE_DISK_TTL_SEC = float(os.environ.get("ARTIFACT_CACHE_DISK_TTL_SEC", str(7 * 24 * 3600)))
+# Stale files are swept once per this many disk writes.
+_PRUNE_EVERY_WRITES = 256
+
+
+def artifact_key(kind: str, *parts: Any) -> str:
+    """Stable key of an artifact rendered from ``parts`` (e.g. peer id, config_version, profile hash)."""
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\x1f")
+        digest.update(str(part).encode("utf-8"))
+    return f"{kind}-{digest.hexdigest()[:40]}"
+
+
+def profile_hash(profile: Mapping[str, Any]) -> str:
+    """Short hash of the server profile/settings a config is rendered from."""
+    raw = json.dumps({str(k): str(v) for k, v in profile.items()}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def etag_for(key: str) -> str:
+    return f'"{key}"'
+
+
+def etag_matches(if_none_match: str | None, key: str) -> bool:
+    """True when an ``If-None-Match`` header value covers the artifact ``key``."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == key:
+            return True
+    return False
+
+
+class ArtifactCache:
+    """Two-tier (memory LRU + disk) store of immutable artifacts; safe to share between threads."""
+
+    def __init__(
+        self,
+        directory: Path | None,
+        *,
+        memory_items: int = ARTIFACT_CACHE_MEMORY_ITEMS,
+        disk_ttl: float = ARTIFACT_CACHE_DISK_TTL_SEC,
+    ):
+        self._dir = Path(directory) if directory is not None else None
+        self._memory_items = max(0, int(memory_items))
+        self._disk_ttl = max(0.0, float(disk_ttl))
+        self._lock = threading.Lock()
+        self._memory: collections.OrderedDict[str, bytes] = collections.OrderedDict()
+        self._owner_of: dict[str, str] = {}
+        self._building: dict[str, threading.Lock] = {}
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: str, builder: Callable[[], bytes], *, owner: str | None = None) -> bytes:
+        data = self._get_memory(key)
+        if data is not None:
+            return data
+        with self._lock:
+            build_lock = self._building.setdefault(key, threading.Lock())
+        try:
+            with build_lock:
+                data = self._get_memory(key)
+                if data is None:
+                    data = self._read_disk(key, owner)
+                    if data is None:
+                        self.misses += 1
+                        data = bytes(builder())
+                        self._write_disk(key, data, owner)
+                    self._put_memory(key, data, owner)
+                return data
+        finally:
+            with self._lock:
+                if self._building.get(key) is build_lock:
+                    del self._building[key]
+
+    def _get_memory(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def _put_memory(self, key: str, data: bytes, owner: str | None = None) -> None:
+        if not self._memory_items:
+            return
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            if owner is not None:
+                self._owner_of[key] = owner
+            while len(self._memory) > self._memory_items:
+                evicted, _ = self._memory.popitem(last=False)
+                self._owner_of.pop(evicted, None)
+
+    def _owner_dir(self, owner: str) -> Path | None:
+        if self._dir is None:
+            return None
+        return self._dir / f"owner-{hashlib.sha256(owner.encode('utf-8')).hexdigest()[:24]}"
+
+    def _path(self, key: str, owner: str | None = None) -> Path | None:
+        if self._dir is None:
+            return None
+        if owner is not None:
+            return self._owner_dir(owner) / key
+        return self._dir / key[-2:] / key
+
+    def evict_owner(self, owner: str) -> None:
+        """Drop every entry stored with ``owner`` from memory and disk."""
+        with self._lock:
+            for key in [key for key, key_owner in self._owner_of.items() if key_owner == owner]:
+                del self._owner_of[key]
+                self._memory.pop(key, None)
+        owner_dir = self._owner_dir(owner)
+        if owner_dir is not None:
+            shutil.rmtree(owner_dir, ignore_errors=True)
+
+    def _read_disk(self, key: str, owner: str | None = None) -> bytes | None:
+        path = self._path(key, owner)
+        if path is None:
+            return None
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        self.hits += 1
+        return data
+
+    def _write_disk(self, key: str, data: bytes, owner: str | None = None) -> None:
+        path = self._path(key, owner)
+        if path is None:
+            return
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY_WRITES == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Remove disk entries not used for ``disk_ttl`` seconds; returns how many were removed."""
+        if self._dir is None or not self._disk_ttl:
+            return 0
+        cutoff = time.time() - self._disk_ttl
+        removed = 0
+        try:
+            buckets = list(os.scandir(self._dir))
+        except OSError:
+            return 0
+        for bucket in buckets:
+            if not bucket.is_dir(follow_symlinks=False):
+                continue
+            try:
+                with os.scandir(bucket.path) as it:
+                    for item in it:
+                        try:
+                            if item.stat(follow_symlinks=False).st_mtime < cutoff:
+                                os.unlink(item.path)
+                                removed += 1
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return removed
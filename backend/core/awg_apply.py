@@ -0,0 +1,222 @@
+"""Atomic awg1 peer editor that runs on VPS1 in one SSH round trip.
+
+Used by both the FastAPI backend (traffic quota enforcement) and
+scripts/admin/admin-server.py, so it must depend only on the standard library.
+"""
+
+from __future__ import annotations
+
+import json
+import shlex
+from typing import Any, Iterable
+
+AWG1_CONF_PATH = "/etc/amnezia/amneziawg/awg1.conf"
+
+# Runs on VPS1 via `python3 -c`: reads a JSON request
+#   {"conf": path, "upsert": [{public_key, preshared_key, peer_ip}], "remove": [public_key]}
+# from stdin and prints one JSON object with a result per upserted peer. The
+# whole change set is applied to the running interface with a single `awg set`
+# and persisted with one atomic rewrite of awg1.conf. Both directions are
+# idempotent: upserting an identical peer or removing an absent one is a no-op.
+# Keep it compatible with the distro python3 (no 3.8+ syntax).
+APPLY_PEERS_SCRIPT = r"""
+import fcntl, json, os, shutil, subprocess, sys, tempfile
+
+IFACE = "awg1"
+JUNK_KEYS = ("Jc", "Jmin", "Jmax", "S1", "S2", "H1", "H2", "H3", "H4")
+
+
+def awg(args, data=None):
+    proc = subprocess.run(
+        ["awg"] + args, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError("awg %s: %s" % (" ".join(args[:2]), proc.stderr.strip()))
+    return proc.stdout.strip()
+
+
+def parse_sections(conf_text):
+    # [[header, [lines]]]; text before the first header is kept as header None.
+    sections = [[None, []]]
+    for raw in conf_text.splitlines():
+        if raw.strip().startswith("["):
+            sections.append([raw.strip(), []])
+        else:
+            sections[-1][1].append(raw)
+    return sections
+
+
+def section_values(lines):
+    values = {}
+    for raw in lines:
+        key, sep, val = raw.partition("=")
+        if sep and not raw.strip().startswith("#"):
+            values[key.strip()] = val.strip()
+    return values
+
+
+def render(sections):
+    out = []
+    for header, lines in sections:
+        if header is not None:
+            out.append(header)
+        out.extend(lines)
+    return "\n".join(out).rstrip("\n") + "\n"
+
+
+def peer_lines(pub, psk, peer_ip):
+    return ["PublicKey = %s" % pub, "PresharedKey = %s" % psk, "AllowedIPs = %s/32" % peer_ip, ""]
+
+
+def fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def apply(req):
+    # Serialise concurrent editors (several admins, reconcile thread) on a
+    # lock file next to the config; the config is read under the lock.
+    conf_path = req["conf"]
+    lock_fh = open(os.path.join(os.path.dirname(conf_path), ".awg1.conf.lock"), "a")
+    fcntl.flock(lock_fh, fcntl.LOCK_EX)
+    try:
+        return apply_locked(req, conf_path)
+    finally:
+        fcntl.flock(lock_fh, fcntl.LOCK_UN)
+        lock_fh.close()
+
+
+def apply_locked(req, conf_path):
+    with open(conf_path) as fh:
+        conf_text = fh.read()
+    sections = parse_sections(conf_text)
+    iface = {}
+    by_key, ip_owner = {}, {}
+    for section in sections:
+        if section[0] is None:
+            continue
+        values = section_values(section[1])
+        if section[0].lower() == "[interface]":
+            iface = values
+        elif section[0].lower() == "[peer]" and values.get("PublicKey"):
+            by_key[values["PublicKey"]] = section
+            for ip in values.get("AllowedIPs", "").split(","):
+                if ip.strip():
+                    ip_owner[ip.strip().split("/")[0]] = values["PublicKey"]
+
+    removed = set(k for k in req.get("remove", []) if k)
+    results, set_args, new_keys = [], [], []
+    tmp_dir = tempfile.mkdtemp(prefix="awg-apply.")
+    conf_changed = False
+    try:
+        for key in removed:
+            set_args += ["peer", key, "remove"]
+            if key in by_key:
+                sections.remove(by_key.pop(key))
+                conf_changed = True
+        for peer in req.get("upsert", []):
+            pub, psk, peer_ip = peer["public_key"], peer["preshared_key"], peer["peer_ip"]
+            owner = ip_owner.get(peer_ip)
+            if owner and owner != pub and owner not in removed:
+                results.append({"public_key": pub, "ok": False, "error": "IP %s already on awg1" % peer_ip})
+                continue
+            ip_owner[peer_ip] = pub
+            psk_path = os.path.join(tmp_dir, "psk%d" % len(results))
+            with open(psk_path, "w") as fh:
+                fh.write(psk)
+            set_args += ["peer", pub, "preshared-key", psk_path, "allowed-ips", peer_ip + "/32"]
+            lines = peer_lines(pub, psk, peer_ip)
+            if pub in by_key:
+                current = section_values(by_key[pub][1])
+                if current.get("PresharedKey") != psk or current.get("AllowedIPs") != peer_ip + "/32":
+                    by_key[pub][1] = lines
+                    conf_changed = True
+            else:
+                if sections[-1][1] and sections[-1][1][-1].strip():
+                    sections[-1][1].append("")
+                section = ["[Peer]", lines]
+                sections.append(section)
+                by_key[pub] = section
+                new_keys.append(pub)
+                conf_changed = True
+            results.append({"public_key": pub, "ok": True})
+
+        # Stage the new awg1.conf first: if the runtime apply fails nothing is
+        # persisted, and if the rename fails the added peers are rolled back.
+        tmp_conf = None
+        if conf_changed:
+            fd, tmp_conf = tempfile.mkstemp(dir=os.path.dirname(conf_path), prefix=".awg1.", suffix=".tmp")
+            with os.fdopen(fd, "w") as fh:
+                fh.write(render(sections))
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.chmod(tmp_conf, os.stat(conf_path).st_mode & 0o777)
+        applied = False
+        try:
+            if set_args:
+                awg(["set", IFACE] + set_args)
+                applied = True
+            if tmp_conf:
+                os.replace(tmp_conf, conf_path)
+                tmp_conf = None
+                fsync_dir(os.path.dirname(conf_path))
+        except Exception:
+            if applied and new_keys:
+                rollback = []
+                for key in new_keys:
+                    rollback += ["peer", key, "remove"]
+                awg(["set", IFACE] + rollback)
+            if tmp_conf and os.path.exists(tmp_conf):
+                os.unlink(tmp_conf)
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    try:
+        server_pub = awg(["show", IFACE, "public-key"])
+    except RuntimeError:
+        server_pub = awg(["pubkey"], iface.get("PrivateKey", "") + "\n") if iface.get("PrivateKey") else ""
+    try:
+        port = awg(["show", IFACE, "listen-port"])
+    except RuntimeError:
+        port = iface.get("ListenPort", "")
+
+    out = {"ok": True, "results": results, "removed": len(removed),
+           "server_public_key": server_pub, "server_port": port}
+    for key in JUNK_KEYS:
+        if iface.get(key):
+            out[key] = iface[key]
+    return out
+
+
+try:
+    out = apply(json.load(sys.stdin))
+except Exception as exc:
+    out = {"ok": False, "error": str(exc)}
+print(json.dumps(out))
+"""
+
+
+def build_apply_cmd() -> str:
+    """Remote command for APPLY_PEERS_SCRIPT; the JSON request goes to its stdin."""
+    return f"sudo -n python3 -c {shlex.quote(APPLY_PEERS_SCRIPT)}"
+
+
+def build_apply_request(upsert: Iterable[dict[str, str]], remove: Iterable[str], conf: str = AWG1_CONF_PATH) -> str:
+    return json.dumps({"conf": conf, "upsert": list(upsert), "remove": list(remove)})
+
+
+def parse_apply_result(out: str) -> dict[str, Any]:
+    """Parse the script's last output line; raises RuntimeError if it did not succeed."""
+    lines = out.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, ValueError) as exc:
+        raise RuntimeError(f"unexpected output from VPS1: {out.strip()[:200]}") from exc
+    if not result.get("ok"):
+        raise RuntimeError(result.get("error") or "remote script failed")
+    return result
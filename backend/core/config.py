@@ -29,9 +29,25 @@ class Settings(BaseSettings):
     BOT_SERVICE_PORT: int = 8010
     BOT_OUTBOUND_ENABLED: bool = True
     BOT_PAYMENT_PROVIDER: str = "test"
+    # Приём update: ack сразу, обработка в пуле потоков (порядок внутри чата сохраняется).
+    BOT_UPDATE_WORKERS: int = 8
+    BOT_UPDATE_QUEUE_MAX: int = 1000
+    # Исходящие в Bot API: keep-alive пул и лимиты (на процесс: бот и воркер делят лимит бота).
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org"
+    TELEGRAM_API_POOL_SIZE: int = 8
+    TELEGRAM_API_TIMEOUT_SEC: float = 10.0
+    TELEGRAM_RATE_GLOBAL_PER_SEC: float = 30.0
+    TELEGRAM_RATE_PER_CHAT_PER_SEC: float = 1.0
     LEGACY_ADMIN_BASE_URL: str = "http://127.0.0.1:8081"
     LEGACY_ADMIN_USERNAME: Optional[str] = None
     LEGACY_ADMIN_PASSWORD: Optional[str] = None
+    # Живой мониторинг peer (wg dump с VPS1 через asyncssh) и учёт трафика по его счётчикам.
+    MONITOR_PEERS_ENABLED: bool = True
+    # У учёта трафика один источник: либо этот коллектор, либо worker (TRAFFIC_COUNTERS_URL);
+    # при заданном TRAFFIC_COUNTERS_URL коллектор трафик не учитывает.
+    MONITOR_PEERS_ACCOUNTING: bool = False
+    # Пулы адресов peer через запятую (порядок = порядок выделения), /16../29.
+    PEER_IP_POOLS: str = "10.9.0.0/24"
     CORS_ALLOWED_ORIGINS: str = ""
 
     WORKER_NOTIFY_3D_MINUTES: int = 60
@@ -40,12 +56,21 @@ class Settings(BaseSettings):
     WORKER_CLEANUP_MINUTES: int = 360
     WORKER_SYNC_MINUTES: int = 30
     WORKER_DELIVERY_SECONDS: int = 20
+    WORKER_BROADCAST_FANOUT_SECONDS: int = 5
     WORKER_DELIVERY_BATCH_SIZE: int = 100
+    # Одновременных отправок в пачке; темп ограничивает TelegramGateway (TELEGRAM_RATE_*).
+    WORKER_DELIVERY_CONCURRENCY: int = 16
+    # Аренда пачки уведомлений worker-ом (SKIP LOCKED claim); после истечения пачку забирает другой worker.
+    WORKER_DELIVERY_LEASE_SECONDS: int = 300
     WORKER_MAX_RETRIES: int = 5
     WORKER_RETRY_BASE_SECONDS: int = 30
     WORKER_RETRY_MAX_SECONDS: int = 1800
     WORKER_CLEANUP_KEEP_DAYS: int = 30
     WORKER_STALE_PEER_MINUTES: int = 1440
+    WORKER_TRAFFIC_SECONDS: int = 10
+    # Источник счётчиков peer для worker (JSON-список public_key/rx_bytes/tx_bytes);
+    # пусто — worker трафик не учитывает (см. MONITOR_PEERS_ACCOUNTING).
+    TRAFFIC_COUNTERS_URL: Optional[str] = None
 
 
 @lru_cache
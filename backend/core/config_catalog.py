@@ -0,0 +1,208 @@
+"""Indexed catalog of peer *.conf files in the configs directory (vpn-output).
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library.
+
+The catalog keeps ``file name -> (mtime_ns, size, parsed peer)`` and an
+``ip -> peer`` index. A lookup costs one ``stat()`` of the directory: files
+are re-stat'ed only when the directory changed (create/delete/rename),
+after ``invalidate()`` (in-place rewrites by this process) or every
+``CONFIG_CATALOG_RESCAN_SEC`` (in-place edits by other processes), and a
+file is re-read only when its mtime or size changed. The index is persisted
+next to the configs so a restart does not re-read every file.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+import re
+import threading
+import time
+from typing import Any
+
+CONFIG_CATALOG_RESCAN_SEC = float(os.environ.get("CONFIG_CATALOG_RESCAN_SEC", "30"))
+CONFIG_CATALOG_INDEX_NAME = ".conf-catalog.json"
+_INDEX_VERSION = 1
+_PLACEHOLDER_MARKERS = ("TODO_SERVER_PUBLIC_KEY", "TODO_SERVER_ENDPOINT")
+
+
+def parse_config_peer(config_path: Path) -> dict[str, str] | None:
+    """Parse a WireGuard .conf file and return peer info (name, ip, config_file)."""
+    try:
+        text = config_path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+    if any(marker in text for marker in _PLACEHOLDER_MARKERS):
+        # Ignore synthetic/incomplete configs from tests to avoid broken peers in UI.
+        return None
+
+    ip = ""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.lower().startswith("address") and "=" in stripped:
+            value = stripped.split("=", 1)[1].strip().split(",", 1)[0].strip()
+            ip = value.split("/", 1)[0].strip()
+            break
+    if not ip:
+        return None
+
+    stem = config_path.stem
+    if stem.startswith("peer_"):
+        m = re.match(r"^peer_(.+)_\d{1,3}_\d{1,3}_\d{1,3}_\d{1,3}$", stem)
+        name = m.group(1).replace("_", "-") if m else stem[5:].replace("_", "-")
+    else:
+        name = stem.replace("_", "-")
+    return {"name": name, "ip": ip, "config_file": str(config_path)}
+
+
+class ConfigCatalog:
+    """Incrementally refreshed index of ``<directory>/*.conf``; safe to share between threads."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        index_path: Path | None = None,
+        rescan_sec: float = CONFIG_CATALOG_RESCAN_SEC,
+    ):
+        self._dir = Path(directory)
+        self._index_path = index_path if index_path is not None else self._dir / CONFIG_CATALOG_INDEX_NAME
+        self._rescan_sec = max(0.0, float(rescan_sec))
+        self._lock = threading.Lock()
+        self._files: dict[str, tuple[int, int, dict[str, str] | None]] = {}
+        # Readers take references without locking; refresh swaps both wholesale.
+        self._entries: tuple[dict[str, str], ...] = ()
+        self._by_ip: dict[str, dict[str, str]] = {}
+        self._dir_mtime_ns: int | None = None
+        self._swept_at = 0.0
+        self._dirty = True
+        self._loaded = False
+        self._built = False
+
+    @property
+    def directory(self) -> Path:
+        return self._dir
+
+    def entries(self) -> list[dict[str, str]]:
+        """All parsed config peers, ordered by file name (copies, safe to mutate)."""
+        self._ensure_fresh()
+        return [dict(entry) for entry in self._entries]
+
+    def by_ip(self, ip: str) -> dict[str, str] | None:
+        self._ensure_fresh()
+        entry = self._by_ip.get((ip or "").strip())
+        return dict(entry) if entry is not None else None
+
+    def invalidate(self) -> None:
+        """Force a stat sweep on the next lookup (call after rewriting a .conf in place)."""
+        self._dirty = True
+
+    def _dir_mtime(self) -> int | None:
+        try:
+            return os.stat(self._dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def _ensure_fresh(self) -> None:
+        dir_mtime = self._dir_mtime()
+        if not self._needs_sweep(dir_mtime):
+            return
+        with self._lock:
+            if self._needs_sweep(dir_mtime):
+                self._sweep_locked(dir_mtime)
+
+    def _needs_sweep(self, dir_mtime: int | None) -> bool:
+        return (
+            self._dirty
+            or dir_mtime != self._dir_mtime_ns
+            or time.monotonic() - self._swept_at >= self._rescan_sec
+        )
+
+    def _sweep_locked(self, dir_mtime: int | None) -> None:
+        if not self._loaded:
+            self._loaded = True
+            self._load_index()
+
+        files: dict[str, tuple[int, int, dict[str, str] | None]] = {}
+        if dir_mtime is not None:
+            try:
+                with os.scandir(self._dir) as it:
+                    for item in it:
+                        if item.name.startswith(".") or not item.name.endswith(".conf"):
+                            continue
+                        try:
+                            if not item.is_file():
+                                continue
+                            st = item.stat()
+                        except OSError:
+                            continue
+                        cached = self._files.get(item.name)
+                        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                            files[item.name] = cached
+                        else:
+                            files[item.name] = (st.st_mtime_ns, st.st_size, parse_config_peer(Path(item.path)))
+            except OSError:
+                files = {}
+
+        changed = files != self._files
+        if changed or not self._built:
+            entries = tuple(entry for _name, (_m, _s, entry) in sorted(files.items()) if entry is not None)
+            by_ip: dict[str, dict[str, str]] = {}
+            for entry in entries:
+                by_ip.setdefault(entry["ip"], entry)
+            self._files = files
+            self._entries = entries
+            self._by_ip = by_ip
+            self._built = True
+        if changed:
+            self._save_index()
+            # Writing the index touches the directory itself.
+            dir_mtime = self._dir_mtime()
+        self._dir_mtime_ns = dir_mtime
+        self._swept_at = time.monotonic()
+        self._dirty = False
+
+    def _load_index(self) -> None:
+        try:
+            payload = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if not isinstance(payload, dict) or payload.get("version") != _INDEX_VERSION:
+            return
+        if payload.get("directory") != str(self._dir.resolve()):
+            return
+        files: dict[str, tuple[int, int, dict[str, str] | None]] = {}
+        for name, item in (payload.get("files") or {}).items():
+            try:
+                entry = item.get("peer")
+                if entry is not None:
+                    entry = {"name": str(entry["name"]), "ip": str(entry["ip"]), "config_file": str(self._dir / name)}
+                files[str(name)] = (int(item["mtime_ns"]), int(item["size"]), entry)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+        self._files = files
+
+    def _save_index(self) -> None:
+        payload: dict[str, Any] = {
+            "version": _INDEX_VERSION,
+            "directory": str(self._dir.resolve()),
+            "files": {
+                name: {
+                    "mtime_ns": mtime_ns,
+                    "size": size,
+                    "peer": {"name": entry["name"], "ip": entry["ip"]} if entry is not None else None,
+                }
+                for name, (mtime_ns, size, entry) in self._files.items()
+            },
+        }
+        tmp = self._index_path.with_name(f"{self._index_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self._index_path)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
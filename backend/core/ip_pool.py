@@ -0,0 +1,199 @@
+"""Free-bitmap IP pools for peer tunnel addresses (one bitmap per CIDR).
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library. Persistence and locking are done by the
+callers (admin.db ``ip_pools`` under BEGIN IMMEDIATE, Postgres ``ip_pools``
+under SELECT ... FOR UPDATE); this module only manipulates the bitmaps.
+
+Bit ``i`` of a pool covers host ``first + i``; a set bit means the address is
+taken. The first ``PEER_IP_POOL_RESERVED_HOSTS`` hosts of every pool are
+reserved (``.1`` is the awg1 server address), so ``10.9.0.0/24`` yields the
+historical range 10.9.0.3-254. Allocation resumes from ``next_hint`` and jumps
+over full bytes with a C-level regex search, so its cost does not grow with
+the number of allocated addresses.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import os
+import re
+from typing import Iterable
+
+PEER_IP_POOLS = os.environ.get("PEER_IP_POOLS", "10.9.0.0/24")
+PEER_IP_POOL_RESERVED_HOSTS = 2
+# Keeps a single bitmap (and the row that stores it) reasonably small.
+PEER_IP_POOL_MIN_PREFIX = 16
+
+_NOT_FULL_BYTE = re.compile(rb"[^\xff]")
+
+
+def parse_pool_cidrs(value: str | Iterable[str] | None = None) -> list[str]:
+    """Normalize a comma separated CIDR list (``PEER_IP_POOLS``); order defines allocation order."""
+    if value is None:
+        value = PEER_IP_POOLS
+    items = value.split(",") if isinstance(value, str) else list(value)
+    cidrs: list[str] = []
+    seen: list[ipaddress.IPv4Network] = []
+    for item in items:
+        item = str(item).strip()
+        if not item:
+            continue
+        network = ipaddress.IPv4Network(item, strict=False)
+        if network.prefixlen < PEER_IP_POOL_MIN_PREFIX or network.num_addresses - 2 <= PEER_IP_POOL_RESERVED_HOSTS:
+            raise ValueError(f"IP pool {network} must be between /{PEER_IP_POOL_MIN_PREFIX} and /29")
+        if any(network.overlaps(other) for other in seen):
+            raise ValueError(f"IP pool {network} overlaps another pool")
+        seen.append(network)
+        cidrs.append(str(network))
+    if not cidrs:
+        raise ValueError("PEER_IP_POOLS is empty")
+    return cidrs
+
+
+class IPPool:
+    """Allocation bitmap of one CIDR; mutate, then persist ``bitmap``/``next_hint``/``free``."""
+
+    def __init__(self, cidr: str, bitmap: bytes | None = None, next_hint: int = 0):
+        network = ipaddress.IPv4Network(cidr, strict=False)
+        self.cidr = str(network)
+        self._first = int(network.network_address) + 1 + PEER_IP_POOL_RESERVED_HOSTS
+        self.size = int(network.broadcast_address) - self._first
+        nbytes = (self.size + 7) // 8
+        if bitmap is not None and len(bitmap) == nbytes:
+            self._bits = bytearray(bitmap)
+        else:
+            self._bits = bytearray(nbytes)
+        # Padding bits past the last host are permanently "taken".
+        if self.size % 8:
+            self._bits[-1] |= 0xFF & ~((1 << (self.size % 8)) - 1)
+        self.next_hint = next_hint if 0 <= next_hint < self.size else 0
+        self.free = nbytes * 8 - sum(bin(byte).count("1") for byte in self._bits)
+
+    @classmethod
+    def from_used(cls, cidr: str, used_ips: Iterable[str]) -> "IPPool":
+        """Build a pool from the addresses already assigned to peers (bootstrap/rebuild)."""
+        pool = cls(cidr)
+        pool.mark(used_ips)
+        return pool
+
+    @property
+    def bitmap(self) -> bytes:
+        return bytes(self._bits)
+
+    @property
+    def used(self) -> int:
+        return self.size - self.free
+
+    def index_of(self, ip: str) -> int | None:
+        try:
+            offset = int(ipaddress.IPv4Address(str(ip).strip())) - self._first
+        except ValueError:
+            return None
+        return offset if 0 <= offset < self.size else None
+
+    def contains(self, ip: str) -> bool:
+        return self.index_of(ip) is not None
+
+    def allocate(self, count: int = 1) -> list[str]:
+        """Take up to ``count`` free addresses, lowest first starting from ``next_hint``."""
+        taken: list[str] = []
+        if count <= 0 or not self.free:
+            return taken
+        bits = self._bits
+        pos = self.next_hint >> 3
+        wrapped = False
+        while len(taken) < count and self.free:
+            match = _NOT_FULL_BYTE.search(bits, pos)
+            if match is None:
+                if wrapped:
+                    break
+                wrapped, pos = True, 0
+                continue
+            pos = match.start()
+            byte = bits[pos]
+            while byte != 0xFF and len(taken) < count:
+                bit = (~byte & (byte + 1)).bit_length() - 1
+                byte |= 1 << bit
+                taken.append(str(ipaddress.IPv4Address(self._first + pos * 8 + bit)))
+                self.free -= 1
+            bits[pos] = byte
+        if taken:
+            self.next_hint = (self.index_of(taken[-1]) + 1) % self.size
+        return taken
+
+    def mark(self, ips: Iterable[str]) -> int:
+        """Mark addresses as taken (imported peers, rebuild); returns how many changed state."""
+        changed = 0
+        for ip in ips:
+            index = self.index_of(ip)
+            if index is None:
+                continue
+            mask = 1 << (index & 7)
+            if not self._bits[index >> 3] & mask:
+                self._bits[index >> 3] |= mask
+                self.free -= 1
+                changed += 1
+        return changed
+
+    def release(self, ips: Iterable[str]) -> int:
+        """Return addresses to the pool (peer deleted, provisioning failed)."""
+        changed = 0
+        for ip in ips:
+            index = self.index_of(ip)
+            if index is None:
+                continue
+            mask = 1 << (index & 7)
+            if self._bits[index >> 3] & mask:
+                self._bits[index >> 3] &= ~mask & 0xFF
+                self.free += 1
+                changed += 1
+        return changed
+
+
+def allocate_from(pools: Iterable[IPPool], count: int) -> list[str]:
+    """Allocate ``count`` addresses across pools in configuration order."""
+    taken: list[str] = []
+    for pool in pools:
+        if len(taken) >= count:
+            break
+        taken.extend(pool.allocate(count - len(taken)))
+    return taken
+
+
+def pool_for(pools: Iterable[IPPool], ip: str) -> IPPool | None:
+    for pool in pools:
+        if pool.contains(ip):
+            return pool
+    return None
+
+
+def address_prefix(cidrs: Iterable[str], ip: str, default: int = 24) -> int:
+    """Prefix length for a client ``Address = ip/prefix``: that of the pool owning ``ip``.
+
+    Addresses outside every configured pool (peers from a since-removed pool)
+    keep ``default``, the historical /24.
+    """
+    try:
+        address = ipaddress.IPv4Address(str(ip).strip())
+    except ValueError:
+        return default
+    for cidr in cidrs:
+        network = ipaddress.IPv4Network(cidr, strict=False)
+        if address in network:
+            return network.prefixlen
+    return default
+
+
+def pool_stats(pools: Iterable[IPPool]) -> dict[str, object]:
+    """``total_range``/``used``/``available`` plus a per-pool breakdown for /peers/stats."""
+    items = [
+        {"cidr": pool.cidr, "total_range": pool.size, "used": pool.used, "available": pool.free}
+        for pool in pools
+    ]
+    return {
+        "total_range": sum(item["total_range"] for item in items),
+        "used": sum(item["used"] for item in items),
+        "available": sum(item["available"] for item in items),
+        "pools": items,
+    }
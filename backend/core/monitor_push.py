@@ -0,0 +1,218 @@
+"""Push channel for monitoring snapshots (collector -> admin server / backend).
+
+The collector publishes every snapshot as one JSON datagram to each listener
+socket in ``PUSH_DIR`` (``<name>.sock``); listeners in the same process get it
+directly through a callback. data.json stays as a checkpoint and is the
+fallback when push is unavailable (no AF_UNIX on Windows, collector not
+pushing, listener not started); readers take whichever of the two is newer.
+
+``PUSH_DIR`` is ``VPN_MONITOR_PUSH_DIR``, by default ``vpn-output/.monitor-push``
+of the project, so the collector, admin server and backend agree on it without
+sharing /tmp. A backend in a container sees it only if the directory is
+mounted there; otherwise its listener still starts and reads data.json.
+
+Stdlib only: imported by scripts/admin/admin-server.py as well.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass
+import errno
+import json
+import logging
+import os
+from pathlib import Path
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED = hasattr(socket, "AF_UNIX")
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+PUSH_DIR = Path(os.environ.get("VPN_MONITOR_PUSH_DIR") or PROJECT_ROOT / "vpn-output" / ".monitor-push")
+MAX_DATAGRAM = 4 * 1024 * 1024
+# Linux-only overrides of net.core.wmem_max/rmem_max (root / CAP_NET_ADMIN); the
+# socket module does not export them.
+_LINUX = sys.platform.startswith("linux")
+SO_SNDBUFFORCE = getattr(socket, "SO_SNDBUFFORCE", 32 if _LINUX else None)
+SO_RCVBUFFORCE = getattr(socket, "SO_RCVBUFFORCE", 33 if _LINUX else None)
+OVERSIZE_WARN_INTERVAL_SEC = 60.0
+
+_last_oversize_warning = 0.0
+
+_local_listeners: list["SnapshotListener"] = []
+_local_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class PushedSnapshot:
+    seq: int
+    received_at: float
+    data: dict[str, Any]
+
+
+def _ensure_buffer(sock: socket.socket, option: int, force_option: int | None, size: int) -> int:
+    """Grow a socket buffer to at least ``size`` bytes; returns the resulting size.
+
+    A snapshot is one datagram, and AF_UNIX refuses a datagram larger than the
+    sender's SO_SNDBUF with EMSGSIZE (the default is about 212 KB). The plain
+    option is capped by net.core.*mem_max, so the FORCE variant is tried next.
+    """
+    current = sock.getsockopt(socket.SOL_SOCKET, option)
+    for opt in (option, force_option):
+        if current >= size or opt is None:
+            break
+        with contextlib.suppress(OSError):
+            sock.setsockopt(socket.SOL_SOCKET, opt, size)
+        current = sock.getsockopt(socket.SOL_SOCKET, option)
+    return current
+
+
+def _warn_oversize(size: int, detail: object) -> None:
+    global _last_oversize_warning
+    now = time.monotonic()
+    if now - _last_oversize_warning >= OVERSIZE_WARN_INTERVAL_SEC:
+        _last_oversize_warning = now
+        logger.warning(
+            "monitor push: %d-byte snapshot does not fit in one datagram (%s); "
+            "listeners fall back to data.json (raise net.core.wmem_max or run as root)",
+            size, detail,
+        )
+
+
+def publish_snapshot(data: dict[str, Any] | bytes, push_dir: Path | None = None) -> int:
+    """Deliver a snapshot to in-process listeners and every listener socket; return deliveries."""
+    payload = data if isinstance(data, bytes) else json.dumps(data, ensure_ascii=False).encode("utf-8")
+    delivered = 0
+    with _local_lock:
+        local = list(_local_listeners)
+    local_paths = {listener.path for listener in local}
+    for listener in local:
+        listener.deliver(payload)
+        delivered += 1
+
+    push_dir = push_dir or PUSH_DIR
+    if not SUPPORTED or not push_dir.is_dir():
+        return delivered
+    if len(payload) > MAX_DATAGRAM:
+        _warn_oversize(len(payload), f"limit {MAX_DATAGRAM}")
+        return delivered
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.setblocking(False)
+        # Kernel skb overhead comes on top of the payload.
+        _ensure_buffer(sock, socket.SO_SNDBUF, SO_SNDBUFFORCE, len(payload) + 4096)
+        for path in push_dir.glob("*.sock"):
+            if path in local_paths:
+                continue
+            try:
+                sock.sendto(payload, str(path))
+                delivered += 1
+            except ConnectionRefusedError:
+                # Listener process is gone; its socket file is stale.
+                with contextlib.suppress(OSError):
+                    path.unlink()
+            except OSError as exc:
+                if exc.errno == errno.EMSGSIZE:
+                    _warn_oversize(len(payload), exc)
+                    break
+                logger.debug("monitor push to %s failed: %s", path, exc)
+    return delivered
+
+
+class SnapshotListener:
+    """Receives pushed snapshots on ``PUSH_DIR/<name>.sock`` and keeps the latest one."""
+
+    def __init__(
+        self,
+        name: str,
+        on_snapshot: Callable[[PushedSnapshot], None] | None = None,
+        push_dir: Path | None = None,
+    ) -> None:
+        self.path = (push_dir or PUSH_DIR) / f"{name}.sock"
+        self._on_snapshot = on_snapshot
+        self._sock: socket.socket | None = None
+        self._seq = 0
+        self.latest: PushedSnapshot | None = None
+
+    def start(self) -> bool:
+        """Register in-process and bind the socket; False when only in-process delivery works."""
+        with _local_lock:
+            if self not in _local_listeners:
+                _local_listeners.append(self)
+        if not SUPPORTED or self._sock is not None:
+            return self._sock is not None
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with contextlib.suppress(FileNotFoundError):
+                self.path.unlink()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            _ensure_buffer(sock, socket.SO_RCVBUF, SO_RCVBUFFORCE, MAX_DATAGRAM)
+            sock.bind(str(self.path))
+            os.chmod(self.path, 0o600)
+        except OSError as exc:
+            logger.warning("monitor push listener %s unavailable, using data.json polling: %s", self.path, exc)
+            return False
+        self._sock = sock
+        threading.Thread(target=self._recv_loop, name=f"monitor-push-{self.path.stem}", daemon=True).start()
+        return True
+
+    def close(self) -> None:
+        with _local_lock:
+            if self in _local_listeners:
+                _local_listeners.remove(self)
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+            with contextlib.suppress(OSError):
+                self.path.unlink()
+
+    def fresh(self, max_age_sec: float) -> PushedSnapshot | None:
+        """Latest snapshot if it arrived within ``max_age_sec``."""
+        latest = self.latest
+        if latest is not None and time.time() - latest.received_at < max_age_sec:
+            return latest
+        return None
+
+    def newer_than(self, path: Path | None, max_age_sec: float) -> PushedSnapshot | None:
+        """Fresh snapshot unless the data.json at ``path`` was written after it arrived.
+
+        The collector writes data.json before pushing, so the checkpoint of the
+        same cycle is never newer; a newer file comes from another writer (e.g.
+        the bash loop of monitor-web.sh) and must win over an older push.
+        """
+        latest = self.fresh(max_age_sec)
+        if latest is None or path is None:
+            return latest
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return latest
+        return latest if mtime <= latest.received_at else None
+
+    def deliver(self, payload: bytes) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.debug("monitor push: dropped malformed snapshot")
+            return
+        if not isinstance(data, dict):
+            return
+        self._seq += 1
+        self.latest = PushedSnapshot(self._seq, time.time(), data)
+        if self._on_snapshot is not None:
+            try:
+                self._on_snapshot(self.latest)
+            except Exception:
+                logger.exception("monitor push callback failed")
+
+    def _recv_loop(self) -> None:
+        while self._sock is not None:
+            try:
+                payload = self._sock.recv(MAX_DATAGRAM)
+            except OSError:
+                return
+            self.deliver(payload)
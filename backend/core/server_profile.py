@@ -0,0 +1,108 @@
+"""Cached server profile (endpoint, server public key, AmneziaWG junk parameters).
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library.
+
+A profile is produced by a loader (files for the backend, SSH to VPS1 for
+admin-server) and reused until one of these happens:
+  - ``ttl`` seconds passed;
+  - a watched file (.env, keys.env, sample client configs) changed mtime/size;
+  - ``invalidate()`` was called (refresh endpoint, SIGHUP after a deploy).
+Fresh values obtained as a side effect elsewhere (e.g. awg1 provisioning
+returns the server public key) can be stored with ``put()``. When a reload
+fails, the previous profile is served until the loader succeeds again.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Iterable
+
+SERVER_PROFILE_TTL_SEC = float(os.environ.get("SERVER_PROFILE_TTL_SEC", "600"))
+
+log = logging.getLogger(__name__)
+
+
+def _files_signature(paths: tuple[Path, ...]) -> tuple[tuple[int, int], ...]:
+    signature = []
+    for path in paths:
+        try:
+            st = path.stat()
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((0, -1))
+    return tuple(signature)
+
+
+class ServerProfileCache:
+    """Single-flight cache around a ``loader() -> dict[str, str]``; copies are handed out."""
+
+    def __init__(
+        self,
+        loader: Callable[[], dict[str, str]],
+        *,
+        ttl: float = SERVER_PROFILE_TTL_SEC,
+        watch: Iterable[Path] = (),
+        name: str = "server profile",
+    ):
+        self._loader = loader
+        self._ttl = max(0.0, float(ttl))
+        self._watch = tuple(Path(path) for path in watch)
+        self._name = name
+        self._lock = threading.Lock()
+        self._profile: dict[str, str] | None = None
+        self._loaded_at = 0.0
+        self._signature: tuple[tuple[int, int], ...] = ()
+        self._generation = 0
+
+    @property
+    def loaded_at(self) -> float:
+        """time.time() of the cached profile (0 when nothing is cached)."""
+        return self._loaded_at
+
+    def get(self) -> dict[str, str]:
+        profile = self._profile
+        if profile is not None and not self._expired():
+            return dict(profile)
+        with self._lock:
+            if self._profile is not None and not self._expired():
+                return dict(self._profile)
+            generation = self._generation
+            signature = _files_signature(self._watch)
+            try:
+                profile = dict(self._loader())
+            except Exception as exc:
+                if self._profile is None:
+                    raise
+                log.warning("%s reload failed, serving cached copy: %s", self._name, exc)
+                return dict(self._profile)
+            if generation == self._generation:
+                self._store(profile, signature)
+            return dict(profile)
+
+    def put(self, profile: dict[str, str]) -> None:
+        """Store a profile obtained elsewhere (restarts the TTL)."""
+        with self._lock:
+            self._generation += 1
+            self._store(dict(profile), _files_signature(self._watch))
+
+    def invalidate(self) -> None:
+        """Drop the cached profile; the next get() reloads it."""
+        with self._lock:
+            self._generation += 1
+            self._profile = None
+            self._loaded_at = 0.0
+
+    def _store(self, profile: dict[str, str], signature: tuple[tuple[int, int], ...]) -> None:
+        self._profile = profile
+        self._loaded_at = time.time()
+        self._signature = signature
+
+    def _expired(self) -> bool:
+        if time.time() - self._loaded_at >= self._ttl:
+            return True
+        return bool(self._watch) and _files_signature(self._watch) != self._signature
@@ -0,0 +1,164 @@
+"""Parsing of `wg/awg show <iface> dump` output into indexed peer snapshots.
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple
+
+WG_DUMP_IFACE_CANDIDATES = ("awg1", "awg0", "wg1", "wg0")
+
+
+def split_dump_line(line: str) -> list[str]:
+    """Split `wg/awg show ... dump` line (tab or space separated)."""
+    return [p for p in re.split(r"\s+", line.strip()) if p]
+
+
+def build_dump_cmd() -> str:
+    """Build remote shell command that concatenates dumps from known WG/AWG interfaces."""
+    iface_list = " ".join(WG_DUMP_IFACE_CANDIDATES)
+    return (
+        f"for IFACE in {iface_list}; do "
+        "DUMP=$(sudo -n awg show \"$IFACE\" dump 2>/dev/null || "
+        "sudo -n wg show \"$IFACE\" dump 2>/dev/null || "
+        "awg show \"$IFACE\" dump 2>/dev/null || "
+        "wg show \"$IFACE\" dump 2>/dev/null || true); "
+        "[ -n \"$DUMP\" ] && printf '#iface %s\\n%s\\n' \"$IFACE\" \"$DUMP\"; "
+        "done; true"
+    )
+
+
+def extract_peer_ip(allowed_ips: str) -> str | None:
+    """Extract first IPv4 from AllowedIPs string."""
+    if not allowed_ips:
+        return None
+    m = re.search(r"(\d{1,3}(?:\.\d{1,3}){3})(?:/\d{1,2})?", allowed_ips)
+    return m.group(1) if m else None
+
+
+def parse_dump_peers(dump: str) -> list[dict[str, Any]]:
+    """
+    Parse concatenated `wg/awg show <iface> dump` output.
+
+    Notes:
+      - We skip interface rows by requiring CIDR in the allowed-ips column.
+      - Duplicates can appear when querying multiple interface names; dedupe by
+        (public_key, allowed_ips, endpoint).
+      - `#iface <name>` marker lines (see build_dump_cmd) set the
+        "interface" field of the following peers.
+    """
+    now = int(time.time())
+    peers_data: list[dict[str, Any]] = []
+    seen: set[tuple[str, str, str]] = set()
+    iface: str | None = None
+    for line in dump.strip().splitlines():
+        if line.startswith("#iface "):
+            iface = line[7:].strip() or None
+            continue
+        parts = split_dump_line(line)
+        if len(parts) < 7:
+            continue
+        pub_key = parts[0]
+        preshared = parts[1] if len(parts) > 1 else ""
+        endpoint = parts[2] if len(parts) > 2 else ""
+        allowed_ips = parts[3] if len(parts) > 3 else ""
+        # Interface row doesn't contain AllowedIPs CIDR (peer row does).
+        if "/" not in allowed_ips:
+            continue
+
+        dedupe_key = (pub_key, allowed_ips, endpoint)
+        if dedupe_key in seen:
+            continue
+        seen.add(dedupe_key)
+
+        peer_ip = extract_peer_ip(allowed_ips)
+        try:
+            latest_handshake = int(parts[4]) if len(parts) > 4 and parts[4] and parts[4] != "0" else 0
+        except (ValueError, TypeError):
+            latest_handshake = 0
+        try:
+            rx_bytes = int(parts[5]) if len(parts) > 5 and parts[5] else 0
+        except (ValueError, TypeError):
+            rx_bytes = 0
+        try:
+            tx_bytes = int(parts[6]) if len(parts) > 6 and parts[6] else 0
+        except (ValueError, TypeError):
+            tx_bytes = 0
+        keepalive = parts[7] if len(parts) > 7 else ""
+
+        handshake_age = now - latest_handshake if latest_handshake > 0 else None
+        peers_data.append({
+            "interface": iface,
+            "public_key": pub_key,
+            "preshared_key": preshared,
+            "endpoint": endpoint,
+            "allowed_ips": allowed_ips,
+            "peer_ip": peer_ip,
+            "latest_handshake": latest_handshake,
+            "handshake_age_sec": handshake_age,
+            "rx_bytes": rx_bytes,
+            "tx_bytes": tx_bytes,
+            "persistent_keepalive": keepalive,
+        })
+    return peers_data
+
+
+def normalize_lookup_key(value: Any) -> str:
+    """Normalize lookup keys (IP/public key) from DB/monitoring payload."""
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def prefer_new_peer_data(new_data: dict[str, Any], old_data: dict[str, Any] | None) -> bool:
+    """
+    Decide whether new peer metrics should replace existing metrics in index.
+
+    Prefer the row with newer/latest handshake; if handshakes are equal or absent,
+    prefer the row with larger traffic counters.
+    """
+    if old_data is None:
+        return True
+    old_hs = int(old_data.get("latest_handshake") or 0)
+    new_hs = int(new_data.get("latest_handshake") or 0)
+    if new_hs != old_hs:
+        return new_hs > old_hs
+    old_traffic = int(old_data.get("rx_bytes") or 0) + int(old_data.get("tx_bytes") or 0)
+    new_traffic = int(new_data.get("rx_bytes") or 0) + int(new_data.get("tx_bytes") or 0)
+    return new_traffic >= old_traffic
+
+
+class PeerMetricsSnapshot(NamedTuple):
+    """Immutable result of one wg dump poll; replaced wholesale, never mutated."""
+
+    ts: float
+    peers: tuple[dict[str, Any], ...]
+    by_ip: Mapping[str, dict[str, Any]]
+    by_pub: Mapping[str, dict[str, Any]]
+    error: str | None = None
+
+    def lookup(self, public_key: Any, ip: Any) -> dict[str, Any] | None:
+        """Runtime row for a DB/config peer: tunnel IP first, then public key."""
+        return self.by_ip.get(normalize_lookup_key(ip)) or self.by_pub.get(normalize_lookup_key(public_key))
+
+
+EMPTY_PEER_METRICS = PeerMetricsSnapshot(0.0, (), MappingProxyType({}), MappingProxyType({}))
+
+
+def build_peer_metrics_snapshot(peers: list[dict[str, Any]]) -> PeerMetricsSnapshot:
+    """Index parsed dump rows by IP and public key (best row wins on duplicates)."""
+    by_ip: dict[str, dict] = {}
+    by_pub: dict[str, dict] = {}
+    for peer in peers:
+        public_key = normalize_lookup_key(peer.get("public_key"))
+        peer_ip = normalize_lookup_key(peer.get("peer_ip"))
+        if public_key and prefer_new_peer_data(peer, by_pub.get(public_key)):
+            by_pub[public_key] = peer
+        if peer_ip and prefer_new_peer_data(peer, by_ip.get(peer_ip)):
+            by_ip[peer_ip] = peer
+    return PeerMetricsSnapshot(time.time(), tuple(peers), MappingProxyType(by_ip), MappingProxyType(by_pub))
@@ -0,0 +1,159 @@
+"""In-process WireGuard/AmneziaWG key generation (X25519 keypair + preshared key).
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library (``cryptography`` is used when available).
+Keys are returned in the standard WireGuard base64 encoding, identical to
+``awg genkey`` / ``awg pubkey`` / ``awg genpsk`` output.
+"""
+
+from __future__ import annotations
+
+import base64
+import collections
+from dataclasses import dataclass
+import os
+import secrets
+import threading
+
+try:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+except ImportError:  # pragma: no cover - cryptography ships with paramiko/bcrypt envs
+    X25519PrivateKey = None
+
+KEY_LEN = 32
+KEY_POOL_SIZE = int(os.environ.get("WG_KEY_POOL_SIZE", "0"))
+
+
+@dataclass(frozen=True)
+class PeerKeys:
+    private_key: str
+    public_key: str
+    preshared_key: str
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _clamp(raw: bytes) -> bytes:
+    key = bytearray(raw)
+    key[0] &= 248
+    key[31] &= 127
+    key[31] |= 64
+    return bytes(key)
+
+
+def _x25519_base(scalar_bytes: bytes) -> bytes:
+    """Pure-Python RFC 7748 scalar multiplication by the base point (u=9)."""
+    p = 2**255 - 19
+    a24 = 121665
+    k = int.from_bytes(_clamp(scalar_bytes), "little")
+    x1 = 9
+    x2, z2 = 1, 0
+    x3, z3 = 9, 1
+    swap = 0
+    for t in range(254, -1, -1):
+        k_t = (k >> t) & 1
+        swap ^= k_t
+        if swap:
+            x2, x3 = x3, x2
+            z2, z3 = z3, z2
+        swap = k_t
+
+        a = (x2 + z2) % p
+        aa = (a * a) % p
+        b = (x2 - z2) % p
+        bb = (b * b) % p
+        e = (aa - bb) % p
+        c = (x3 + z3) % p
+        d = (x3 - z3) % p
+        da = (d * a) % p
+        cb = (c * b) % p
+        x3 = ((da + cb) ** 2) % p
+        z3 = (x1 * ((da - cb) ** 2)) % p
+        x2 = (aa * bb) % p
+        z2 = (e * (aa + a24 * e)) % p
+
+    if swap:
+        x2, x3 = x3, x2
+        z2, z3 = z3, z2
+    return ((x2 * pow(z2, p - 2, p)) % p).to_bytes(KEY_LEN, "little")
+
+
+def public_key_from_private(private_key: str) -> str:
+    """Derive the base64 public key from a base64 private key (``awg pubkey``)."""
+    raw = base64.b64decode(private_key.strip())
+    if len(raw) != KEY_LEN:
+        raise ValueError("private key must be 32 bytes")
+    if X25519PrivateKey is not None:
+        pub = X25519PrivateKey.from_private_bytes(raw).public_key().public_bytes(
+            encoding=serialization.Encoding.Raw,
+            format=serialization.PublicFormat.Raw,
+        )
+        return _b64(pub)
+    return _b64(_x25519_base(raw))
+
+
+def generate_keypair() -> tuple[str, str]:
+    """Return (private_key, public_key) in WireGuard base64 encoding."""
+    private_key = _b64(_clamp(secrets.token_bytes(KEY_LEN)))
+    return private_key, public_key_from_private(private_key)
+
+
+def generate_preshared_key() -> str:
+    """Return a random 32-byte preshared key (``awg genpsk``)."""
+    return _b64(secrets.token_bytes(KEY_LEN))
+
+
+def _new_peer_keys() -> PeerKeys:
+    private_key, public_key = generate_keypair()
+    return PeerKeys(private_key=private_key, public_key=public_key, preshared_key=generate_preshared_key())
+
+
+class KeyPool:
+    """Pre-generated peer key material, refilled by a background thread.
+
+    ``take()`` never blocks on the refill thread: when the pool is drained
+    keys are generated inline, so the pool only smooths out bursts.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._size = max(0, size)
+        self._low_watermark = self._size // 2
+        self._items: collections.deque[PeerKeys] = collections.deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._refill_loop, name="wg-key-pool", daemon=True)
+            self._thread.start()
+
+    def _refill_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            while len(self._items) < self._size:
+                keys = _new_peer_keys()
+                with self._lock:
+                    self._items.append(keys)
+            self._wakeup.wait()
+
+    def take(self) -> PeerKeys:
+        if self._size == 0:
+            return _new_peer_keys()
+        with self._lock:
+            self._ensure_thread()
+            keys = self._items.popleft() if self._items else None
+            if len(self._items) <= self._low_watermark:
+                self._wakeup.set()
+        return keys or _new_peer_keys()
+
+
+_pool = KeyPool(KEY_POOL_SIZE)
+
+
+def generate_peer_keys() -> PeerKeys:
+    """Return a fresh keypair + PSK, taken from the pre-generated pool when enabled."""
+    return _pool.take()
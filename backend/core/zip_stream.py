@@ -0,0 +1,99 @@
+"""Streaming ZIP writer and an ordered, bounded worker pool for bulk exports.
+
+Used by both the FastAPI backend and scripts/admin/admin-server.py, so it must
+depend only on the standard library.
+
+``stream_zip`` writes entries through zipfile into an unseekable sink and
+yields the produced bytes after every entry, so only the current entry is
+held in memory. ``render_ordered`` renders items on a thread pool while
+keeping at most ``window`` results in flight, in input order.
+"""
+
+from __future__ import annotations
+
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
+import io
+import os
+import time
+from typing import Callable, Iterable, Iterator, TypeVar
+import zipfile
+
+EXPORT_WORKERS = max(1, int(os.environ.get("EXPORT_WORKERS", str(min(8, os.cpu_count() or 1)))))
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Already compressed formats are stored as is.
+_STORED_SUFFIXES = (".png", ".zip", ".gz")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file object that hands written bytes back via ``drain()``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``(name, data)`` entries chunk by chunk."""
+    sink = _ChunkSink()
+    date_time = time.localtime()[:6]
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.compress_type = zipfile.ZIP_STORED if name.lower().endswith(_STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            info.external_attr = 0o600 << 16
+            archive.writestr(info, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def render_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    workers: int = EXPORT_WORKERS,
+    window: int | None = None,
+) -> Iterator[tuple[T, Future]]:
+    """Run ``func`` over ``items`` on a thread pool; yield ``(item, future)`` in input order.
+
+    At most ``window`` (default ``4 * workers``) items are submitted ahead of the
+    consumer, so a slow client throttles rendering instead of piling up results.
+    Errors stay in the futures; the caller decides whether to skip or abort.
+    """
+    window = max(1, window or 4 * workers)
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="export")
+    pending: collections.deque[tuple[T, Future]] = collections.deque()
+    try:
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) >= window:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
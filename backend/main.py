@@ -12,7 +12,14 @@ from backend.api.routes.admin_compat import router as admin_compat_router
 from backend.api.routes.health import router as health_router
 from backend.api.routes.v1.admin import router as admin_router
 from backend.api.routes.v1.meta import router as meta_router
-from backend.api.routes.v1.peers_monitoring import router as peers_monitoring_router
+from backend.api.routes.v1.peers_monitoring import (
+    router as peers_monitoring_router,
+    install_server_profile_reload,
+    start_monitor_push_listener,
+    start_peer_monitor,
+    stop_monitor_push_listener,
+    stop_peer_monitor,
+)
 from backend.core.config import get_settings
 
 
@@ -40,8 +47,12 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Жизненный цикл приложения."""
+    start_monitor_push_listener()
+    install_server_profile_reload()
+    await start_peer_monitor()
     yield
-    # Shutdown hooks при необходимости
+    await stop_peer_monitor()
+    stop_monitor_push_listener()
 
 
 def create_app() -> FastAPI:
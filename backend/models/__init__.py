@@ -3,6 +3,7 @@
 from backend.models.audit_log import AuditLog
 from backend.models.billing import PaymentWebhookEvent, Promocode, TrialActivation
 from backend.models.enums import PlanKind, PromocodeKind, RoleEnum, SubscriptionStatus, TransactionStatus
+from backend.models.ip_pool import IpPool
 from backend.models.notifications import (
     BroadcastCampaign,
     NotificationEvent,
@@ -14,10 +15,12 @@ from backend.models.peer_device import PeerDevice
 from backend.models.setting import Setting
 from backend.models.subscription import Subscription, Transaction
 from backend.models.telegram_profile import TelegramProfile
+from backend.models.traffic import PeerTrafficUsage
 from backend.models.user import User
 
 __all__ = [
     "AuditLog",
+    "IpPool",
     "PaymentWebhookEvent",
     "Plan",
     "PlanKind",
@@ -29,6 +32,7 @@ __all__ = [
     "WorkerJobRun",
     "WorkerDeadLetter",
     "PeerDevice",
+    "PeerTrafficUsage",
     "RoleEnum",
     "Setting",
     "Subscription",
@@ -0,0 +1,24 @@
+"""Модель ip_pools — битовая карта занятых адресов пула peer (один CIDR — одна строка)."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.db.session import Base
+
+
+class IpPool(Base):
+    """Пул адресов peer: bitmap (бит = адрес, 1 — занят), курсор next_hint и число свободных.
+
+    Выделение и освобождение идут под SELECT ... FOR UPDATE этой строки
+    (см. backend/services/ip_pool_service.py), формат bitmap — backend/core/ip_pool.py.
+    """
+
+    __tablename__ = "ip_pools"
+
+    cidr: Mapped[str] = mapped_column(String(43), primary_key=True)
+    bitmap: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    next_hint: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    free_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
@@ -34,6 +34,9 @@ class NotificationEvent(Base):
     sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # Аренда записи worker-ом на время отправки; истёкшая аренда снова доступна другим worker-ам.
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    locked_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
 
 
 class BroadcastCampaign(Base):
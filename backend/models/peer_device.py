@@ -18,7 +18,7 @@ class PeerDevice(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     ip: Mapped[str] = mapped_column(String(45), unique=True, nullable=False, index=True)
     type: Mapped[str] = mapped_column(String(64), default="phone", nullable=False)
-    public_key: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    public_key: Mapped[Optional[str]] = mapped_column(Text, nullable=True, index=True)
     private_key: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     config_file: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     status: Mapped[str] = mapped_column(String(32), default="active", nullable=False)
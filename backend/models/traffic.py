@@ -0,0 +1,27 @@
+"""Модель peer_traffic_usage — учёт трафика peer за расчётный период."""
+
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, PrimaryKeyConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.db.session import Base
+
+
+class PeerTrafficUsage(Base):
+    """Накопленный трафик peer за период (месяц) + последние сырые счётчики wg dump.
+
+    rx_bytes/tx_bytes растут монотонно: дельта считается от last_*_counter,
+    сброс счётчика (перезапуск интерфейса) учитывается как новый отсчёт с нуля.
+    """
+
+    __tablename__ = "peer_traffic_usage"
+    __table_args__ = (PrimaryKeyConstraint("peer_id", "period_start", name="pk_peer_traffic_usage"),)
+
+    peer_id: Mapped[int] = mapped_column(ForeignKey("peers_devices.id", ondelete="CASCADE"), nullable=False)
+    period_start: Mapped[date] = mapped_column(Date, nullable=False)
+    rx_bytes: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    tx_bytes: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    last_rx_counter: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    last_tx_counter: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
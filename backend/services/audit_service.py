@@ -1,8 +1,9 @@
 """Сервис аудита доменных событий."""
 
 import json
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from backend.models.audit_log import AuditLog
@@ -29,3 +30,22 @@ def write_audit_event(
             ip_address=ip_address,
         )
     )
+
+
+def write_audit_events(session: Session, events: Iterable[dict[str, Any]]) -> int:
+    """Записывает пачку audit-событий одним INSERT (ключи как у write_audit_event)."""
+    rows = []
+    for event in events:
+        details = event.get("details")
+        rows.append(
+            {
+                "user_id": event.get("user_id"),
+                "action": event["action"],
+                "target": event.get("target"),
+                "details": json.dumps(details, ensure_ascii=False, sort_keys=True) if details is not None else None,
+                "ip_address": event.get("ip_address"),
+            }
+        )
+    if rows:
+        session.execute(insert(AuditLog), rows)
+    return len(rows)
@@ -7,21 +7,8 @@ from datetime import datetime, timedelta
 import enum
 import json
 import logging
-import urllib.error
-import urllib.request
 from typing import Any, Optional
 
-def mask_token(token: str) -> str:
-    """Mask a security token for safe logging.
-
-    Shows only first 5 and last 4 characters.
-    Example: "83475123456B1w" -> "83475...B1w"
-    """
-    if not token or len(token) < 10:
-        return "***"
-    return f"{token[:5]}...{token[-4:]}"
-
-
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session, selectinload
 
@@ -50,6 +37,7 @@ from backend.models.telegram_profile import TelegramProfile
 from backend.models.user import User
 from backend.services.audit_service import write_audit_event
 from backend.services.billing_service import BillingService, build_billing_service
+from backend.services.telegram_client import TelegramBotClient, shared_client
 
 logger = logging.getLogger(__name__)
 
@@ -73,11 +61,27 @@ class TelegramIdentity:
 
 
 class TelegramGateway:
-    """Отправка ответов через Telegram Bot API."""
+    """Отправка ответов через Telegram Bot API (общий keep-alive клиент процесса)."""
 
-    def __init__(self, token: Optional[str], outbound_enabled: bool) -> None:
+    def __init__(
+        self,
+        token: Optional[str],
+        outbound_enabled: bool,
+        client: TelegramBotClient | None = None,
+    ) -> None:
         self._token = token
         self._outbound_enabled = outbound_enabled
+        self._client = client
+        if self._client is None and token and outbound_enabled:
+            settings = get_settings()
+            self._client = shared_client(
+                token,
+                base_url=settings.TELEGRAM_API_BASE_URL,
+                pool_size=settings.TELEGRAM_API_POOL_SIZE,
+                timeout=settings.TELEGRAM_API_TIMEOUT_SEC,
+                global_rate=settings.TELEGRAM_RATE_GLOBAL_PER_SEC,
+                per_chat_rate=settings.TELEGRAM_RATE_PER_CHAT_PER_SEC,
+            )
 
     def send_message(
         self,
@@ -93,31 +97,16 @@ class TelegramGateway:
                 bool(reply_markup),
             )
             return True
-        if not self._token:
+        if self._client is None:
             logger.warning("TELEGRAM_BOT_TOKEN is empty, message dropped chat_id=%s", chat_id)
             return False
-        payload_obj: dict[str, Any] = {"chat_id": chat_id, "text": text}
-        if reply_markup is not None:
-            payload_obj["reply_markup"] = reply_markup
-        payload = json.dumps(payload_obj).encode("utf-8")
-        masked_token = mask_token(self._token)
-        url = f"https://api.telegram.org/bot{self._token}/sendMessage"
-        request = urllib.request.Request(
-            url=url,
-            method="POST",
-            data=payload,
-            headers={"Content-Type": "application/json"},
-        )
-        try:
-            with urllib.request.urlopen(request, timeout=10) as response:
-                response.read()
-            return True
-        except urllib.error.HTTPError as exc:
-            logger.error("Telegram send failed token=%s code=%s body=%s", masked_token, exc.code, exc.read())
-            return False
-        except Exception:
-            logger.exception("Telegram send failed token=%s", masked_token)
-            return False
+        return self._client.send_message(chat_id, text, reply_markup=reply_markup)
+
+    def metrics(self) -> dict[str, Any]:
+        """Счётчики отправки и латентность (p50/p95/p99) для мониторинга."""
+        if self._client is None:
+            return {"outbound_enabled": self._outbound_enabled}
+        return {"outbound_enabled": self._outbound_enabled, **self._client.metrics_snapshot()}
 
 
 class BotService:
@@ -171,6 +160,9 @@ class BotService:
             reply_markup=reply.reply_markup,
         )
 
+    def get_transport_metrics(self) -> dict[str, Any]:
+        return self._gateway.metrics()
+
     def process_payment_webhook(
         self,
         session: Session,
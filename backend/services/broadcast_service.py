@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Literal
 
-from sqlalchemy import and_, select
+from sqlalchemy import Select, and_, select
 from sqlalchemy.orm import Session
 
 from backend.models import BroadcastCampaign, Subscription, SubscriptionStatus, TelegramProfile
@@ -15,7 +15,7 @@ BroadcastSegment = Literal["all", "active", "expired"]
 
 
 class BroadcastService:
-    """Creates campaigns and enqueues per-user notification events."""
+    """Creates campaigns; the worker fans them out into per-user notification events."""
 
     def __init__(self, notifications: NotificationsService):
         self._notifications = notifications
@@ -28,6 +28,7 @@ class BroadcastService:
         message: str,
         created_by_user_id: int | None,
     ) -> BroadcastCampaign:
+        """Record a campaign in status ``preparing``; ``fan_out_pending`` enqueues its events."""
         clean_segment = segment.strip().lower()
         if clean_segment not in {"all", "active", "expired"}:
             raise ValueError("unsupported segment")
@@ -38,48 +39,58 @@ class BroadcastService:
         campaign = BroadcastCampaign(
             segment=clean_segment,
             message=clean_message,
-            status="queued",
+            status="preparing",
             created_by_user_id=created_by_user_id,
             created_at=datetime.utcnow(),
         )
         session.add(campaign)
         session.flush()
+        return campaign
 
-        user_ids = self._target_user_ids(session=session, segment=clean_segment)
-        created = 0
-        for user_id in user_ids:
-            dedupe_key = f"broadcast:{campaign.id}:user:{user_id}"
-            item = self._notifications.enqueue_notification(
-                session=session,
-                user_id=user_id,
+    def fan_out_pending(self, session: Session, *, limit: int = 5) -> int:
+        """Enqueue events of ``preparing`` campaigns (worker job); returns how many events were created.
+
+        Campaigns are claimed with SKIP LOCKED, so concurrent workers never fan
+        out the same campaign; dedupe keys make a repeated fan-out a no-op.
+        """
+        campaigns = session.scalars(
+            select(BroadcastCampaign)
+            .where(BroadcastCampaign.status == "preparing")
+            .order_by(BroadcastCampaign.id.asc())
+            .limit(max(1, limit))
+            .with_for_update(skip_locked=True)
+        ).all()
+        created_total = 0
+        for campaign in campaigns:
+            created = self._notifications.enqueue_for_users(
+                session,
+                user_ids=self._target_user_ids(segment=campaign.segment),
                 event_type="broadcast",
-                text=clean_message,
-                dedupe_key=dedupe_key,
+                text=campaign.message,
+                dedupe_prefix=f"broadcast:{campaign.id}:user:",
                 campaign_id=campaign.id,
             )
-            if item is not None:
-                created += 1
-
-        campaign.total_targets = created
-        campaign.status = "queued" if created > 0 else "done"
-        if created == 0:
-            campaign.started_at = datetime.utcnow()
-            campaign.finished_at = campaign.started_at
-        return campaign
+            campaign.total_targets = created
+            campaign.status = "queued" if created > 0 else "done"
+            if created == 0:
+                campaign.started_at = datetime.utcnow()
+                campaign.finished_at = campaign.started_at
+            created_total += created
+        return created_total
 
     def list_campaigns(self, session: Session, limit: int = 100) -> list[BroadcastCampaign]:
         return session.scalars(
             select(BroadcastCampaign).order_by(BroadcastCampaign.id.desc()).limit(max(1, min(limit, 500)))
         ).all()
 
-    def _target_user_ids(self, *, session: Session, segment: str) -> list[int]:
+    def _target_user_ids(self, *, segment: str) -> Select:
+        """SELECT of distinct target user ids for a segment (used inside INSERT ... SELECT)."""
         if segment == "all":
-            rows = session.scalars(select(TelegramProfile.user_id).order_by(TelegramProfile.user_id.asc())).all()
-            return [int(item) for item in rows]
+            return select(TelegramProfile.user_id)
 
         now = datetime.utcnow()
         if segment == "active":
-            rows = session.scalars(
+            return (
                 select(Subscription.user_id)
                 .where(
                     and_(
@@ -88,10 +99,9 @@ class BroadcastService:
                     )
                 )
                 .distinct()
-            ).all()
-            return [int(item) for item in rows]
+            )
 
-        rows = session.scalars(
+        return (
             select(Subscription.user_id)
             .where(
                 and_(
@@ -100,5 +110,4 @@ class BroadcastService:
                 )
             )
             .distinct()
-        ).all()
-        return [int(item) for item in rows]
+        )
@@ -0,0 +1,134 @@
+"""Allocation of peer tunnel IPs from persistent pool bitmaps (ip_pools table)."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.core.ip_pool import IPPool, allocate_from, pool_stats
+from backend.models import IpPool, PeerDevice
+
+
+class IpPoolService:
+    """Reserves, claims and releases peer IPs inside the caller's transaction.
+
+    Every operation locks the configured pool rows with SELECT ... FOR UPDATE
+    (in CIDR order, so concurrent requests cannot deadlock), mutates the
+    bitmaps in memory and writes back only the rows that changed. The lock is
+    held until the request session commits, together with the peer rows, so
+    a rolled back request never leaks a reservation. A pool row missing from
+    the table is built once from peers_devices.
+    """
+
+    def __init__(self, cidrs: Sequence[str]):
+        self._cidrs = list(cidrs)
+
+    @property
+    def cidrs(self) -> list[str]:
+        """Configured pools in allocation order."""
+        return list(self._cidrs)
+
+    def allocate(self, session: Session, count: int) -> list[str]:
+        """Reserve up to ``count`` free IPs.
+
+        An address the bitmap considered free but a peers_devices row already
+        holds (e.g. inserted by a migration) stays marked and is skipped.
+        """
+        if count <= 0:
+            return []
+        rows, pools = self._lock(session)
+        taken: list[str] = []
+        while len(taken) < count:
+            batch = allocate_from(pools, count - len(taken))
+            if not batch:
+                break
+            used = set(session.scalars(select(PeerDevice.ip).where(PeerDevice.ip.in_(batch))))
+            taken.extend(ip for ip in batch if ip not in used)
+        self._store(rows, pools)
+        return taken
+
+    def release(self, session: Session, ips: Iterable[str]) -> None:
+        ips = list(ips)
+        if not ips:
+            return
+        rows, pools = self._lock(session)
+        for pool in pools:
+            pool.release(ips)
+        self._store(rows, pools)
+
+    def claim(self, session: Session, ips: Iterable[str]) -> None:
+        ips = list(ips)
+        if not ips:
+            return
+        rows, pools = self._lock(session)
+        for pool in pools:
+            pool.mark(ips)
+        self._store(rows, pools)
+
+    def stats(self, session: Session) -> dict[str, Any]:
+        rows = {row.cidr: row for row in session.scalars(select(IpPool).where(IpPool.cidr.in_(self._cidrs)))}
+        used_ips: list[str] | None = None
+        pools: list[IPPool] = []
+        for cidr in self._cidrs:
+            row = rows.get(cidr)
+            if row is not None:
+                pools.append(IPPool(cidr, row.bitmap, row.next_hint))
+                continue
+            if used_ips is None:
+                used_ips = list(session.scalars(select(PeerDevice.ip)))
+            pools.append(IPPool.from_used(cidr, used_ips))
+        return pool_stats(pools)
+
+    def _lock(self, session: Session) -> tuple[dict[str, IpPool], list[IPPool]]:
+        rows = self._locked_rows(session)
+        if len(rows) < len(self._cidrs):
+            self._bootstrap(session, [cidr for cidr in self._cidrs if cidr not in rows])
+            rows = self._locked_rows(session)
+        pools = [IPPool(cidr, rows[cidr].bitmap, rows[cidr].next_hint) for cidr in self._cidrs]
+        return rows, pools
+
+    def _locked_rows(self, session: Session) -> dict[str, IpPool]:
+        stmt = (
+            select(IpPool)
+            .where(IpPool.cidr.in_(self._cidrs))
+            .order_by(IpPool.cidr)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return {row.cidr: row for row in session.scalars(stmt)}
+
+    @staticmethod
+    def _bootstrap(session: Session, cidrs: list[str]) -> None:
+        used_ips = list(session.scalars(select(PeerDevice.ip)))
+        for cidr in cidrs:
+            pool = IPPool.from_used(cidr, used_ips)
+            try:
+                # A concurrent request may create the same row first: keep its copy.
+                with session.begin_nested():
+                    session.add(
+                        IpPool(
+                            cidr=pool.cidr,
+                            bitmap=pool.bitmap,
+                            next_hint=pool.next_hint,
+                            free_count=pool.free,
+                            updated_at=datetime.utcnow(),
+                        )
+                    )
+            except IntegrityError:
+                pass
+
+    @staticmethod
+    def _store(rows: dict[str, IpPool], pools: list[IPPool]) -> None:
+        now = datetime.utcnow()
+        for pool in pools:
+            row = rows[pool.cidr]
+            bitmap = pool.bitmap
+            if bitmap != row.bitmap or pool.next_hint != row.next_hint:
+                row.bitmap = bitmap
+                row.next_hint = pool.next_hint
+                row.free_count = pool.free
+                row.updated_at = now
@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
+import os
+import socket
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
-from sqlalchemy import and_, func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, Integer, Select, String, Text, and_, case, cast, exists, func, literal, or_, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
 
 from backend.core.config import get_settings
 from backend.models import (
@@ -19,12 +25,29 @@ from backend.models import (
     SubscriptionStatus,
     TelegramProfile,
 )
-from backend.services.audit_service import write_audit_event
+from backend.services.audit_service import write_audit_events
 from backend.services.bot_service import TelegramGateway
 from backend.services.worker_metrics_service import push_dlq
 
 logger = logging.getLogger(__name__)
 
+OUTSTANDING_STATUSES = ("pending", "retry")
+# Rows per multi-row INSERT: 12 bound parameters each, 12,000 per statement.
+ENQUEUE_CHUNK_SIZE = 1000
+# Bound parameters per statement the drivers accept: 65,535 on Postgres (wire
+# protocol), 32,766 on SQLite >= 3.32 (local harnesses); chunks are capped to it.
+ENQUEUE_MAX_BOUND_PARAMS = 32766
+
+
+@dataclass(frozen=True)
+class NotificationItem:
+    user_id: int
+    event_type: str
+    text: str
+    dedupe_key: str
+    subscription_id: Optional[int] = None
+    campaign_id: Optional[int] = None
+
 
 @dataclass
 class QueueCounters:
@@ -40,40 +63,114 @@ class NotificationsService:
     def __init__(self, gateway: TelegramGateway):
         self._gateway = gateway
         self._settings = get_settings()
+        self._concurrency = max(1, int(self._settings.WORKER_DELIVERY_CONCURRENCY))
+        # Created on first delivery: API processes that only enqueue never start send threads.
+        self._send_pool: ThreadPoolExecutor | None = None
+        self._send_pool_lock = threading.Lock()
+        self._worker_id = f"{socket.gethostname()}:{os.getpid()}"[:128]
+
+    def _outbox_insert(self, session: Session):
+        """INSERT into notification_events that skips rows whose dedupe_key already exists.
+
+        Postgres in production, SQLite in the local test harnesses; both support
+        ON CONFLICT DO NOTHING.
+        """
+        insert_fn = sqlite_insert if session.get_bind().dialect.name == "sqlite" else pg_insert
+        return insert_fn(NotificationEvent.__table__)
 
-    def enqueue_notification(
+    def enqueue_notifications(self, session: Session, items: Iterable[NotificationItem]) -> int:
+        """Enqueue a batch with multi-row INSERT ... ON CONFLICT (dedupe_key) DO NOTHING.
+
+        Items whose dedupe_key is already queued (or repeats within the batch)
+        are skipped. Returns how many events were created.
+        """
+        now = datetime.utcnow()
+        max_attempts = max(1, int(self._settings.WORKER_MAX_RETRIES))
+        rows: dict[str, dict[str, Any]] = {}
+        for item in items:
+            rows.setdefault(
+                item.dedupe_key,
+                {
+                    "user_id": item.user_id,
+                    "subscription_id": item.subscription_id,
+                    "campaign_id": item.campaign_id,
+                    "event_type": item.event_type,
+                    "channel": "telegram",
+                    "dedupe_key": item.dedupe_key,
+                    "payload": json.dumps({"text": item.text}, ensure_ascii=False),
+                    "status": "pending",
+                    "attempts": 0,
+                    "max_attempts": max_attempts,
+                    "next_retry_at": now,
+                    "created_at": now,
+                },
+            )
+        values = list(rows.values())
+        if not values:
+            return 0
+        chunk_size = max(1, min(ENQUEUE_CHUNK_SIZE, ENQUEUE_MAX_BOUND_PARAMS // len(values[0])))
+        created = 0
+        for start in range(0, len(values), chunk_size):
+            stmt = (
+                self._outbox_insert(session)
+                .values(values[start : start + chunk_size])
+                .on_conflict_do_nothing(index_elements=["dedupe_key"])
+            )
+            created += int(session.execute(stmt).rowcount or 0)
+        return created
+
+    def enqueue_for_users(
         self,
         session: Session,
         *,
-        user_id: int,
+        user_ids: Select,
         event_type: str,
         text: str,
-        dedupe_key: str,
-        subscription_id: Optional[int] = None,
+        dedupe_prefix: str,
         campaign_id: Optional[int] = None,
-    ) -> Optional[NotificationEvent]:
-        exists = session.scalar(
-            select(NotificationEvent.id).where(NotificationEvent.dedupe_key == dedupe_key)
-        )
-        if exists is not None:
-            return None
+    ) -> int:
+        """Enqueue one message for every user id selected by ``user_ids`` in a single INSERT ... SELECT.
 
-        max_attempts = max(1, int(self._settings.WORKER_MAX_RETRIES))
-        event = NotificationEvent(
-            user_id=user_id,
-            subscription_id=subscription_id,
-            campaign_id=campaign_id,
-            event_type=event_type,
-            channel="telegram",
-            dedupe_key=dedupe_key,
-            payload=json.dumps({"text": text}, ensure_ascii=False),
-            status="pending",
-            attempts=0,
-            max_attempts=max_attempts,
-            next_retry_at=datetime.utcnow(),
+        Dedupe keys are ``{dedupe_prefix}{user_id}``; users that already have
+        theirs are skipped. Returns how many events were created.
+        """
+        now = datetime.utcnow()
+        target = user_ids.subquery()
+        user_id = target.c[0]
+        rows = select(
+            user_id,
+            literal(campaign_id, Integer),
+            literal(event_type, String),
+            literal("telegram", String),
+            literal(dedupe_prefix, String) + cast(user_id, String),
+            literal(json.dumps({"text": text}, ensure_ascii=False), Text),
+            literal("pending", String),
+            literal(0, Integer),
+            literal(max(1, int(self._settings.WORKER_MAX_RETRIES)), Integer),
+            literal(now, DateTime(timezone=True)),
+            literal(now, DateTime(timezone=True)),
+        ).select_from(target).where(true())  # SQLite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT
+        stmt = (
+            self._outbox_insert(session)
+            .from_select(
+                [
+                    "user_id",
+                    "campaign_id",
+                    "event_type",
+                    "channel",
+                    "dedupe_key",
+                    "payload",
+                    "status",
+                    "attempts",
+                    "max_attempts",
+                    "next_retry_at",
+                    "created_at",
+                ],
+                rows,
+            )
+            .on_conflict_do_nothing(index_elements=["dedupe_key"])
         )
-        session.add(event)
-        return event
+        return int(session.execute(stmt).rowcount or 0)
 
     def enqueue_expiration_notifications(self, session: Session, days_before: int) -> int:
         now = datetime.utcnow()
@@ -92,23 +189,22 @@ class NotificationsService:
             .order_by(Subscription.id.asc())
         ).all()
 
-        created = 0
-        for sub_id, user_id, expires_at in rows:
-            dedupe_key = f"expiring:{sub_id}:d{days_before}"
-            text = (
-                f"Напоминание: подписка истекает через {days_before} дн. "
-                f"(до {expires_at:%Y-%m-%d}). Продлите тариф заранее."
-            )
-            if self.enqueue_notification(
-                session=session,
-                user_id=int(user_id),
-                event_type="subscription_expiring",
-                text=text,
-                dedupe_key=dedupe_key,
-                subscription_id=int(sub_id),
-            ):
-                created += 1
-        return created
+        return self.enqueue_notifications(
+            session,
+            (
+                NotificationItem(
+                    user_id=int(user_id),
+                    event_type="subscription_expiring",
+                    text=(
+                        f"Напоминание: подписка истекает через {days_before} дн. "
+                        f"(до {expires_at:%Y-%m-%d}). Продлите тариф заранее."
+                    ),
+                    dedupe_key=f"expiring:{sub_id}:d{days_before}",
+                    subscription_id=int(sub_id),
+                )
+                for sub_id, user_id, expires_at in rows
+            ),
+        )
 
     def enqueue_expired_notifications(self, session: Session) -> int:
         now = datetime.utcnow()
@@ -123,90 +219,185 @@ class NotificationsService:
             .order_by(Subscription.id.asc())
         ).all()
 
-        created = 0
-        for sub_id, user_id, expires_at in rows:
-            dedupe_key = f"expired:{sub_id}"
-            text = (
-                f"Подписка истекла ({expires_at:%Y-%m-%d}). "
-                "Чтобы снова пользоваться VPN, продлите тариф."
-            )
-            if self.enqueue_notification(
-                session=session,
-                user_id=int(user_id),
-                event_type="subscription_expired",
-                text=text,
-                dedupe_key=dedupe_key,
-                subscription_id=int(sub_id),
-            ):
-                created += 1
-        return created
+        return self.enqueue_notifications(
+            session,
+            (
+                NotificationItem(
+                    user_id=int(user_id),
+                    event_type="subscription_expired",
+                    text=(
+                        f"Подписка истекла ({expires_at:%Y-%m-%d}). "
+                        "Чтобы снова пользоваться VPN, продлите тариф."
+                    ),
+                    dedupe_key=f"expired:{sub_id}",
+                    subscription_id=int(sub_id),
+                )
+                for sub_id, user_id, expires_at in rows
+            ),
+        )
 
     def deliver_pending(self, session: Session, *, limit: int = 100) -> QueueCounters:
-        now = datetime.utcnow()
+        """Claim a batch of due events, send it concurrently, then apply all outcomes.
+
+        The claim is committed before sending, so other workers skip these rows
+        and no transaction stays open during Bot API calls; outcomes are written
+        in the caller's transaction.
+        """
+        ids = self._claim_batch(session, limit)
+        counters = QueueCounters(processed=len(ids))
+        if not ids:
+            return counters
+        session.commit()
         rows = session.scalars(
-            select(NotificationEvent)
-            .where(
-                and_(
-                    NotificationEvent.status.in_(("pending", "retry")),
-                    NotificationEvent.next_retry_at <= now,
+            select(NotificationEvent).where(NotificationEvent.id.in_(ids)).order_by(NotificationEvent.id.asc())
+        ).all()
+        chat_ids = dict(
+            session.execute(
+                select(TelegramProfile.user_id, TelegramProfile.chat_id).where(
+                    TelegramProfile.user_id.in_({event.user_id for event in rows})
                 )
+            ).all()
+        )
+        payloads = {event.id: self._safe_payload(event.payload) for event in rows}
+        sendable = [event for event in rows if event.user_id in chat_ids]
+        outcomes = dict(
+            zip(
+                [event.id for event in sendable],
+                self._send_all(
+                    [(chat_ids[event.user_id], payloads[event.id].get("text", "")) for event in sendable]
+                ),
             )
-            .order_by(NotificationEvent.id.asc())
-            .limit(max(1, min(limit, 500)))
-        ).all()
+        )
 
-        counters = QueueCounters(processed=len(rows))
+        sent_ids: list[int] = []
+        audit_rows: list[dict[str, Any]] = []
+        # campaign_id -> [sent, dead] deltas, applied with one UPDATE per campaign.
+        campaign_deltas: dict[int, list[int]] = {}
         for event in rows:
-            payload = self._safe_payload(event.payload)
-            profile = session.scalar(
-                select(TelegramProfile).where(TelegramProfile.user_id == event.user_id)
-            )
-            if profile is None:
-                self._mark_failed(
+            payload = payloads[event.id]
+            delta = campaign_deltas.setdefault(event.campaign_id, [0, 0]) if event.campaign_id is not None else None
+            if event.user_id not in chat_ids:
+                status = self._mark_failed(
                     session=session,
                     event=event,
                     error="telegram profile not found",
                     payload=payload,
                 )
                 counters.errors += 1
-                if event.status == "dead":
+                if status == "dead":
                     counters.dlq += 1
+                    if delta is not None:
+                        delta[1] += 1
                 continue
 
-            ok = self._gateway.send_message(profile.chat_id, payload.get("text", ""))
-            if ok:
-                event.status = "sent"
-                event.sent_at = datetime.utcnow()
-                event.last_error = None
+            if outcomes[event.id]:
+                sent_ids.append(event.id)
                 counters.success += 1
-                write_audit_event(
-                    session=session,
-                    action="notification_sent",
-                    user_id=event.user_id,
-                    target=f"notification:{event.id}",
-                    details={"event_type": event.event_type, "channel": event.channel},
-                    ip_address=None,
+                audit_rows.append(
+                    {
+                        "action": "notification_sent",
+                        "user_id": event.user_id,
+                        "target": f"notification:{event.id}",
+                        "details": {"event_type": event.event_type, "channel": event.channel},
+                    }
                 )
-                self._update_campaign_stats(session=session, campaign_id=event.campaign_id, success=True)
+                if delta is not None:
+                    delta[0] += 1
                 continue
 
-            self._mark_failed(
+            status = self._mark_failed(
                 session=session,
                 event=event,
                 error="telegram send failed",
                 payload=payload,
             )
             counters.errors += 1
-            if event.status == "dead":
+            if status == "dead":
                 counters.dlq += 1
-            self._update_campaign_stats(
-                session=session,
-                campaign_id=event.campaign_id,
-                failed=event.status == "dead",
-            )
+                if delta is not None:
+                    delta[1] += 1
 
+        if sent_ids:
+            result = session.execute(
+                update(NotificationEvent)
+                .where(
+                    and_(
+                        NotificationEvent.id.in_(sent_ids),
+                        NotificationEvent.locked_by == self._worker_id,
+                    )
+                )
+                .values(status="sent", sent_at=datetime.utcnow(), last_error=None, locked_until=None, locked_by=None)
+            )
+            if result.rowcount != len(sent_ids):
+                logger.warning(
+                    "notification lease lost for %s of %s sent events (raise WORKER_DELIVERY_LEASE_SECONDS)",
+                    len(sent_ids) - result.rowcount,
+                    len(sent_ids),
+                )
+        write_audit_events(session, audit_rows)
+        self._apply_campaign_stats(session, campaign_deltas)
         return counters
 
+    def _claim_batch(self, session: Session, limit: int) -> list[int]:
+        """Lease up to ``limit`` due events to this worker (SELECT ... FOR UPDATE SKIP LOCKED).
+
+        Only the oldest outstanding event of each user is eligible, so a user's
+        messages go out in order even across retries and workers. Events whose
+        lease expired (worker crashed mid-batch) are eligible again.
+        """
+        now = datetime.utcnow()
+        earlier = aliased(NotificationEvent)
+        ids = session.scalars(
+            select(NotificationEvent.id)
+            .where(
+                and_(
+                    NotificationEvent.status.in_(OUTSTANDING_STATUSES),
+                    NotificationEvent.next_retry_at <= now,
+                    or_(NotificationEvent.locked_until.is_(None), NotificationEvent.locked_until < now),
+                    ~exists().where(
+                        and_(
+                            earlier.user_id == NotificationEvent.user_id,
+                            earlier.status.in_(OUTSTANDING_STATUSES),
+                            earlier.id < NotificationEvent.id,
+                        )
+                    ),
+                )
+            )
+            .order_by(NotificationEvent.id.asc())
+            .limit(max(1, min(limit, 500)))
+            .with_for_update(skip_locked=True, of=NotificationEvent)
+        ).all()
+        if ids:
+            lease = timedelta(seconds=max(1, int(self._settings.WORKER_DELIVERY_LEASE_SECONDS)))
+            session.execute(
+                update(NotificationEvent)
+                .where(NotificationEvent.id.in_(ids))
+                .values(locked_until=now + lease, locked_by=self._worker_id)
+                .execution_options(synchronize_session=False)
+            )
+        return list(ids)
+
+    def _send_all(self, messages: list[tuple[int, str]]) -> list[bool]:
+        """Send ``(chat_id, text)`` messages on the send pool; results in input order.
+
+        The gateway paces the actual rate (Bot API limits), the pool only keeps
+        enough requests in flight to use it.
+        """
+        if len(messages) <= 1 or self._concurrency <= 1:
+            return [self._send_one(message) for message in messages]
+        with self._send_pool_lock:
+            if self._send_pool is None:
+                self._send_pool = ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix="notify-send")
+        return list(self._send_pool.map(self._send_one, messages))
+
+    def _send_one(self, message: tuple[int, str]) -> bool:
+        chat_id, text = message
+        try:
+            return self._gateway.send_message(chat_id, text)
+        except Exception:
+            logger.exception("notification send failed chat_id=%s", chat_id)
+            return False
+
     def _mark_failed(
         self,
         *,
@@ -214,23 +405,39 @@ class NotificationsService:
         event: NotificationEvent,
         error: str,
         payload: dict[str, Any],
-    ) -> None:
-        event.attempts += 1
-        event.last_error = error
-        if event.attempts >= event.max_attempts:
-            event.status = "dead"
+    ) -> str | None:
+        """Record a failed attempt (retry with backoff, or dead + DLQ) and return the new status.
+
+        Guarded by the lease like the sent path: returns None and changes nothing
+        when the lease expired and another worker has claimed the event.
+        """
+        attempts = event.attempts + 1
+        values: dict[str, Any] = {"attempts": attempts, "last_error": error, "locked_until": None, "locked_by": None}
+        if attempts >= event.max_attempts:
+            values["status"] = "dead"
+        else:
+            values["status"] = "retry"
+            values["next_retry_at"] = datetime.utcnow() + timedelta(seconds=self._compute_backoff_seconds(attempts))
+        result = session.execute(
+            update(NotificationEvent)
+            .where(and_(NotificationEvent.id == event.id, NotificationEvent.locked_by == self._worker_id))
+            .values(**values)
+        )
+        if result.rowcount != 1:
+            logger.warning(
+                "notification lease lost for failed event %s (raise WORKER_DELIVERY_LEASE_SECONDS)", event.id
+            )
+            return None
+        if values["status"] == "dead":
             push_dlq(
                 session=session,
                 task_name="notifications.deliver",
                 item_key=event.dedupe_key,
                 payload=payload,
                 error_message=error,
-                attempts=event.attempts,
+                attempts=attempts,
             )
-            return
-        event.status = "retry"
-        backoff = self._compute_backoff_seconds(event.attempts)
-        event.next_retry_at = datetime.utcnow() + timedelta(seconds=backoff)
+        return values["status"]
 
     def _compute_backoff_seconds(self, attempt: int) -> int:
         base = max(1, int(self._settings.WORKER_RETRY_BASE_SECONDS))
@@ -246,30 +453,32 @@ class NotificationsService:
             logger.warning(f"Failed to parse notification payload: {e}")
         return {}
 
-    def _update_campaign_stats(
-        self,
-        *,
-        session: Session,
-        campaign_id: Optional[int],
-        success: bool = False,
-        failed: bool = False,
-    ) -> None:
-        if campaign_id is None:
-            return
-        campaign = session.get(BroadcastCampaign, campaign_id)
-        if campaign is None:
-            return
-        if campaign.started_at is None:
-            campaign.started_at = datetime.utcnow()
-        if success:
-            campaign.sent_count += 1
-        if failed:
-            campaign.failed_count += 1
-
-        done_count = campaign.sent_count + campaign.failed_count
-        if campaign.total_targets > 0 and done_count >= campaign.total_targets:
-            campaign.status = "done" if campaign.failed_count == 0 else "done_with_errors"
-            campaign.finished_at = datetime.utcnow()
+    def _apply_campaign_stats(self, session: Session, deltas: dict[int, list[int]]) -> None:
+        """Add per-batch sent/failed counts to campaigns and close finished ones (SQL-side, race-free)."""
+        now = datetime.utcnow()
+        for campaign_id, (sent, failed) in deltas.items():
+            sent_count = BroadcastCampaign.sent_count + sent
+            failed_count = BroadcastCampaign.failed_count + failed
+            finished = and_(
+                BroadcastCampaign.finished_at.is_(None),
+                BroadcastCampaign.total_targets > 0,
+                sent_count + failed_count >= BroadcastCampaign.total_targets,
+            )
+            session.execute(
+                update(BroadcastCampaign)
+                .where(BroadcastCampaign.id == campaign_id)
+                .values(
+                    sent_count=sent_count,
+                    failed_count=failed_count,
+                    started_at=func.coalesce(BroadcastCampaign.started_at, now),
+                    status=case(
+                        (finished, case((failed_count == 0, "done"), else_="done_with_errors")),
+                        else_=BroadcastCampaign.status,
+                    ),
+                    finished_at=case((finished, now), else_=BroadcastCampaign.finished_at),
+                )
+                .execution_options(synchronize_session=False)
+            )
 
     def cleanup_stale(self, session: Session) -> dict[str, int]:
         keep_days = max(1, int(self._settings.WORKER_CLEANUP_KEEP_DAYS))
@@ -0,0 +1,247 @@
+"""Background wg dump collector for the backend (asyncio + asyncssh, one persistent connection)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from backend.core.awg_apply import build_apply_cmd, build_apply_request, parse_apply_result
+from backend.core.wg_dump import (
+    EMPTY_PEER_METRICS,
+    PeerMetricsSnapshot,
+    build_dump_cmd,
+    build_peer_metrics_snapshot,
+    parse_dump_peers,
+)
+from backend.db.session import get_session
+from backend.services.traffic_accounting_service import PeerCounterSample, TrafficAccountingService
+
+try:
+    import asyncssh
+except ImportError:  # pragma: no cover - optional runtime dependency
+    asyncssh = None
+
+logger = logging.getLogger(__name__)
+
+SSH_CONNECT_TIMEOUT_SEC = 15
+SSH_COMMAND_TIMEOUT_SEC = 20
+SSH_KEEPALIVE_SEC = 15
+DEFAULT_KNOWN_HOSTS = str(Path.home() / ".ssh" / "known_hosts")
+
+
+@dataclass(frozen=True)
+class SSHTarget:
+    host: str
+    user: str = "root"
+    key_path: Optional[str] = None
+    password: Optional[str] = None
+    known_hosts: str = DEFAULT_KNOWN_HOSTS
+
+
+def resolve_key_path(key_path: Optional[str], project_root: Path) -> Optional[str]:
+    """Try to resolve SSH key path: absolute, project root, or ~/.ssh/ (same order as admin-server)."""
+    if not key_path or not key_path.strip():
+        return None
+    key_path = key_path.strip()
+    expanded = Path(os.path.expanduser(key_path))
+    if expanded.is_file():
+        return str(expanded)
+    candidate = project_root / key_path
+    if candidate.is_file():
+        return str(candidate)
+    home_key = Path.home() / ".ssh" / Path(key_path.replace("\\", "/")).name
+    if home_key.is_file():
+        return str(home_key)
+    return None
+
+
+def _host_is_known(known_hosts: str, host: str) -> bool:
+    """True if known_hosts has a key (or CA) entry for `host`, i.e. the key must be verified."""
+    if not os.path.isfile(known_hosts):
+        return False
+    entries = asyncssh.read_known_hosts(known_hosts)
+    host_keys, ca_keys = asyncssh.match_known_hosts(entries, host, "", None)[:2]
+    return bool(host_keys or ca_keys)
+
+
+def _remember_host_key(known_hosts: str, host: str, key) -> None:
+    """Append the first-seen host key to known_hosts (OpenSSH format)."""
+    if key is None:
+        return
+    key_type, key_data = key.export_public_key("openssh").decode("ascii").split()[:2]
+    try:
+        os.makedirs(os.path.dirname(known_hosts) or ".", mode=0o700, exist_ok=True)
+        with open(known_hosts, "a", encoding="ascii") as f:
+            f.write(f"{host} {key_type} {key_data}\n")
+    except OSError as exc:
+        logger.warning("could not record host key of %s in %s: %s", host, known_hosts, exc)
+        return
+    logger.info("added host key of %s to %s", host, known_hosts)
+
+
+class PeerMonitor:
+    """Polls `awg show <if> dump` on VPS1 every `interval` seconds and keeps the parsed snapshot.
+
+    Request handlers only read `snapshot()` (an immutable, pre-indexed object that
+    is swapped wholesale), so no SSH happens on the request path. Each successful
+    poll also feeds the counters into traffic accounting when `account_traffic`
+    is given (the DB work runs in a thread, off the event loop), and with
+    `enforce_limits` removes live awg1 peers that were disabled for exceeding
+    their traffic limit (by this collector or by the worker) from awg1.
+    """
+
+    def __init__(
+        self,
+        target: SSHTarget,
+        *,
+        interval: float,
+        account_traffic: Optional[TrafficAccountingService] = None,
+        enforce_limits: bool = False,
+    ):
+        self._target = target
+        self._interval = max(1.0, float(interval))
+        self._accounting = account_traffic
+        self._enforce_limits = enforce_limits
+        self._snapshot: PeerMetricsSnapshot = EMPTY_PEER_METRICS
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def snapshot(self) -> PeerMetricsSnapshot:
+        return self._snapshot
+
+    def is_fresh(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot.error is None and time.time() - snapshot.ts <= 2 * self._interval
+
+    def start(self) -> None:
+        if asyncssh is None:
+            self._snapshot = self._snapshot._replace(error="asyncssh is not installed")
+            logger.warning("peer monitor disabled: asyncssh is not installed")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="peer-monitor")
+
+    def refresh(self) -> None:
+        """Ask for an early poll (e.g. after peers changed on awg1)."""
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    async def poll_once(self) -> PeerMetricsSnapshot:
+        """Poll VPS1 once and publish a new snapshot (the previous one is kept on SSH errors)."""
+        try:
+            dump = await self._run_command(build_dump_cmd())
+            snapshot = build_peer_metrics_snapshot(parse_dump_peers(dump))
+        except Exception as exc:
+            logger.debug("peer monitor poll failed: %s", exc)
+            await self._close()
+            snapshot = self._snapshot._replace(error=str(exc) or exc.__class__.__name__)
+        self._snapshot = snapshot
+        if snapshot.error is None and self._accounting is not None:
+            await self._account(snapshot)
+        if snapshot.error is None and self._enforce_limits:
+            await self._enforce_limits_on_awg1(snapshot)
+        return snapshot
+
+    async def _run(self) -> None:
+        while True:
+            await self.poll_once()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _run_command(self, command: str, stdin: Optional[str] = None) -> str:
+        if self._conn is None:
+            self._conn = await asyncio.wait_for(self._connect(), timeout=SSH_CONNECT_TIMEOUT_SEC)
+        result = await self._conn.run(command, input=stdin, check=False, timeout=SSH_COMMAND_TIMEOUT_SEC)
+        return str(result.stdout or "")
+
+    async def _connect(self):
+        target = self._target
+        if not target.host:
+            raise RuntimeError("VPS1_IP is not configured")
+        # accept-new, as admin-server/monitor_collector.py (paramiko AutoAddPolicy over
+        # known_hosts): a host already in known_hosts must present that key, an unknown
+        # host is trusted once and its key is recorded for the next connection.
+        known = _host_is_known(target.known_hosts, target.host)
+        options = {
+            "username": target.user or "root",
+            "known_hosts": target.known_hosts if known else None,
+            "keepalive_interval": SSH_KEEPALIVE_SEC,
+        }
+        if target.key_path:
+            options["client_keys"] = [target.key_path]
+        elif target.password:
+            options["password"] = target.password
+        conn = await asyncssh.connect(target.host, **options)
+        if not known:
+            _remember_host_key(target.known_hosts, target.host, conn.get_server_host_key())
+        return conn
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+            try:
+                await conn.wait_closed()
+            except Exception:
+                pass
+
+    async def _account(self, snapshot: PeerMetricsSnapshot) -> None:
+        samples = [
+            PeerCounterSample(public_key=str(peer["public_key"]), rx_bytes=int(peer["rx_bytes"]), tx_bytes=int(peer["tx_bytes"]))
+            for peer in snapshot.by_pub.values()
+        ]
+        try:
+            await asyncio.to_thread(self._ingest, samples, datetime.utcfromtimestamp(snapshot.ts))
+        except Exception:
+            logger.exception("traffic accounting failed")
+            self._accounting.forget(sample.public_key for sample in samples)
+
+    async def _enforce_limits_on_awg1(self, snapshot: PeerMetricsSnapshot) -> None:
+        live = [str(peer["public_key"]) for peer in snapshot.peers if peer.get("interface") == "awg1"]
+        if not live:
+            return
+        try:
+            over_limit = await asyncio.to_thread(self._over_limit_keys, live, datetime.utcfromtimestamp(snapshot.ts))
+            if not over_limit:
+                return
+            out = await self._run_command(build_apply_cmd(), stdin=build_apply_request([], over_limit))
+            parse_apply_result(out)
+        except Exception:
+            logger.exception("removing over-limit peers from awg1 failed")
+            return
+        logger.warning("removed %d over-limit peers from awg1", len(over_limit))
+        self.refresh()
+
+    @staticmethod
+    def _over_limit_keys(public_keys: list[str], now: datetime) -> list[str]:
+        with get_session() as session:
+            return TrafficAccountingService.over_limit_public_keys(session, public_keys, now=now)
+
+    def _ingest(self, samples: list[PeerCounterSample], sampled_at: datetime) -> None:
+        with get_session() as session:
+            stats = self._accounting.ingest(session, samples, now=sampled_at)
+        if stats.disabled:
+            logger.warning("traffic limit exceeded, peers disabled: %s", stats.disabled_peer_ids)
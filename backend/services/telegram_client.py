@@ -0,0 +1,324 @@
+"""Keep-alive Telegram Bot API client with rate-limit aware scheduling.
+
+All senders of a process (bot replies, payment notices, the notifications
+worker) share one client per bot token: a small pool of persistent HTTP/1.1
+connections to the Bot API (no TCP/TLS handshake per message) and one
+scheduler. The scheduler paces sends with token buckets (global and per
+chat, Telegram allows ~30 msg/s per bot and ~1 msg/s per chat) and honours
+``retry_after`` of a 429 by pausing all sends until it expires, then retrying
+the message. Limits are per process: the bot service and the worker each get
+their own budget, so their rates should add up to the bot limit.
+"""
+
+from __future__ import annotations
+
+import collections
+import http.client
+import json
+import logging
+import queue
+import ssl
+import threading
+import time
+from typing import Any, Callable
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+# Per-chat buckets kept for rate accounting; idle (full) buckets beyond this are dropped.
+_MAX_TRACKED_CHATS = 10_000
+# Keep-alive connections idle for longer are reopened instead of risking a reset by the server.
+_IDLE_CONNECTION_SEC = 50.0
+_LATENCY_WINDOW = 1024
+
+
+def mask_token(token: str) -> str:
+    """Mask a security token for safe logging.
+
+    Shows only first 5 and last 4 characters.
+    Example: "83475123456B1w" -> "83475...B1w"
+    """
+    if not token or len(token) < 10:
+        return "***"
+    return f"{token[:5]}...{token[-4:]}"
+
+
+class TokenBucket:
+    """``rate`` tokens per second, up to ``burst``; not thread-safe (guarded by the scheduler)."""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1.0
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class SendScheduler:
+    """Blocks a sender until both the global and its chat bucket allow one message."""
+
+    def __init__(
+        self,
+        global_rate: float,
+        per_chat_rate: float,
+        *,
+        per_chat_burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        now = clock()
+        # Burst of one second worth of messages: a broadcast starts at full speed, never above it.
+        self._global = TokenBucket(global_rate, global_rate, now)
+        self._per_chat_rate = per_chat_rate
+        self._per_chat_burst = per_chat_burst
+        self._chats: collections.OrderedDict[Any, TokenBucket] = collections.OrderedDict()
+        self._paused_until = 0.0
+
+    def acquire(self, chat_id: Any) -> float:
+        """Wait for a send slot for ``chat_id``; returns how long the caller waited (seconds)."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                bucket = self._chat_bucket(chat_id, now)
+                wait = max(
+                    self._paused_until - now,
+                    bucket.wait_time(now),
+                    self._global.wait_time(now),
+                )
+                if wait <= 0:
+                    bucket.take()
+                    self._global.take()
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hold all sends for ``seconds`` (Telegram 429 ``retry_after``)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + max(0.0, seconds))
+
+    def _chat_bucket(self, chat_id: Any, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self._per_chat_rate, self._per_chat_burst, now)
+            self._chats[chat_id] = bucket
+        self._chats.move_to_end(chat_id)
+        while len(self._chats) > _MAX_TRACKED_CHATS:
+            oldest_id, oldest = next(iter(self._chats.items()))
+            if not oldest.idle(now):
+                break
+            del self._chats[oldest_id]
+        return bucket
+
+
+class KeepAliveConnectionPool:
+    """Up to ``size`` persistent connections to one HTTP(S) origin, shared between threads."""
+
+    def __init__(self, base_url: str, *, size: int = 8, timeout: float = 10.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"unsupported Bot API URL: {base_url!r}")
+        self._https = parsed.scheme == "https"
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._prefix = parsed.path.rstrip("/")
+        self._timeout = timeout
+        self._ssl_context = ssl.create_default_context() if self._https else None
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._idle: queue.LifoQueue[tuple[http.client.HTTPConnection, float]] = queue.LifoQueue()
+        self.opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.opened += 1
+        if self._https:
+            return http.client.HTTPSConnection(self._host, self._port, timeout=self._timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def _checkout(self) -> tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect(), False
+            if now - last_used < _IDLE_CONNECTION_SEC:
+                return conn, True
+            conn.close()
+
+    def request(self, method: str, path: str, body: bytes, headers: dict[str, str]) -> tuple[int, bytes]:
+        """Send one request over a pooled connection; returns ``(status, body)``."""
+        with self._slots:
+            conn, reused = self._checkout()
+            while True:
+                try:
+                    conn.request(method, self._prefix + path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                except (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError):
+                    conn.close()
+                    if not reused:
+                        raise
+                    # The server dropped an idle keep-alive connection: one retry on a fresh one.
+                    conn, reused = self._connect(), False
+                    continue
+                except BaseException:
+                    conn.close()
+                    raise
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._idle.put((conn, time.monotonic()))
+                return response.status, data
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+class SendMetrics:
+    """Counters and a sliding window of send latencies, exposed via ``snapshot()``."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies: collections.deque[float] = collections.deque(maxlen=window)
+        self.sent = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.throttle_wait_sec = 0.0
+
+    def observe(self, latency: float, *, ok: bool, waited: float = 0.0) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self.throttle_wait_sec += waited
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def observe_rate_limited(self, waited: float = 0.0) -> None:
+        with self._lock:
+            self.rate_limited += 1
+            self.throttle_wait_sec += waited
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            counters = {
+                "sent": self.sent,
+                "failed": self.failed,
+                "rate_limited": self.rate_limited,
+                "throttle_wait_sec": round(self.throttle_wait_sec, 3),
+            }
+
+        def pct(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+        counters["latency_ms"] = {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0), "samples": len(ordered)}
+        return counters
+
+
+class TelegramBotClient:
+    """Bot API ``sendMessage`` over a keep-alive pool, paced by ``SendScheduler``."""
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        base_url: str = "https://api.telegram.org",
+        pool_size: int = 8,
+        timeout: float = 10.0,
+        global_rate: float = 30.0,
+        per_chat_rate: float = 1.0,
+        max_retries: int = 3,
+        max_retry_after: float = 60.0,
+    ):
+        self._token = token
+        self._masked_token = mask_token(token)
+        self._pool = KeepAliveConnectionPool(base_url, size=pool_size, timeout=timeout)
+        self._scheduler = SendScheduler(global_rate, per_chat_rate)
+        self._max_retries = max(0, max_retries)
+        self._max_retry_after = max_retry_after
+        self.metrics = SendMetrics()
+
+    def send_message(self, chat_id: int, text: str, reply_markup: dict[str, Any] | None = None) -> bool:
+        payload_obj: dict[str, Any] = {"chat_id": chat_id, "text": text}
+        if reply_markup is not None:
+            payload_obj["reply_markup"] = reply_markup
+        body = json.dumps(payload_obj).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(self._max_retries + 1):
+            waited = self._scheduler.acquire(chat_id)
+            started = time.monotonic()
+            try:
+                status, data = self._pool.request("POST", f"/bot{self._token}/sendMessage", body, headers)
+            except (OSError, http.client.HTTPException):
+                self.metrics.observe(time.monotonic() - started, ok=False, waited=waited)
+                logger.exception("Telegram send failed token=%s", self._masked_token)
+                return False
+            latency = time.monotonic() - started
+            if status == 200:
+                self.metrics.observe(latency, ok=True, waited=waited)
+                return True
+            if status == 429:
+                retry_after = _retry_after(data)
+                self.metrics.observe_rate_limited(waited)
+                if attempt < self._max_retries and retry_after <= self._max_retry_after:
+                    logger.warning("Telegram rate limited token=%s retry_after=%s", self._masked_token, retry_after)
+                    self._scheduler.pause(retry_after)
+                    continue
+            self.metrics.observe(latency, ok=False, waited=waited)
+            logger.error("Telegram send failed token=%s code=%s body=%s", self._masked_token, status, data[:512])
+            return False
+        return False
+
+    def metrics_snapshot(self) -> dict[str, Any]:
+        snapshot = self.metrics.snapshot()
+        snapshot["connections_opened"] = self._pool.opened
+        return snapshot
+
+
+def _retry_after(data: bytes) -> float:
+    try:
+        parameters = json.loads(data or b"{}").get("parameters") or {}
+        return max(1.0, float(parameters.get("retry_after", 1)))
+    except (ValueError, TypeError, AttributeError):
+        return 1.0
+
+
+_clients: dict[str, TelegramBotClient] = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(token: str, **options: Any) -> TelegramBotClient:
+    """Process-wide client for ``token`` (one pool and one rate budget per bot)."""
+    with _clients_lock:
+        client = _clients.get(token)
+        if client is None:
+            client = TelegramBotClient(token, **options)
+            _clients[token] = client
+        return client
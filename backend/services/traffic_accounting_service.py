@@ -0,0 +1,282 @@
+"""Per-peer traffic accounting from wg dump counters and quota enforcement.
+
+A peer over its monthly ``traffic_limit_mb`` gets ``status = 'disabled'`` in
+peers_devices plus an audit event. Removing it from the tunnel is done by the
+backend's wg dump collector (PeerMonitor): every poll it looks up the live awg1
+peers that are disabled and over limit (`over_limit_public_keys`) and removes
+them from awg1, whichever process (collector or worker) did the accounting.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import BigInteger, and_, case, cast, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from backend.models import PeerDevice, PeerTrafficUsage
+from backend.services.audit_service import write_audit_event
+
+BYTES_PER_MB = 1024 * 1024
+# Upper bound for bound parameters per statement (IN lists and multi-row VALUES).
+INGEST_CHUNK_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class PeerCounterSample:
+    """Raw cumulative counters of one peer as reported by `awg show <if> dump`."""
+
+    public_key: str
+    rx_bytes: int
+    tx_bytes: int
+
+
+@dataclass
+class TrafficIngestStats:
+    samples: int = 0
+    unchanged: int = 0
+    unknown: int = 0
+    updated: int = 0
+    disabled: int = 0
+    disabled_peer_ids: list[int] = field(default_factory=list)
+
+
+def billing_period_start(now: datetime) -> date:
+    """Billing period is a calendar month (UTC)."""
+    return date(now.year, now.month, 1)
+
+
+def samples_from_peers(peers: Iterable[dict[str, Any]]) -> list[PeerCounterSample]:
+    """Converts monitoring peer dicts (public_key/rx_bytes/tx_bytes) into samples, skipping junk."""
+    samples: list[PeerCounterSample] = []
+    for item in peers:
+        if not isinstance(item, dict):
+            continue
+        public_key = str(item.get("public_key") or "").strip()
+        if not public_key:
+            continue
+        try:
+            rx_bytes = max(0, int(item.get("rx_bytes") or 0))
+            tx_bytes = max(0, int(item.get("tx_bytes") or 0))
+        except (TypeError, ValueError):
+            continue
+        samples.append(PeerCounterSample(public_key=public_key, rx_bytes=rx_bytes, tx_bytes=tx_bytes))
+    return samples
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class TrafficAccountingService:
+    """Accumulates monotonic per-period usage from resettable counters and disables peers over limit.
+
+    All work is set-based: one bulk lookup of peers by public key, one multi-row
+    upsert per chunk (the delta against the stored raw counter is computed by
+    Postgres, a counter lower than the stored one means the interface was
+    restarted and the whole new value is counted; a sample not newer than the
+    stored ``updated_at`` is dropped, so an out-of-order poll is never taken for
+    a reset), and one bulk UPDATE for peers that crossed `traffic_limit_mb`.
+    Unchanged counters are skipped in-process, so idle peers cost nothing
+    between polls.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_seen: dict[str, tuple[int, int]] = {}
+
+    def ingest(
+        self,
+        session: Session,
+        samples: Iterable[PeerCounterSample],
+        *,
+        now: Optional[datetime] = None,
+    ) -> TrafficIngestStats:
+        """Applies one poll; `now` is when the counters were sampled (UTC)."""
+        now = now or datetime.utcnow()
+        period = billing_period_start(now)
+        stats = TrafficIngestStats()
+
+        latest: dict[str, PeerCounterSample] = {}
+        for sample in samples:
+            latest[sample.public_key] = sample
+        stats.samples = len(latest)
+
+        with self._lock:
+            changed = [
+                sample for key, sample in latest.items()
+                if self._last_seen.get(key) != (sample.rx_bytes, sample.tx_bytes)
+            ]
+        stats.unchanged = stats.samples - len(changed)
+        if not changed:
+            return stats
+
+        peers = self._peers_by_public_key(session, [sample.public_key for sample in changed])
+        rows: list[dict[str, Any]] = []
+        for sample in changed:
+            peer = peers.get(sample.public_key)
+            if peer is None:
+                stats.unknown += 1
+                continue
+            rows.append(
+                {
+                    "peer_id": peer[0],
+                    "period_start": period,
+                    "rx_bytes": 0,
+                    "tx_bytes": 0,
+                    "last_rx_counter": sample.rx_bytes,
+                    "last_tx_counter": sample.tx_bytes,
+                    "updated_at": now,
+                }
+            )
+
+        totals: dict[int, int] = {}
+        for chunk in _chunks(rows, INGEST_CHUNK_SIZE):
+            for peer_id, rx_total, tx_total in session.execute(self._upsert_statement(list(chunk))):
+                totals[int(peer_id)] = int(rx_total) + int(tx_total)
+        stats.updated = len(totals)
+
+        over_limit = [
+            peer_id
+            for peer_id, limit_mb, status in peers.values()
+            if status == "active" and limit_mb and peer_id in totals and totals[peer_id] >= limit_mb * BYTES_PER_MB
+        ]
+        if over_limit:
+            stats.disabled_peer_ids = self._disable_over_limit(session, over_limit, peers, totals, period, now)
+            stats.disabled = len(stats.disabled_peer_ids)
+
+        with self._lock:
+            for sample in changed:
+                self._last_seen[sample.public_key] = (sample.rx_bytes, sample.tx_bytes)
+        return stats
+
+    def forget(self, public_keys: Iterable[str]) -> None:
+        """Drops cached counters (e.g. after a rolled back ingest) so the next sample is re-applied."""
+        with self._lock:
+            for key in public_keys:
+                self._last_seen.pop(key, None)
+
+    @staticmethod
+    def usage_for_peers(
+        session: Session,
+        peer_ids: Sequence[int],
+        *,
+        now: Optional[datetime] = None,
+    ) -> dict[int, tuple[int, int]]:
+        """Returns {peer_id: (rx_bytes, tx_bytes)} for the current billing period."""
+        period = billing_period_start(now or datetime.utcnow())
+        result: dict[int, tuple[int, int]] = {}
+        for chunk in _chunks(list(peer_ids), INGEST_CHUNK_SIZE):
+            rows = session.execute(
+                select(PeerTrafficUsage.peer_id, PeerTrafficUsage.rx_bytes, PeerTrafficUsage.tx_bytes).where(
+                    and_(PeerTrafficUsage.period_start == period, PeerTrafficUsage.peer_id.in_(chunk))
+                )
+            )
+            for peer_id, rx_bytes, tx_bytes in rows:
+                result[int(peer_id)] = (int(rx_bytes), int(tx_bytes))
+        return result
+
+    @staticmethod
+    def over_limit_public_keys(
+        session: Session,
+        public_keys: Sequence[str],
+        *,
+        now: Optional[datetime] = None,
+    ) -> list[str]:
+        """Returns the keys among `public_keys` of disabled peers whose usage this period reached the limit."""
+        period = billing_period_start(now or datetime.utcnow())
+        limit_bytes = cast(PeerDevice.traffic_limit_mb, BigInteger) * BYTES_PER_MB
+        result: list[str] = []
+        for chunk in _chunks(list(public_keys), INGEST_CHUNK_SIZE):
+            result.extend(
+                session.scalars(
+                    select(PeerDevice.public_key)
+                    .join(PeerTrafficUsage, PeerTrafficUsage.peer_id == PeerDevice.id)
+                    .where(
+                        and_(
+                            PeerDevice.public_key.in_(chunk),
+                            PeerDevice.status == "disabled",
+                            PeerDevice.traffic_limit_mb > 0,
+                            PeerTrafficUsage.period_start == period,
+                            PeerTrafficUsage.rx_bytes + PeerTrafficUsage.tx_bytes >= limit_bytes,
+                        )
+                    )
+                )
+            )
+        return result
+
+    @staticmethod
+    def _peers_by_public_key(session: Session, public_keys: Sequence[str]) -> dict[str, tuple[int, Optional[int], str]]:
+        peers: dict[str, tuple[int, Optional[int], str]] = {}
+        for chunk in _chunks(list(public_keys), INGEST_CHUNK_SIZE):
+            rows = session.execute(
+                select(PeerDevice.public_key, PeerDevice.id, PeerDevice.traffic_limit_mb, PeerDevice.status).where(
+                    PeerDevice.public_key.in_(chunk)
+                )
+            )
+            for public_key, peer_id, limit_mb, status in rows:
+                peers[public_key] = (int(peer_id), limit_mb, status)
+        return peers
+
+    @staticmethod
+    def _upsert_statement(rows: list[dict[str, Any]]):
+        table = PeerTrafficUsage.__table__
+        stmt = pg_insert(table).values(rows)
+        excluded = stmt.excluded
+
+        def _delta(column: str):
+            stored = table.c[column]
+            incoming = excluded[column]
+            return case((incoming >= stored, incoming - stored), else_=incoming)
+
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.peer_id, table.c.period_start],
+            set_={
+                "rx_bytes": table.c.rx_bytes + _delta("last_rx_counter"),
+                "tx_bytes": table.c.tx_bytes + _delta("last_tx_counter"),
+                "last_rx_counter": excluded.last_rx_counter,
+                "last_tx_counter": excluded.last_tx_counter,
+                "updated_at": excluded.updated_at,
+            },
+            where=or_(table.c.updated_at.is_(None), excluded.updated_at > table.c.updated_at),
+        ).returning(table.c.peer_id, table.c.rx_bytes, table.c.tx_bytes)
+
+    @staticmethod
+    def _disable_over_limit(
+        session: Session,
+        peer_ids: list[int],
+        peers: dict[str, tuple[int, Optional[int], str]],
+        totals: dict[int, int],
+        period: date,
+        now: datetime,
+    ) -> list[int]:
+        """Mark active over-limit peers disabled in the DB and audit it (PeerMonitor removes them from awg1)."""
+        disabled = [
+            int(peer_id)
+            for peer_id in session.scalars(
+                update(PeerDevice)
+                .where(and_(PeerDevice.id.in_(peer_ids), PeerDevice.status == "active"))
+                .values(status="disabled", updated_at=now)
+                .returning(PeerDevice.id)
+                .execution_options(synchronize_session=False)
+            )
+        ]
+        limits = {peer_id: limit_mb for peer_id, limit_mb, _status in peers.values()}
+        for peer_id in disabled:
+            write_audit_event(
+                session=session,
+                action="peer_traffic_limit_exceeded",
+                user_id=None,
+                target=f"peer:{peer_id}",
+                details={
+                    "period_start": period.isoformat(),
+                    "used_bytes": totals[peer_id],
+                    "traffic_limit_mb": limits.get(peer_id),
+                },
+            )
+        return disabled
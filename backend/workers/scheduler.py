@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import json
 import logging
+import time
+import urllib.request
 from datetime import datetime, timedelta
 from typing import Any, Callable
 
@@ -13,7 +16,9 @@ from sqlalchemy import and_, select
 from backend.core.config import get_settings
 from backend.db.session import get_session
 from backend.models import PeerDevice, Subscription, SubscriptionStatus
+from backend.services.broadcast_service import BroadcastService
 from backend.services.notifications_service import NotificationsService
+from backend.services.traffic_accounting_service import TrafficAccountingService, samples_from_peers
 from backend.services.worker_metrics_service import JobCounters, save_job_run
 
 logger = logging.getLogger(__name__)
@@ -25,7 +30,9 @@ class WorkerScheduler:
     def __init__(self, notifications: NotificationsService):
         self._settings = get_settings()
         self._notifications = notifications
+        self._broadcasts = BroadcastService(notifications)
         self._scheduler = BlockingScheduler(timezone="UTC")
+        self._traffic = TrafficAccountingService()
 
     def configure(self) -> None:
         self._add_interval_job("notify_expiring_3d", self._notify_expiring_3d, self._settings.WORKER_NOTIFY_3D_MINUTES)
@@ -33,7 +40,10 @@ class WorkerScheduler:
         self._add_interval_job("notify_expired", self._notify_expired, self._settings.WORKER_NOTIFY_EXPIRED_MINUTES)
         self._add_interval_job("cleanup_stale", self._cleanup_stale, self._settings.WORKER_CLEANUP_MINUTES)
         self._add_interval_job("sync_subscription_states", self._sync_subscription_states, self._settings.WORKER_SYNC_MINUTES)
+        self._add_interval_job("fan_out_broadcasts", self._fan_out_broadcasts, self._settings.WORKER_BROADCAST_FANOUT_SECONDS, seconds=True)
         self._add_interval_job("deliver_notifications", self._deliver_notifications, self._settings.WORKER_DELIVERY_SECONDS, seconds=True)
+        if self._settings.TRAFFIC_COUNTERS_URL:
+            self._add_interval_job("account_traffic", self._account_traffic, self._settings.WORKER_TRAFFIC_SECONDS, seconds=True)
 
     def run(self) -> None:
         self.configure()
@@ -120,14 +130,41 @@ class WorkerScheduler:
             deleted = int(stats.get("notifications_deleted", 0))
             return JobCounters(processed=deleted, success=deleted, errors=0)
 
-    def _deliver_notifications(self) -> JobCounters:
+    def _fan_out_broadcasts(self) -> JobCounters:
         with get_session() as session:
-            stats = self._notifications.deliver_pending(session=session, limit=self._settings.WORKER_DELIVERY_BATCH_SIZE)
-            return JobCounters(
-                processed=stats.processed,
-                success=stats.success,
-                errors=stats.errors,
-            )
+            created = self._broadcasts.fan_out_pending(session)
+            return JobCounters(processed=created, success=created, errors=0)
+
+    def _deliver_notifications(self) -> JobCounters:
+        """Deliver batches (one transaction each) until the queue is drained or the run's time is up."""
+        batch_size = max(1, int(self._settings.WORKER_DELIVERY_BATCH_SIZE))
+        # Leave headroom before the next tick, which is skipped while this run is still going.
+        deadline = time.monotonic() + max(1, int(self._settings.WORKER_DELIVERY_SECONDS)) * 0.8
+        counters = JobCounters()
+        while True:
+            with get_session() as session:
+                stats = self._notifications.deliver_pending(session=session, limit=batch_size)
+            counters.processed += stats.processed
+            counters.success += stats.success
+            counters.errors += stats.errors
+            if not stats.processed or time.monotonic() >= deadline:
+                return counters
+
+    def _account_traffic(self) -> JobCounters:
+        url = str(self._settings.TRAFFIC_COUNTERS_URL)
+        sampled_at = datetime.utcnow()
+        with urllib.request.urlopen(url, timeout=10) as resp:
+            payload = json.loads(resp.read().decode("utf-8"))
+        if not isinstance(payload, list):
+            raise ValueError("traffic counters payload is not a list")
+        samples = samples_from_peers(payload)
+        try:
+            with get_session() as session:
+                stats = self._traffic.ingest(session, samples, now=sampled_at)
+        except Exception:
+            self._traffic.forget(sample.public_key for sample in samples)
+            raise
+        return JobCounters(processed=stats.samples, success=stats.updated, errors=stats.unknown)
 
     def _sync_subscription_states(self) -> JobCounters:
         with get_session() as session:
@@ -150,7 +187,8 @@ class WorkerScheduler:
                 ).all()
                 peer_status = "active" if sub.status == SubscriptionStatus.ACTIVE else "inactive"
                 for peer in peer_rows:
-                    if peer.status != peer_status:
+                    # "disabled" is set explicitly (admin or traffic quota) and must survive the sync.
+                    if peer.status != peer_status and peer.status != "disabled":
                         peer.status = peer_status
                         peer.updated_at = now
 
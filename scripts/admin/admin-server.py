@@ -15,19 +15,21 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import atexit
 import base64
 import collections
+import contextlib
 import datetime as dt
 import functools
 import hashlib
 import io
-import ipaddress
 import json
 import logging
 import os
+import queue
 import re
 import secrets
-import shlex
+import signal
 import sqlite3
 import subprocess
 import sys
@@ -38,7 +40,7 @@ import urllib.error
 import urllib.parse
 import urllib.request
 from pathlib import Path
-from typing import Any
+from typing import Any, Mapping
 
 import bcrypt
 import jwt
@@ -66,6 +68,34 @@ MONITOR_DATA_FALLBACK_PATH = PROJECT_ROOT / "vpn-output" / "data.json"
 CONFIGS_DIR = PROJECT_ROOT / "vpn-output"
 MONITOR_STALE_SEC = int(os.environ.get("ADMIN_MONITOR_STALE_SEC", "90"))
 
+# Shared helpers live in the backend package (stdlib-only modules).
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.core.amnezia import amnezia_payload, amnezia_share_url  # noqa: E402
+from backend.core.artifact_cache import (  # noqa: E402
+    ArtifactCache,
+    artifact_key,
+    etag_for,
+    etag_matches,
+    profile_hash,
+)
+from backend.core.awg_apply import build_apply_cmd, build_apply_request, parse_apply_result  # noqa: E402
+from backend.core.config_catalog import ConfigCatalog  # noqa: E402
+from backend.core.ip_pool import IPPool, address_prefix, allocate_from, parse_pool_cidrs, pool_stats  # noqa: E402
+from backend.core.monitor_push import SnapshotListener  # noqa: E402
+from backend.core.server_profile import ServerProfileCache  # noqa: E402
+from backend.core.wg_dump import (  # noqa: E402
+    EMPTY_PEER_METRICS as _EMPTY_PEER_METRICS,
+    PeerMetricsSnapshot,
+    build_dump_cmd as _build_wg_dump_cmd,
+    build_peer_metrics_snapshot as _build_peer_metrics_snapshot,
+    normalize_lookup_key as _normalize_peer_lookup_key,
+    parse_dump_peers as _parse_wg_dump_peers,
+)
+from backend.core.wg_keys import PeerKeys, generate_peer_keys  # noqa: E402
+from backend.core.zip_stream import render_ordered, stream_zip  # noqa: E402
+
 # =============================================================================
 # Logging
 # =============================================================================
@@ -169,6 +199,9 @@ _sessions_lock = threading.Lock()
 SESSION_COOKIE_NAME = "admin_sid"
 SESSION_TTL_SEC = 24 * 3600  # 24h
 PEER_ONLINE_HANDSHAKE_SEC = int(os.environ.get("ADMIN_PEER_ONLINE_HANDSHAKE_SEC", "55"))
+PEER_IP_POOL_CIDRS = parse_pool_cidrs()
+PEER_IP_POOL_CAPACITY = sum(IPPool(cidr).size for cidr in PEER_IP_POOL_CIDRS)
+NO_FREE_PEER_IP_ERROR = f"No available IPs in peer pools ({', '.join(PEER_IP_POOL_CIDRS)})"
 
 # =============================================================================
 # Environment / config helpers
@@ -265,6 +298,14 @@ CREATE TABLE IF NOT EXISTS settings (
     key   TEXT PRIMARY KEY,
     value TEXT
 );
+
+CREATE TABLE IF NOT EXISTS ip_pools (
+    cidr        TEXT PRIMARY KEY,
+    bitmap      BLOB NOT NULL,
+    next_hint   INTEGER NOT NULL DEFAULT 0,
+    free_count  INTEGER NOT NULL,
+    updated_at  TEXT NOT NULL DEFAULT (datetime('now'))
+);
 """
 
 
@@ -439,58 +480,25 @@ def _config_has_placeholders(conf_text: str) -> bool:
     return any(marker in conf_text for marker in markers)
 
 
-def _parse_peer_from_config_file(config_path: Path) -> dict | None:
-    """Parse a WireGuard .conf file and return peer info (name, ip, config_file)."""
-    if not config_path.is_file():
-        return None
-    try:
-        text = config_path.read_text(encoding="utf-8", errors="replace")
-    except OSError:
-        return None
-    if _config_has_placeholders(text):
-        # Ignore synthetic/incomplete configs from tests to avoid broken peers in UI.
-        return None
-    ip = ""
-    for line in text.splitlines():
-        line = line.strip()
-        if line.startswith("Address") and "=" in line:
-            _, _, val = line.partition("=")
-            addr = val.strip()
-            if "/" in addr:
-                ip = addr.split("/")[0].strip()
-            else:
-                ip = addr
-            break
-    if not ip:
-        return None
-    stem = config_path.stem
-    if stem.startswith("peer_"):
-        m = re.match(r"^peer_(.+)_10_9_0_\d+$", stem)
-        name = m.group(1).replace("_", "-") if m else stem[5:].replace("_", "-")
-    elif stem in ("client", "phone", "tablet"):
-        name = stem
-    else:
-        name = stem.replace("_", "-")
-    return {
-        "name": name,
-        "ip": ip,
-        "config_file": str(config_path),
-        "source": "config_file",
-    }
+# Index of *.conf peers in CONFIGS_DIR (see backend/core/config_catalog.py).
+_config_catalog = ConfigCatalog(CONFIGS_DIR)
 
 
 def _scan_peers_from_configs_dir() -> list[dict]:
-    """Scan CONFIGS_DIR for all .conf files, return list of peer info (каждый файл = отдельный пир)."""
-    result: list[dict] = []
-    if not CONFIGS_DIR.is_dir():
-        return result
-    for path in sorted(CONFIGS_DIR.glob("*.conf")):
-        peer = _parse_peer_from_config_file(path)
-        if peer and peer["ip"]:
-            result.append(peer)
+    """Peers from CONFIGS_DIR .conf files (каждый файл = отдельный пир), served from the catalog."""
+    result = _config_catalog.entries()
+    for peer in result:
+        peer["source"] = "config_file"
     return result
 
 
+def _config_peer_by_ip(ip: str) -> dict | None:
+    peer = _config_catalog.by_ip(ip)
+    if peer is not None:
+        peer["source"] = "config_file"
+    return peer
+
+
 # =============================================================================
 # peers.json sync (write back)
 # =============================================================================
@@ -528,62 +536,6 @@ def sync_peers_to_json() -> None:
         log.error("Failed to sync peers.json: %s", exc)
 
 
-def _sync_peers_to_server() -> None:
-    """Reconcile DB peers with the running awg1 interface on VPS1.
-
-    Reads all active peers from SQLite, compares with the live awg1 dump,
-    and re-registers any missing peers. Ensures peers survive VPS reboots,
-    redeploys, and awg1 restarts regardless of config file state.
-    """
-    conn = sqlite3.connect(str(DB_PATH), timeout=10)
-    conn.row_factory = sqlite3.Row
-    db_peers = conn.execute(
-        "SELECT ip, public_key, preshared_key FROM peers WHERE status = 'active'"
-    ).fetchall()
-    conn.close()
-
-    peers_to_sync = [
-        r for r in db_peers
-        if r["public_key"] and r["preshared_key"] and r["ip"]
-    ]
-    if not peers_to_sync:
-        log.info("Peer sync: no active peers in DB, nothing to sync")
-        return
-
-    try:
-        dump = _vps1_ssh(
-            "sudo -n awg show awg1 dump 2>/dev/null || "
-            "awg show awg1 dump 2>/dev/null || true"
-        )
-    except Exception as exc:
-        log.warning("Peer sync: cannot reach VPS1, skipping: %s", exc)
-        return
-
-    live_keys: set[str] = set()
-    for line in dump.strip().splitlines():
-        parts = _split_wg_dump_line(line)
-        if len(parts) >= 4 and "/" in parts[3]:
-            live_keys.add(parts[0])
-
-    missing = [p for p in peers_to_sync if p["public_key"] not in live_keys]
-    if not missing:
-        log.info("Peer sync: all %d active peers present on server", len(peers_to_sync))
-        return
-
-    log.info("Peer sync: %d of %d active peers missing on server, re-registering",
-             len(missing), len(peers_to_sync))
-    restored = 0
-    for peer in missing:
-        try:
-            _add_peer_to_server(peer["public_key"], peer["preshared_key"], peer["ip"])
-            log.info("Peer sync: restored %s (%s)", peer["ip"], peer["public_key"][:12])
-            restored += 1
-        except Exception as exc:
-            log.error("Peer sync: failed to restore %s: %s", peer["ip"], exc)
-
-    log.info("Peer sync: restored %d / %d missing peers", restored, len(missing))
-
-
 # =============================================================================
 # SSH helpers
 # =============================================================================
@@ -644,37 +596,181 @@ def _resolve_key_path(key_path: str) -> str | None:
     return key_path
 
 
-def ssh_exec(host: str, user: str, key_path: str, password: str, command: str) -> str:
-    """Execute a command on a remote server via SSH and return stdout."""
-    client = _ssh_connect(host, user, key_path, password)
-    try:
-        _stdin, stdout, stderr = client.exec_command(command, timeout=30)
+# =============================================================================
+# SSH connection pool
+# =============================================================================
+
+# sshd defaults to MaxSessions=10; keep a margin for interactive admin sessions.
+SSH_MAX_CHANNELS = max(1, int(os.environ.get("ADMIN_SSH_MAX_CHANNELS", "8")))
+SSH_KEEPALIVE_SEC = int(os.environ.get("ADMIN_SSH_KEEPALIVE_SEC", "15"))
+SSH_IDLE_TIMEOUT_SEC = int(os.environ.get("ADMIN_SSH_IDLE_TIMEOUT_SEC", "600"))
+SSH_CHANNEL_WAIT_SEC = 30
+SSH_COMMAND_TIMEOUT_SEC = 30
+
+
+class _PooledSSHConnection:
+    """One authenticated SSH transport shared by many short-lived channels.
+
+    The transport is opened lazily, kept alive with SSH keepalives and
+    transparently re-established when the health check finds it dead.
+    Concurrent channels are capped by a semaphore so bursts queue locally
+    instead of being rejected by sshd.
+    """
+
+    def __init__(self, host: str, user: str, key_path: str, password: str) -> None:
+        self.host = host
+        self._user = user
+        self._key_path = key_path
+        self._password = password
+        self._client: paramiko.SSHClient | None = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(SSH_MAX_CHANNELS)
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self.last_used = time.time()
+
+    @property
+    def busy(self) -> bool:
+        """True while any channel_slot is held (a command or upload is in flight)."""
+        return self._busy > 0
+
+    def _is_alive(self) -> bool:
+        transport = self._client.get_transport() if self._client else None
+        return bool(transport and transport.is_active() and transport.is_authenticated())
+
+    def _close_locked(self) -> None:
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+    def client(self) -> paramiko.SSHClient:
+        """Return a healthy client, reconnecting if the transport went away."""
+        with self._lock:
+            if not self._is_alive():
+                self._close_locked()
+                client = _ssh_connect(self.host, self._user, self._key_path, self._password)
+                transport = client.get_transport()
+                if transport is not None and SSH_KEEPALIVE_SEC > 0:
+                    transport.set_keepalive(SSH_KEEPALIVE_SEC)
+                self._client = client
+                log.debug("SSH transport to %s established", self.host)
+            self.last_used = time.time()
+            return self._client
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    @contextlib.contextmanager
+    def channel_slot(self):
+        """Reserve one of SSH_MAX_CHANNELS concurrent channels on this transport."""
+        if not self._slots.acquire(timeout=SSH_CHANNEL_WAIT_SEC):
+            raise RuntimeError(f"SSH channel limit reached for {self.host} ({SSH_MAX_CHANNELS} busy)")
+        with self._busy_lock:
+            self._busy += 1
+        try:
+            yield
+        finally:
+            self.last_used = time.time()
+            with self._busy_lock:
+                self._busy -= 1
+            self._slots.release()
+
+    def exec_command(self, command: str, timeout: float):
+        """Open a new channel and start `command`; reconnect once if the transport is stale.
+
+        Retrying is safe here: a failure to open the channel means the command
+        never reached the remote shell.
+        """
+        try:
+            return self.client().exec_command(command, timeout=timeout)
+        except (paramiko.SSHException, EOFError, OSError) as exc:
+            self.invalidate()
+            log.info("SSH transport to %s dropped (%s), reconnecting", self.host, exc)
+        return self.client().exec_command(command, timeout=timeout)
+
+    def close(self) -> None:
+        self.invalidate()
+
+
+class _SSHPool:
+    """Thread-safe registry of pooled SSH connections keyed by host/user/credentials."""
+
+    def __init__(self) -> None:
+        self._conns: dict[tuple[str, str, str, str], _PooledSSHConnection] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str, user: str, key_path: str, password: str) -> _PooledSSHConnection:
+        pw_digest = hashlib.sha256(password.encode("utf-8")).hexdigest() if password else ""
+        key = (host, user, key_path or "", pw_digest)
+        with self._lock:
+            self._close_idle_locked()
+            conn = self._conns.get(key)
+            if conn is None:
+                conn = _PooledSSHConnection(host, user, key_path, password)
+                self._conns[key] = conn
+            # Handed out: not idle, even before the caller takes a channel slot.
+            conn.last_used = time.time()
+            return conn
+
+    def _close_idle_locked(self) -> None:
+        if SSH_IDLE_TIMEOUT_SEC <= 0:
+            return
+        cutoff = time.time() - SSH_IDLE_TIMEOUT_SEC
+        for key, conn in list(self._conns.items()):
+            # A command running longer than the idle timeout still holds its slot.
+            if conn.last_used < cutoff and not conn.busy:
+                conn.close()
+                self._conns.pop(key, None)
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+
+_ssh_pool = _SSHPool()
+atexit.register(_ssh_pool.close_all)
+
+
+def ssh_exec(host: str, user: str, key_path: str, password: str, command: str,
+             stdin_data: str | None = None) -> str:
+    """Execute a command on a remote server via a pooled SSH transport and return stdout."""
+    conn = _ssh_pool.get(host, user, key_path, password)
+    with conn.channel_slot():
+        stdin, stdout, stderr = conn.exec_command(command, timeout=SSH_COMMAND_TIMEOUT_SEC)
+        if stdin_data is not None:
+            stdin.write(stdin_data)
+            stdin.flush()
+        stdin.channel.shutdown_write()
         out = stdout.read().decode(errors="replace")
         err_out = stderr.read().decode(errors="replace")
-        if err_out:
-            log.debug("SSH stderr from %s: %s", host, err_out.strip())
         exit_code = stdout.channel.recv_exit_status()
-        if exit_code != 0:
-            short_err = (err_out.strip() or out.strip() or f"exit code {exit_code}")
-            raise RuntimeError(f"SSH command failed on {host}: {short_err}")
-        return out
-    finally:
-        client.close()
+    if err_out:
+        log.debug("SSH stderr from %s: %s", host, err_out.strip())
+    if exit_code != 0:
+        short_err = (err_out.strip() or out.strip() or f"exit code {exit_code}")
+        raise RuntimeError(f"SSH command failed on {host}: {short_err}")
+    return out
 
 
 def ssh_upload(host: str, user: str, key_path: str, password: str,
                local_path: str, remote_path: str) -> None:
-    """Upload a file to a remote server via SFTP."""
-    client = _ssh_connect(host, user, key_path, password)
-    try:
-        sftp = client.open_sftp()
-        sftp.put(local_path, remote_path)
-        sftp.close()
-    finally:
-        client.close()
+    """Upload a file to a remote server via SFTP over the pooled transport."""
+    conn = _ssh_pool.get(host, user, key_path, password)
+    with conn.channel_slot():
+        sftp = conn.client().open_sftp()
+        try:
+            sftp.put(local_path, remote_path)
+        finally:
+            sftp.close()
 
 
-def _vps1_ssh(command: str) -> str:
+def _vps1_ssh(command: str, stdin_data: str | None = None) -> str:
     """Shortcut: run command on VPS1."""
     return ssh_exec(
         get_env("VPS1_IP"),
@@ -682,6 +778,7 @@ def _vps1_ssh(command: str) -> str:
         get_env("VPS1_KEY"),
         get_env("VPS1_PASS"),
         command,
+        stdin_data=stdin_data,
     )
 
 
@@ -839,28 +936,18 @@ MTU_BY_TYPE: dict[str, int] = {
 }
 
 
-def _generate_keypair_ssh() -> tuple[str, str]:
-    """Generate WireGuard keypair via SSH on VPS1. Returns (private, public)."""
-    out = _vps1_ssh(
-        "PRIV=$(awg genkey); PUB=$(printf '%s' \"$PRIV\" | awg pubkey); "
-        "printf 'PRIV=%s\\nPUB=%s\\n' \"$PRIV\" \"$PUB\""
-    )
-    priv = pub = ""
-    for line in out.strip().splitlines():
-        if line.startswith("PRIV="):
-            priv = line[5:]
-        elif line.startswith("PUB="):
-            pub = line[4:]
-    return priv, pub
+SERVER_INFO_KEYS = ("server_public_key", "server_port", "Jc", "Jmin", "Jmax", "S1", "S2", "H1", "H2", "H3", "H4")
 
 
-def _generate_psk_ssh() -> str:
-    """Generate a preshared key via SSH on VPS1."""
-    return _vps1_ssh("awg genpsk").strip()
+def _get_server_info() -> dict[str, str]:
+    """Server public key, port and junk parameters of awg1 (cached, see _server_info_cache)."""
+    return _server_info_cache.get()
 
 
-def _get_server_info() -> dict[str, str]:
+def _fetch_server_info() -> dict[str, str]:
     """Fetch server public key, port, and junk parameters from VPS1."""
+    # .env/keys.env are watched by the cache: pick up edited VPS1_* values with the new profile.
+    reload_env()
     out = _vps1_ssh(
         'echo "=PUB="; '
         '(sudo -n awg show awg1 public-key 2>/dev/null || '
@@ -894,7 +981,38 @@ def _get_server_info() -> dict[str, str]:
         elif current_tag == "JUNK" and "=" in line:
             k, _, v = line.partition("=")
             info[k.strip()] = v.strip()
+    return _apply_server_info_fallbacks(info)
+
+
+# One SSH round trip per ADMIN_SERVER_INFO_TTL_SEC instead of one per config/QR request.
+_server_info_cache = ServerProfileCache(
+    _fetch_server_info,
+    ttl=float(os.environ.get("ADMIN_SERVER_INFO_TTL_SEC", "600")),
+    watch=(ENV_PATH, KEYS_ENV_PATH),
+    name="awg1 server info",
+)
+
+
+def _refresh_server_profile() -> None:
+    """Drop cached .env values and awg1 server info (refresh endpoint, SIGHUP after deploy)."""
+    reload_env()
+    _server_info_cache.invalidate()
 
+
+# Set by the SIGHUP handler, which must not take locks or do file I/O itself.
+_server_profile_reload_requested = threading.Event()
+
+
+@app.before_request
+def _apply_requested_profile_reload() -> None:
+    """Run the reload requested by SIGHUP on the next request."""
+    if _server_profile_reload_requested.is_set():
+        _server_profile_reload_requested.clear()
+        _refresh_server_profile()
+
+
+def _apply_server_info_fallbacks(info: dict[str, str]) -> dict[str, str]:
+    """Fill server public key/port from .env/keys.env when VPS1 did not report them."""
     if not info.get("server_public_key"):
         env_pub = (get_env("VPS1_CLIENT_PUB") or "").strip()
         if env_pub:
@@ -906,23 +1024,137 @@ def _get_server_info() -> dict[str, str]:
 
 
 def _validate_peer_ip(ip: str) -> bool:
-    """Validate that IP is within the expected VPN subnet (10.9.0.0/24)."""
+    """Validate that IP belongs to one of the configured peer pools (PEER_IP_POOLS)."""
+    return any(IPPool(cidr).contains(ip) for cidr in PEER_IP_POOL_CIDRS)
+
+
+def _load_ip_pools(db: sqlite3.Connection) -> list[IPPool]:
+    """Configured pools from admin.db; a missing pool is built once from the peers table."""
+    rows = {
+        row[0]: row
+        for row in db.execute(
+            f"SELECT cidr, bitmap, next_hint FROM ip_pools WHERE cidr IN ({','.join('?' for _ in PEER_IP_POOL_CIDRS)})",
+            PEER_IP_POOL_CIDRS,
+        ).fetchall()
+    }
+    used_ips: list[str] | None = None
+    pools: list[IPPool] = []
+    for cidr in PEER_IP_POOL_CIDRS:
+        row = rows.get(cidr)
+        if row is not None:
+            pools.append(IPPool(cidr, bytes(row[1]), int(row[2])))
+            continue
+        if used_ips is None:
+            used_ips = [r[0] for r in db.execute("SELECT ip FROM peers").fetchall()]
+        pool = IPPool.from_used(cidr, used_ips)
+        db.execute(
+            "INSERT INTO ip_pools (cidr, bitmap, next_hint, free_count) VALUES (?, ?, ?, ?)",
+            (pool.cidr, pool.bitmap, pool.next_hint, pool.free),
+        )
+        pools.append(pool)
+    return pools
+
+
+@contextlib.contextmanager
+def _ip_pools_locked(db: sqlite3.Connection):
+    """Yield the configured pools under the SQLite write lock and persist changed bitmaps.
+
+    Outside a transaction the block runs in its own BEGIN IMMEDIATE ... COMMIT, so
+    a reservation is visible to other workers before the slow VPS1 round trip.
+    Inside the caller's transaction (DELETE/INSERT of a peer) it joins it and the
+    caller commits both together.
+    """
+    own = not db.in_transaction
+    if own:
+        db.execute("BEGIN IMMEDIATE")
     try:
-        ip_obj = ipaddress.ip_address(ip)
-        subnet = ipaddress.ip_network("10.9.0.0/24", strict=False)
-        return ip_obj in subnet
-    except ValueError:
-        return False
+        pools = _load_ip_pools(db)
+        before = [(pool.bitmap, pool.next_hint) for pool in pools]
+        yield pools
+        changed = [pool for pool, state in zip(pools, before) if (pool.bitmap, pool.next_hint) != state]
+        if changed:
+            db.executemany(
+                "UPDATE ip_pools SET bitmap = ?, next_hint = ?, free_count = ?, updated_at = datetime('now') WHERE cidr = ?",
+                [(pool.bitmap, pool.next_hint, pool.free, pool.cidr) for pool in changed],
+            )
+    except BaseException:
+        if own:
+            db.rollback()
+        raise
+    if own:
+        db.commit()
+
+
+def _peer_ips_taken(db: sqlite3.Connection, ips: list[str]) -> set[str]:
+    """Subset of ``ips`` already assigned to rows of the peers table."""
+    taken: set[str] = set()
+    for start in range(0, len(ips), 500):
+        chunk = ips[start:start + 500]
+        taken.update(
+            row[0]
+            for row in db.execute(
+                f"SELECT ip FROM peers WHERE ip IN ({','.join('?' for _ in chunk)})", chunk
+            ).fetchall()
+        )
+    return taken
+
+
+def _allocate_ips(db: sqlite3.Connection, count: int) -> list[str]:
+    """Reserve up to ``count`` free IPs from the pool bitmaps (release them if the peer is not created).
+
+    An address the bitmap considered free but a peer row already holds (e.g. a
+    peer inserted behind the allocator's back) stays marked and is skipped.
+    """
+    taken: list[str] = []
+    with _ip_pools_locked(db) as pools:
+        while len(taken) < count:
+            batch = allocate_from(pools, count - len(taken))
+            if not batch:
+                break
+            used = _peer_ips_taken(db, batch)
+            taken.extend(ip for ip in batch if ip not in used)
+    return taken
 
 
 def _allocate_ip(db: sqlite3.Connection) -> str | None:
-    """Find the next available IP in 10.9.0.3-254."""
-    used = {row[0] for row in db.execute("SELECT ip FROM peers").fetchall()}
-    for i in range(3, 255):
-        candidate = f"10.9.0.{i}"
-        if candidate not in used:
-            return candidate
-    return None
+    """Reserve the next available peer IP."""
+    free = _allocate_ips(db, 1)
+    return free[0] if free else None
+
+
+def _release_ips(db: sqlite3.Connection, ips: list[str]) -> None:
+    """Return IPs to their pools (peer deleted or never created)."""
+    if not ips:
+        return
+    with _ip_pools_locked(db) as pools:
+        for pool in pools:
+            pool.release(ips)
+
+
+def _claim_ips(db: sqlite3.Connection, ips: list[str]) -> None:
+    """Mark IPs taken outside the allocator (import of existing configs)."""
+    with _ip_pools_locked(db) as pools:
+        for pool in pools:
+            pool.mark(ips)
+
+
+def _rebuild_ip_pools() -> None:
+    """Recompute pool bitmaps from the peers table (startup; drops stale reservations)."""
+    conn = sqlite3.connect(str(DB_PATH), timeout=10)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        used_ips = [r[0] for r in conn.execute("SELECT ip FROM peers").fetchall()]
+        hints = dict(conn.execute("SELECT cidr, next_hint FROM ip_pools").fetchall())
+        for cidr in PEER_IP_POOL_CIDRS:
+            pool = IPPool.from_used(cidr, used_ips)
+            pool.next_hint = int(hints.get(cidr) or 0) % pool.size
+            conn.execute(
+                "INSERT OR REPLACE INTO ip_pools (cidr, bitmap, next_hint, free_count) VALUES (?, ?, ?, ?)",
+                (pool.cidr, pool.bitmap, pool.next_hint, pool.free),
+            )
+        conn.commit()
+    finally:
+        conn.close()
 
 
 def _build_config(
@@ -953,7 +1185,7 @@ def _build_config(
     lines = [
         "[Interface]",
         f"PrivateKey = {private_key}",
-        f"Address = {peer_ip}/24",
+        f"Address = {peer_ip}/{address_prefix(PEER_IP_POOL_CIDRS, peer_ip)}",
         f"DNS = {dns}",
         f"MTU = {mtu}",
     ]
@@ -976,43 +1208,218 @@ def _build_config(
 
 
 def _add_peer_to_server(public_key: str, preshared_key: str, peer_ip: str) -> None:
-    """Register a peer on VPS1 via SSH (awg set + config append)."""
-    safe_psk = shlex.quote(preshared_key)
-    safe_public_key = shlex.quote(public_key)
-    safe_peer_ip = shlex.quote(peer_ip)
-
-    # Add peer to running interface
-    _vps1_ssh(
-        f"printf '%s' {safe_psk} > /tmp/psk && "
-        f"(sudo -n awg set awg1 peer {safe_public_key} preshared-key /tmp/psk allowed-ips {safe_peer_ip}/32 || "
-        f"awg set awg1 peer {safe_public_key} preshared-key /tmp/psk allowed-ips {safe_peer_ip}/32) && "
-        f"rm -f /tmp/psk"
-    )
+    """Register (or update) a peer on VPS1: runtime + awg1.conf in one SSH call."""
+    _provision_peer_on_server(peer_ip, public_key, preshared_key)
 
-    # Persist peer to config file so it survives awg1 restart
-    conf = "/etc/amnezia/amneziawg/awg1.conf"
-    peer_block = f"\\n[Peer]\\nPublicKey  = {public_key}\\nPresharedKey = {preshared_key}\\nAllowedIPs = {peer_ip}/32"
-    safe_block = shlex.quote(peer_block)
-    _vps1_ssh(f"printf {safe_block} | sudo tee -a {conf} >/dev/null")
+
+def _remove_peers_from_server(public_keys: list[str]) -> None:
+    """Remove peers from VPS1 (runtime + awg1.conf) in one SSH call; absent keys are ignored."""
+    public_keys = [key for key in public_keys if key]
+    if public_keys:
+        _apply_peer_changes([], public_keys)
 
 
 def _remove_peer_from_server(public_key: str) -> None:
     """Remove a peer from VPS1 via SSH (runtime + config file)."""
-    if public_key:
-        safe_public_key = shlex.quote(public_key)
-        # Remove from running interface
-        _vps1_ssh(f"sudo -n awg set awg1 peer {safe_public_key} remove || awg set awg1 peer {safe_public_key} remove")
-        # Remove from config file so it stays gone after awg1 restart
-        conf = "/etc/amnezia/amneziawg/awg1.conf"
-        py_script = (
-            "import re\n"
-            f"pk = {repr(public_key)}\n"
-            f"conf = open({repr(conf)}).read()\n"
-            "sections = re.split(r'(?=^\\[)', conf, flags=re.MULTILINE)\n"
-            "filtered = [s for s in sections if pk not in s]\n"
-            f"open({repr(conf)}, 'w').write(''.join(filtered))\n"
+    _remove_peers_from_server([public_key])
+
+
+# =============================================================================
+# Remote peer changes (single round trip)
+# =============================================================================
+# awg1 edits go through backend.core.awg_apply.APPLY_PEERS_SCRIPT (runtime +
+# atomic awg1.conf rewrite under .awg1.conf.lock), shared with the backend.
+
+
+def _provision_peers_on_server(peers: list[dict[str, str]]) -> tuple[dict[str, str], dict[str, str]]:
+    """Register locally generated peers on awg1 in one SSH round trip.
+
+    ``peers`` items carry peer_ip, public_key and preshared_key; private keys
+    never leave the admin host. Returns (errors by public key, server_info).
+    """
+    result = _apply_peer_changes(peers, [])
+    errors = {
+        item["public_key"]: item.get("error") or "rejected by server"
+        for item in result.get("results", [])
+        if not item.get("ok")
+    }
+    server_info = _apply_server_info_fallbacks({
+        key: str(result[key]).strip()
+        for key in SERVER_INFO_KEYS
+        if result.get(key)
+    })
+    if server_info.get("server_public_key") and all(server_info.get(k) for k in ("Jc", "Jmin", "Jmax", "S1", "S2")):
+        # Provisioning already read awg1 live: reuse it for the following config/QR downloads.
+        _server_info_cache.put(server_info)
+    return errors, server_info
+
+
+def _provision_peer_on_server(peer_ip: str, public_key: str, preshared_key: str) -> dict[str, str]:
+    """Register a single locally generated peer on awg1. Returns server_info."""
+    errors, server_info = _provision_peers_on_server(
+        [{"peer_ip": peer_ip, "public_key": public_key, "preshared_key": preshared_key}]
+    )
+    if public_key in errors:
+        raise RuntimeError(errors[public_key])
+    return server_info
+
+
+def _apply_peer_changes(upsert: list[dict[str, str]], remove: list[str]) -> dict[str, Any]:
+    """Apply a batch of peer upserts/removals to awg1 (runtime + awg1.conf) in one SSH call."""
+    try:
+        out = _vps1_ssh(build_apply_cmd(), stdin_data=build_apply_request(upsert, remove))
+        return parse_apply_result(out)
+    finally:
+        _refresh_peer_metrics()
+
+
+# =============================================================================
+# Peer reconciliation (DB -> awg1)
+# =============================================================================
+
+PEER_RECONCILE_INTERVAL_SEC = int(os.environ.get("ADMIN_PEER_RECONCILE_SEC", "300"))
+PEER_RECONCILE_PRUNE_UNKNOWN = os.environ.get("ADMIN_PEER_RECONCILE_PRUNE_UNKNOWN", "").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+_reconcile_lock = threading.Lock()
+_last_reconcile: dict[str, Any] = {}
+
+
+def _fetch_awg1_peers() -> dict[str, dict[str, Any]]:
+    """Return the live awg1 peers keyed by public key (collector snapshot when fresh)."""
+    snapshot = _peer_metrics
+    if _peer_metrics_fresh(snapshot) and any(peer.get("interface") for peer in snapshot.peers):
+        return {peer["public_key"]: peer for peer in snapshot.peers if peer.get("interface") == "awg1"}
+    dump = _vps1_ssh("sudo -n awg show awg1 dump 2>/dev/null || awg show awg1 dump")
+    if not dump.strip():
+        raise RuntimeError("awg1 dump is empty (interface down?)")
+    return {peer["public_key"]: peer for peer in _parse_wg_dump_peers(dump)}
+
+
+def _compute_peer_diff(
+    db_rows: list[sqlite3.Row], live: dict[str, dict[str, Any]], prune_unknown: bool
+) -> dict[str, list[dict[str, Any]]]:
+    """Diff desired DB state against the live awg1 peers.
+
+    missing: active in DB, absent on awg1; changed: present but AllowedIPs/PSK
+    differ; extra: on awg1 but not active in DB (disabled etc.); unknown: on
+    awg1 and not in DB at all (removed only when prune_unknown is set);
+    unmanaged: active in DB without a PSK (e.g. imported by IP), so it cannot
+    be re-applied; reported only, never pushed or removed.
+    """
+    desired: dict[str, dict[str, Any]] = {}
+    inactive: dict[str, dict[str, Any]] = {}
+    unmanaged: dict[str, dict[str, Any]] = {}
+    for row in db_rows:
+        if not (row["public_key"] and row["ip"]):
+            continue
+        item = {"name": row["name"], "ip": row["ip"], "public_key": row["public_key"], "preshared_key": row["preshared_key"]}
+        if row["status"] != "active":
+            inactive[row["public_key"]] = item
+        elif row["preshared_key"]:
+            desired[row["public_key"]] = item
+        else:
+            unmanaged[row["public_key"]] = item
+
+    diff: dict[str, list[dict[str, Any]]] = {"missing": [], "changed": [], "extra": [], "unknown": [], "unmanaged": []}
+    for pub, item in unmanaged.items():
+        diff["unmanaged"].append({**item, "on_server": pub in live})
+    for pub, item in desired.items():
+        peer = live.get(pub)
+        if peer is None:
+            diff["missing"].append(item)
+            continue
+        reasons = []
+        if peer.get("allowed_ips") != f"{item['ip']}/32":
+            reasons.append("allowed_ips")
+        if peer.get("preshared_key") != item["preshared_key"]:
+            reasons.append("preshared_key")
+        if reasons:
+            diff["changed"].append({**item, "live_allowed_ips": peer.get("allowed_ips"), "fields": reasons})
+    for pub, peer in live.items():
+        if pub in desired or pub in unmanaged:
+            continue
+        if pub in inactive:
+            diff["extra"].append(inactive[pub])
+        else:
+            diff["unknown"].append({"public_key": pub, "allowed_ips": peer.get("allowed_ips"), "pruned": prune_unknown})
+    return diff
+
+
+def _reconcile_peers(dry_run: bool = False, prune_unknown: bool | None = None) -> dict[str, Any]:
+    """Bring awg1 in line with the active peers in SQLite in one batched remote transaction."""
+    global _last_reconcile
+    if prune_unknown is None:
+        prune_unknown = PEER_RECONCILE_PRUNE_UNKNOWN
+    with _reconcile_lock:
+        conn = sqlite3.connect(str(DB_PATH), timeout=10)
+        conn.row_factory = sqlite3.Row
+        db_rows = conn.execute("SELECT name, ip, public_key, preshared_key, status FROM peers").fetchall()
+        conn.close()
+
+        live = _fetch_awg1_peers()
+        diff = _compute_peer_diff(db_rows, live, prune_unknown)
+        upsert = [
+            {"public_key": item["public_key"], "preshared_key": item["preshared_key"], "peer_ip": item["ip"]}
+            for item in diff["missing"] + diff["changed"]
+        ]
+        remove = [item["public_key"] for item in diff["extra"]]
+        if prune_unknown:
+            remove += [item["public_key"] for item in diff["unknown"]]
+
+        for items in diff.values():
+            for item in items:
+                item.pop("preshared_key", None)
+        report: dict[str, Any] = {
+            "ts": int(time.time()),
+            "dry_run": dry_run,
+            "prune_unknown": prune_unknown,
+            "live_peers": len(live),
+            "counts": {key: len(items) for key, items in diff.items()},
+            **diff,
+        }
+        if not dry_run and (upsert or remove):
+            result = _apply_peer_changes(upsert, remove)
+            report["errors"] = [item for item in result.get("results", []) if not item.get("ok")]
+            report["applied"] = {"upserted": len(upsert) - len(report["errors"]), "removed": len(remove)}
+        if not dry_run:
+            _last_reconcile = report
+    return report
+
+
+def _sync_peers_to_server() -> None:
+    """Reconcile DB peers with the running awg1 interface on VPS1.
+
+    Ensures peers survive VPS reboots, redeploys and awg1 restarts: missing or
+    drifted active peers are (re)applied and disabled peers are removed.
+    """
+    try:
+        report = _reconcile_peers()
+    except Exception as exc:
+        log.warning("Peer sync: cannot reconcile with VPS1, skipping: %s", exc)
+        return
+    counts = report["counts"]
+    if report.get("applied") or report.get("errors"):
+        log.info(
+            "Peer sync: missing=%d changed=%d extra=%d unknown=%d errors=%d",
+            counts["missing"], counts["changed"], counts["extra"], counts["unknown"], len(report.get("errors", [])),
         )
-        _vps1_ssh(f"sudo python3 -c {shlex.quote(py_script)}")
+    else:
+        log.info("Peer sync: awg1 matches DB (%d live peers)", report["live_peers"])
+
+
+def _peer_reconcile_loop() -> None:
+    """Reconcile once at startup, then every PEER_RECONCILE_INTERVAL_SEC (0 = startup only)."""
+    _sync_peers_to_server()
+    while PEER_RECONCILE_INTERVAL_SEC > 0:
+        time.sleep(PEER_RECONCILE_INTERVAL_SEC)
+        _sync_peers_to_server()
+
+
+def _start_peer_reconciler() -> None:
+    threading.Thread(target=_peer_reconcile_loop, name="peer-reconcile", daemon=True).start()
 
 
 def _get_all_settings(db: sqlite3.Connection) -> dict[str, str]:
@@ -1041,87 +1448,6 @@ def _generate_qr_base64(text: str) -> str:
     return base64.b64encode(buf.getvalue()).decode()
 
 
-def _parse_conf_sections(conf_text: str) -> tuple[dict[str, str], dict[str, str]]:
-    """Parse WireGuard-like config text into Interface/Peer key-value maps."""
-    iface: dict[str, str] = {}
-    peer: dict[str, str] = {}
-    section = ""
-    for raw in conf_text.splitlines():
-        line = raw.strip()
-        if not line or line.startswith("#"):
-            continue
-        if line.startswith("[") and line.endswith("]"):
-            section = line[1:-1].strip().lower()
-            continue
-        if "=" not in line:
-            continue
-        key, _, val = line.partition("=")
-        key = key.strip()
-        val = val.strip()
-        if section == "interface":
-            iface[key] = val
-        elif section == "peer":
-            peer[key] = val
-    return iface, peer
-
-
-def _amnezia_share_url_from_conf(conf_text: str, description: str = "VPN") -> str:
-    """Build Amnezia share URL (vpn://base64(json)) from a .conf content."""
-    iface, peer = _parse_conf_sections(conf_text)
-
-    endpoint = peer.get("Endpoint", "")
-    host = endpoint
-    port = "51820"
-    if ":" in endpoint:
-        host, _, ep_port = endpoint.rpartition(":")
-        if host:
-            port = ep_port or port
-
-    last_cfg_lines = [
-        "[Interface]",
-        f"Address = {iface.get('Address', '')}",
-        f"DNS = {iface.get('DNS', '10.8.0.2')}",
-        f"PrivateKey = {iface.get('PrivateKey', '')}",
-        f"MTU = {iface.get('MTU', '1280')}",
-        "",
-        "[Peer]",
-        f"PublicKey = {peer.get('PublicKey', '')}",
-        f"AllowedIPs = {peer.get('AllowedIPs', '0.0.0.0/0')}",
-        f"PersistentKeepalive = {peer.get('PersistentKeepalive', '25')}",
-        f"Endpoint = {endpoint}",
-    ]
-    last_config = "\n".join(last_cfg_lines) + "\n"
-
-    awg: dict[str, str] = {
-        "H1": iface.get("H1", ""),
-        "H2": iface.get("H2", ""),
-        "H3": iface.get("H3", ""),
-        "H4": iface.get("H4", ""),
-        "Jc": iface.get("Jc", ""),
-        "Jmax": iface.get("Jmax", ""),
-        "Jmin": iface.get("Jmin", ""),
-        "S1": iface.get("S1", ""),
-        "S2": iface.get("S2", ""),
-        "last_config": last_config,
-        "port": port,
-        "transport_proto": "udp",
-    }
-
-    payload = {
-        "containers": [{
-            "awg": awg,
-            "container": "amnezia-awg",
-        }],
-        "defaultContainer": "amnezia-awg",
-        "description": description,
-        "dns1": iface.get("DNS", "10.8.0.2"),
-        "dns2": "8.8.8.8",
-        "hostName": host or get_env("VPS1_IP"),
-    }
-    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
-    return "vpn://" + base64.b64encode(raw.encode("utf-8")).decode("utf-8")
-
-
 # =============================================================================
 # API: Auth
 # =============================================================================
@@ -1303,152 +1629,156 @@ def _mark_config_downloaded(db: sqlite3.Connection, peer_id: int) -> None:
     db.commit()
 
 
-def _split_wg_dump_line(line: str) -> list[str]:
-    """Split `wg/awg show ... dump` line (tab or space separated)."""
-    return [p for p in re.split(r"\s+", line.strip()) if p]
+# =============================================================================
+# Peer artifacts cache (config text, QR, vpn:// URL)
+# =============================================================================
+
+ARTIFACT_CACHE_DIR = CONFIGS_DIR / ".artifact-cache" / "admin"
+# Artifacts carry private keys: clients must revalidate and shared caches must not store them.
+ARTIFACT_CACHE_CONTROL = "private, no-cache"
+_artifacts = ArtifactCache(ARTIFACT_CACHE_DIR)
+
+
+def _artifact_owner(peer_id: int) -> str:
+    """Cache owner tag of a DB peer's artifacts, evicted when the peer is deleted."""
+    return f"peer-{int(peer_id)}"
+
 
+def _config_file_artifact(config_path: Path, owner: str | None = None) -> tuple[str, str]:
+    """(content, artifact key) of a .conf served as is; keyed by path + mtime + size."""
+    st = config_path.stat()
+    key = artifact_key("config-file", str(config_path), st.st_mtime_ns, st.st_size)
+    data = _artifacts.get_or_build(key, config_path.read_bytes, owner=owner)
+    return data.decode("utf-8"), key
 
-WG_DUMP_IFACE_CANDIDATES = ("awg1", "awg0", "wg1", "wg0")
 
+def _peer_config_artifact(
+    db: sqlite3.Connection | None,
+    peer: Mapping[str, Any],
+    settings: dict[str, str] | None = None,
+    server_info: dict[str, str] | None = None,
+) -> tuple[str, str] | None:
+    """(content, artifact key) of a DB peer config, or None when there is nothing to serve.
 
-def _build_wg_dump_cmd() -> str:
-    """Build remote shell command that concatenates dumps from known WG/AWG interfaces."""
-    iface_list = " ".join(WG_DUMP_IFACE_CANDIDATES)
-    return (
-        f"for IFACE in {iface_list}; do "
-        "DUMP=$(sudo -n awg show \"$IFACE\" dump 2>/dev/null || "
-        "sudo -n wg show \"$IFACE\" dump 2>/dev/null || "
-        "awg show \"$IFACE\" dump 2>/dev/null || "
-        "wg show \"$IFACE\" dump 2>/dev/null || true); "
-        "[ -n \"$DUMP\" ] && printf '%s\\n' \"$DUMP\"; "
-        "done; true"
+    Live configs are keyed by the peer row fields they are rendered from
+    (config_version included) plus hashes of the settings and awg1 server info,
+    so a repeated download neither renders nor rewrites the .conf file.
+    Bulk callers pass ``settings``/``server_info`` loaded once (then ``db`` is unused).
+    """
+    config_path = _resolve_config_path(peer["config_file"])
+    owner = _artifact_owner(peer["id"])
+    if not peer["private_key"]:
+        return _config_file_artifact(config_path, owner) if config_path else None
+
+    if settings is None:
+        settings = _get_all_settings(db)
+    if server_info is None:
+        server_info = _get_server_info()
+    key = artifact_key(
+        "config",
+        peer["id"],
+        peer["config_version"] or 1,
+        peer["ip"],
+        peer["type"],
+        peer["private_key"],
+        peer["preshared_key"] or "",
+        profile_hash(settings),
+        profile_hash(server_info),
     )
 
+    def build() -> bytes:
+        content = _build_config(
+            peer["private_key"],
+            peer["ip"],
+            peer["preshared_key"] or "",
+            peer["type"],
+            settings,
+            server_info,
+        )
+        if config_path:
+            config_path.write_text(content, encoding="utf-8")
+            _config_catalog.invalidate()
+        return content.encode("utf-8")
+
+    return _artifacts.get_or_build(key, build, owner=owner).decode("utf-8"), key
+
 
-def _extract_peer_ip(allowed_ips: str) -> str | None:
-    """Extract first IPv4 from AllowedIPs string."""
-    if not allowed_ips:
+def _artifact_not_modified(key: str) -> Response | None:
+    """304 response when the client already holds the artifact (If-None-Match)."""
+    if not etag_matches(request.headers.get("If-None-Match"), key):
         return None
-    m = re.search(r"(\d{1,3}(?:\.\d{1,3}){3})(?:/\d{1,2})?", allowed_ips)
-    return m.group(1) if m else None
+    return Response(status=304, headers={"ETag": etag_for(key), "Cache-Control": ARTIFACT_CACHE_CONTROL})
 
 
-def _parse_wg_dump_peers(dump: str) -> list[dict[str, Any]]:
-    """
-    Parse concatenated `wg/awg show <iface> dump` output.
+def _artifact_headers(key: str, **extra: str) -> dict[str, str]:
+    return {"ETag": etag_for(key), "Cache-Control": ARTIFACT_CACHE_CONTROL, **extra}
 
-    Notes:
-      - We skip interface rows by requiring CIDR in the allowed-ips column.
-      - Duplicates can appear when querying multiple interface names; dedupe by
-        (public_key, allowed_ips, endpoint).
-    """
-    now = int(time.time())
-    peers_data: list[dict[str, Any]] = []
-    seen: set[tuple[str, str, str]] = set()
-    for line in dump.strip().splitlines():
-        parts = _split_wg_dump_line(line)
-        if len(parts) < 7:
-            continue
-        pub_key = parts[0]
-        preshared = parts[1] if len(parts) > 1 else ""
-        endpoint = parts[2] if len(parts) > 2 else ""
-        allowed_ips = parts[3] if len(parts) > 3 else ""
-        # Interface row doesn't contain AllowedIPs CIDR (peer row does).
-        if "/" not in allowed_ips:
-            continue
 
-        dedupe_key = (pub_key, allowed_ips, endpoint)
-        if dedupe_key in seen:
-            continue
-        seen.add(dedupe_key)
+# =============================================================================
+# Peer metrics collector (background wg dump poller)
+# =============================================================================
 
-        peer_ip = _extract_peer_ip(allowed_ips)
-        try:
-            latest_handshake = int(parts[4]) if len(parts) > 4 and parts[4] and parts[4] != "0" else 0
-        except (ValueError, TypeError):
-            latest_handshake = 0
-        try:
-            rx_bytes = int(parts[5]) if len(parts) > 5 and parts[5] else 0
-        except (ValueError, TypeError):
-            rx_bytes = 0
-        try:
-            tx_bytes = int(parts[6]) if len(parts) > 6 and parts[6] else 0
-        except (ValueError, TypeError):
-            tx_bytes = 0
-        keepalive = parts[7] if len(parts) > 7 else ""
-
-        handshake_age = now - latest_handshake if latest_handshake > 0 else None
-        peers_data.append({
-            "public_key": pub_key,
-            "preshared_key": preshared,
-            "endpoint": endpoint,
-            "allowed_ips": allowed_ips,
-            "peer_ip": peer_ip,
-            "latest_handshake": latest_handshake,
-            "handshake_age_sec": handshake_age,
-            "rx_bytes": rx_bytes,
-            "tx_bytes": tx_bytes,
-            "persistent_keepalive": keepalive,
-        })
-    return peers_data
-
-
-def _normalize_peer_lookup_key(value: Any) -> str:
-    """Normalize lookup keys (IP/public key) from DB/monitoring payload."""
-    if value is None:
-        return ""
-    return str(value).strip()
-
-
-def _prefer_new_peer_data(new_data: dict[str, Any], old_data: dict[str, Any] | None) -> bool:
-    """
-    Decide whether new peer metrics should replace existing metrics in index.
+PEER_METRICS_INTERVAL_SEC = float(os.environ.get("ADMIN_PEER_METRICS_INTERVAL_SEC", "5"))
+# Readers take a reference without locking; the collector swaps in new snapshots.
+_peer_metrics: PeerMetricsSnapshot = _EMPTY_PEER_METRICS
+_peer_metrics_thread: threading.Thread | None = None
+_peer_metrics_wakeup = threading.Event()
+
+
+def _collect_peer_metrics() -> PeerMetricsSnapshot:
+    """Poll VPS1 once and publish a new snapshot (the previous one is kept on SSH errors)."""
+    global _peer_metrics
+    try:
+        snapshot = _build_peer_metrics_snapshot(_parse_wg_dump_peers(_vps1_ssh(_build_wg_dump_cmd())))
+    except Exception as exc:
+        log.debug("Peer metrics poll failed: %s", exc)
+        snapshot = _peer_metrics._replace(error=str(exc))
+    _peer_metrics = snapshot
+    if not snapshot.error:
+        _metrics_history.record_peers(snapshot)
+    return snapshot
+
+
+def _peer_metrics_loop() -> None:
+    while True:
+        _collect_peer_metrics()
+        _peer_metrics_wakeup.wait(PEER_METRICS_INTERVAL_SEC)
+        _peer_metrics_wakeup.clear()
 
-    Prefer the row with newer/latest handshake; if handshakes are equal or absent,
-    prefer the row with larger traffic counters.
-    """
-    if old_data is None:
-        return True
-    old_hs = int(old_data.get("latest_handshake") or 0)
-    new_hs = int(new_data.get("latest_handshake") or 0)
-    if new_hs != old_hs:
-        return new_hs > old_hs
-    old_traffic = int(old_data.get("rx_bytes") or 0) + int(old_data.get("tx_bytes") or 0)
-    new_traffic = int(new_data.get("rx_bytes") or 0) + int(new_data.get("tx_bytes") or 0)
-    return new_traffic >= old_traffic
 
+def _start_peer_metrics_collector() -> None:
+    global _peer_metrics_thread
+    if _peer_metrics_thread is None or not _peer_metrics_thread.is_alive():
+        _peer_metrics_thread = threading.Thread(target=_peer_metrics_loop, name="peer-metrics", daemon=True)
+        _peer_metrics_thread.start()
 
-def _get_monitoring_indexes() -> tuple[dict[str, dict], dict[str, dict]]:
+
+def _refresh_peer_metrics() -> None:
+    """Ask the collector for an early poll (e.g. after peers changed on awg1)."""
+    _peer_metrics_wakeup.set()
+
+
+def _get_peer_metrics() -> PeerMetricsSnapshot:
+    """Return the latest snapshot; polls inline only when the collector is not running."""
+    if _peer_metrics_thread is None or not _peer_metrics_thread.is_alive():
+        return _collect_peer_metrics()
+    return _peer_metrics
+
+
+def _peer_metrics_fresh(snapshot: PeerMetricsSnapshot) -> bool:
+    return snapshot.error is None and time.time() - snapshot.ts <= 2 * PEER_METRICS_INTERVAL_SEC
+
+
+def _get_monitoring_indexes() -> tuple[Mapping[str, dict], Mapping[str, dict]]:
     """
-    Fetch runtime peer snapshot from VPS1.
+    Runtime peer snapshot from VPS1 (served from the background collector).
 
-    Returns two indexes:
+    Returns two read-only indexes:
       - by_ip:  ip -> peer metrics
       - by_pub: public_key -> peer metrics
     """
-    by_ip: dict[str, dict] = {}
-    by_pub: dict[str, dict] = {}
-    dump_cmd = _build_wg_dump_cmd()
-    try:
-        dump = _vps1_ssh(dump_cmd)
-    except Exception as exc:
-        log.warning("Monitoring by IP (SSH): %s — peer connection status will be unavailable", exc)
-        return by_ip, by_pub
-    for peer in _parse_wg_dump_peers(dump):
-        public_key = _normalize_peer_lookup_key(peer.get("public_key"))
-        peer_ip = _normalize_peer_lookup_key(peer.get("peer_ip"))
-        peer_data = {
-            "public_key": public_key,
-            "handshake_age_sec": peer.get("handshake_age_sec"),
-            "rx_bytes": peer.get("rx_bytes", 0),
-            "tx_bytes": peer.get("tx_bytes", 0),
-            "latest_handshake": peer.get("latest_handshake", 0),
-        }
-        if public_key and _prefer_new_peer_data(peer_data, by_pub.get(public_key)):
-            by_pub[public_key] = peer_data
-        if peer_ip and _prefer_new_peer_data(peer_data, by_ip.get(peer_ip)):
-            by_ip[peer_ip] = peer_data
-    return by_ip, by_pub
+    snapshot = _get_peer_metrics()
+    return snapshot.by_ip, snapshot.by_pub
 
 
 @app.route("/api/peers", methods=["GET"])
@@ -1565,6 +1895,151 @@ def peers_list():
     return jsonify(db_peers)
 
 
+def _rollback_server_peers(public_keys: list[str]) -> None:
+    """Best-effort removal of freshly provisioned peers when local steps fail."""
+    try:
+        _remove_peers_from_server(public_keys)
+    except Exception as exc:
+        log.error("Rollback of %d peer(s) on VPS1 failed: %s", len(public_keys), exc)
+
+
+def _rollback_server_peer(public_key: str) -> None:
+    _rollback_server_peers([public_key])
+
+
+def _write_peer_config_file(name: str, ip: str, config_content: str) -> Path:
+    """Write a peer .conf into CONFIGS_DIR and return its path."""
+    safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", name)
+    safe_ip = ip.replace(".", "_")
+    config_path = CONFIGS_DIR / f"peer_{safe_name}_{safe_ip}.conf"
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config_path.write_text(config_content, encoding="utf-8")
+    _config_catalog.invalidate()
+    return config_path
+
+
+def _insert_peer_row(
+    db: sqlite3.Connection,
+    name: str,
+    ip: str,
+    device_type: str,
+    keys: PeerKeys,
+    config_path: Path,
+    group_name: str | None = None,
+    expiry_date: str | None = None,
+    traffic_limit_mb: int | None = None,
+) -> None:
+    """INSERT an active peer row (caller commits)."""
+    now = dt.datetime.now(dt.timezone.utc).isoformat()
+    db.execute(
+        """INSERT INTO peers
+           (name, ip, type, mode, public_key, private_key, preshared_key,
+            created_at, updated_at, status, config_file, group_name, expiry_date, traffic_limit_mb)
+           VALUES (?, ?, ?, 'full', ?, ?, ?, ?, ?, 'active', ?, ?, ?, ?)""",
+        (
+            name,
+            ip,
+            device_type,
+            keys.public_key,
+            keys.private_key,
+            keys.preshared_key,
+            now,
+            now,
+            str(config_path),
+            group_name,
+            expiry_date,
+            traffic_limit_mb,
+        ),
+    )
+
+
+def _create_peers_batch(
+    db: sqlite3.Connection, specs: list[tuple[str, str]]
+) -> tuple[list[dict[str, Any]], list[dict[str, str]]]:
+    """Create many peers with one IP pool reservation, one VPS1 round trip and one commit.
+
+    ``specs`` is a list of (name, device_type). Returns (created peers, errors).
+    """
+    errors: list[dict[str, str]] = []
+    taken_names = {row[0] for row in db.execute("SELECT name FROM peers").fetchall()}
+    wanted: list[tuple[str, str]] = []
+    for name, device_type in specs:
+        if name in taken_names:
+            errors.append({"name": name, "error": f"Peer with name '{name}' already exists"})
+            continue
+        taken_names.add(name)
+        wanted.append((name, device_type))
+
+    ips = _allocate_ips(db, len(wanted))
+    for name, _ in wanted[len(ips):]:
+        errors.append({"name": name, "error": NO_FREE_PEER_IP_ERROR})
+    pending = [(name, device_type, ip, generate_peer_keys()) for (name, device_type), ip in zip(wanted, ips)]
+    if not pending:
+        return [], errors
+
+    try:
+        server_errors, server_info = _provision_peers_on_server(
+            [
+                {"peer_ip": ip, "public_key": keys.public_key, "preshared_key": keys.preshared_key}
+                for _, _, ip, keys in pending
+            ]
+        )
+    except Exception as exc:
+        log.error("Failed to provision %d peers on VPS1: %s", len(pending), exc)
+        _release_ips(db, [ip for _, _, ip, _ in pending])
+        errors.extend({"name": name, "error": f"Failed to register peer on server: {exc}"} for name, *_ in pending)
+        return [], errors
+
+    for name, _, _, keys in pending:
+        if keys.public_key in server_errors:
+            errors.append({"name": name, "error": server_errors[keys.public_key]})
+    provisioned = [item for item in pending if item[3].public_key not in server_errors]
+    _release_ips(db, [ip for _, _, ip, keys in pending if keys.public_key in server_errors])
+
+    settings = _get_all_settings(db)
+    try:
+        configs = [
+            _build_config(keys.private_key, ip, keys.preshared_key, device_type, settings, server_info)
+            for _, device_type, ip, keys in provisioned
+        ]
+    except ValueError as exc:
+        # server_info is shared by the whole batch, so one failure fails all.
+        log.error("Invalid server info for config generation: %s", exc)
+        _rollback_server_peers([keys.public_key for _, _, _, keys in provisioned])
+        _release_ips(db, [ip for _, _, ip, _ in provisioned])
+        errors.extend({"name": name, "error": f"Invalid server config: {exc}"} for name, *_ in provisioned)
+        return [], errors
+
+    created_ips: list[str] = []
+    failed_ips: list[str] = []
+    orphaned_keys: list[str] = []
+    for (name, device_type, ip, keys), config_content in zip(provisioned, configs):
+        config_path = _write_peer_config_file(name, ip, config_content)
+        try:
+            _insert_peer_row(db, name, ip, device_type, keys, config_path)
+        except sqlite3.IntegrityError as exc:
+            log.error("Peer insert failed after provisioning %s: %s", ip, exc)
+            orphaned_keys.append(keys.public_key)
+            failed_ips.append(ip)
+            config_path.unlink(missing_ok=True)
+            errors.append({"name": name, "error": f"Peer IP {ip} was taken concurrently, retry"})
+            continue
+        created_ips.append(ip)
+    # Reservations of failed rows go back, except addresses another peer row holds.
+    if failed_ips:
+        held = _peer_ips_taken(db, failed_ips)
+        _release_ips(db, [ip for ip in failed_ips if ip not in held])
+    db.commit()
+    if orphaned_keys:
+        _rollback_server_peers(orphaned_keys)
+
+    if not created_ips:
+        return [], errors
+    placeholders = ",".join("?" for _ in created_ips)
+    rows = db.execute(f"SELECT * FROM peers WHERE ip IN ({placeholders}) ORDER BY id", created_ips).fetchall()
+    return [_peer_to_dict(row) for row in rows], errors
+
+
 @app.route("/api/peers", methods=["POST"])
 @auth_required
 def peers_create():
@@ -1577,7 +2052,6 @@ def peers_create():
     data = request.get_json(silent=True) or {}
     name = data.get("name", "").strip()
     device_type = data.get("type", "phone").strip().lower()
-    mode = "full"
     group_name = data.get("group_name")
     expiry_date = data.get("expiry_date")
     traffic_limit_mb = data.get("traffic_limit_mb")
@@ -1617,68 +2091,41 @@ def peers_create():
 
     ip = _allocate_ip(db)
     if not ip:
-        return jsonify({"error": "No available IPs in 10.9.0.3-254 range"}), 507
+        return jsonify({"error": NO_FREE_PEER_IP_ERROR}), 507
 
+    keys = generate_peer_keys()
+    priv, pub, psk = keys.private_key, keys.public_key, keys.preshared_key
     try:
-        priv, pub = _generate_keypair_ssh()
-        psk = _generate_psk_ssh()
+        server_info = _provision_peer_on_server(ip, pub, psk)
     except Exception as exc:
-        log.error("Key generation failed: %s", exc)
-        return jsonify({"error": f"Key generation failed: {exc}"}), 500
-
-    if not priv or not pub:
-        return jsonify({"error": "Failed to generate keypair on VPS1"}), 500
+        log.error("Failed to provision peer on VPS1: %s", exc)
+        _release_ips(db, [ip])
+        return jsonify({"error": f"Failed to register peer on server: {exc}"}), 502
 
     settings = _get_all_settings(db)
-    try:
-        server_info = _get_server_info()
-    except Exception as exc:
-        log.error("Failed to get server info: %s", exc)
-        return jsonify({"error": f"Cannot reach VPS1: {exc}"}), 502
-
     try:
         config_content = _build_config(priv, ip, psk, device_type, settings, server_info)
     except ValueError as exc:
         log.error("Invalid server info for config generation: %s", exc)
+        _rollback_server_peer(pub)
+        _release_ips(db, [ip])
         return jsonify({"error": f"Invalid server config: {exc}"}), 500
 
-    safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", name)
-    safe_ip = ip.replace(".", "_")
-    config_filename = f"peer_{safe_name}_{safe_ip}.conf"
-    config_path = CONFIGS_DIR / config_filename
-    config_path.parent.mkdir(parents=True, exist_ok=True)
-    config_path.write_text(config_content, encoding="utf-8")
-
+    config_path = _write_peer_config_file(name, ip, config_content)
     try:
-        _add_peer_to_server(pub, psk, ip)
-    except Exception as exc:
-        log.error("Failed to add peer to VPS1: %s", exc)
+        _insert_peer_row(
+            db, name, ip, device_type, keys, config_path, group_name, expiry_date, traffic_limit_mb
+        )
+        db.commit()
+    except sqlite3.IntegrityError as exc:
+        db.rollback()
+        log.error("Peer insert failed after provisioning %s: %s", ip, exc)
+        _rollback_server_peer(pub)
         config_path.unlink(missing_ok=True)
-        return jsonify({"error": f"Failed to register peer on server: {exc}"}), 502
-
-    now = dt.datetime.now(dt.timezone.utc).isoformat()
-    db.execute(
-        """INSERT INTO peers
-           (name, ip, type, mode, public_key, private_key, preshared_key,
-            created_at, updated_at, status, config_file, group_name, expiry_date, traffic_limit_mb)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'active', ?, ?, ?, ?)""",
-        (
-            name,
-            ip,
-            device_type,
-            mode,
-            pub,
-            priv,
-            psk,
-            now,
-            now,
-            str(config_path),
-            group_name,
-            expiry_date,
-            traffic_limit_mb,
-        ),
-    )
-    db.commit()
+        # Keep the bit set when another peer row holds the address.
+        if not _peer_ips_taken(db, [ip]):
+            _release_ips(db, [ip])
+        return jsonify({"error": f"Peer IP {ip} was taken concurrently, retry"}), 409
 
     sync_peers_to_json()
     audit("peer_created", name, {"ip": ip, "type": device_type, "mode": "full"})
@@ -1691,8 +2138,11 @@ def peers_create():
 @auth_required
 def peers_batch_create():
     """Batch-create peers from prefix+count or CSV data."""
+    if not _check_peer_creation_rate_limit(request.remote_addr or "unknown"):
+        return jsonify({"error": "Too many peer creation requests. Try again later."}), 429
+
     data = request.get_json(silent=True) or {}
-    results: list[dict] = []
+    specs: list[tuple[str, str]] = []
     errors: list[dict] = []
 
     csv_data = data.get("csv")
@@ -1717,22 +2167,7 @@ def peers_batch_create():
                 pmode = "full"
             if not name:
                 continue
-            with app.test_request_context(
-                "/api/peers",
-                method="POST",
-                json={"name": name, "type": ptype},
-                headers={"Authorization": request.headers.get("Authorization", "")},
-            ):
-                g.user_id = getattr(g, "user_id", None)
-                g.username = getattr(g, "username", None)
-                g.token = getattr(g, "token", None)
-                resp = peers_create()
-                resp_data = resp[0].get_json() if isinstance(resp, tuple) else resp.get_json()
-                status_code = resp[1] if isinstance(resp, tuple) else 200
-                if status_code < 300:
-                    results.append(resp_data)
-                else:
-                    errors.append({"name": name, "error": resp_data.get("error", "unknown")})
+            specs.append((name, (ptype or "phone").lower()))
     else:
         prefix = data.get("prefix", "peer")
         count = int(data.get("count", 0))
@@ -1743,28 +2178,15 @@ def peers_batch_create():
 
         if count <= 0:
             return jsonify({"error": "count must be > 0"}), 400
-        if count > 252:
-            return jsonify({"error": "count exceeds max available IPs (252)"}), 400
-
-        for i in range(1, count + 1):
-            name = f"{prefix}-{i:03d}"
-            with app.test_request_context(
-                "/api/peers",
-                method="POST",
-                json={"name": name, "type": ptype},
-                headers={"Authorization": request.headers.get("Authorization", "")},
-            ):
-                g.user_id = getattr(g, "user_id", None)
-                g.username = getattr(g, "username", None)
-                g.token = getattr(g, "token", None)
-                resp = peers_create()
-                resp_data = resp[0].get_json() if isinstance(resp, tuple) else resp.get_json()
-                status_code = resp[1] if isinstance(resp, tuple) else 200
-                if status_code < 300:
-                    results.append(resp_data)
-                else:
-                    errors.append({"name": name, "error": resp_data.get("error", "unknown")})
+        if count > PEER_IP_POOL_CAPACITY:
+            return jsonify({"error": f"count exceeds max available IPs ({PEER_IP_POOL_CAPACITY})"}), 400
 
+        specs = [(f"{prefix}-{i:03d}", str(ptype).strip().lower()) for i in range(1, count + 1)]
+
+    results, batch_errors = _create_peers_batch(get_db(), specs)
+    errors.extend(batch_errors)
+    if results:
+        sync_peers_to_json()
     audit("peers_batch_created", "", {"created": len(results), "failed": len(errors)})
     return jsonify({"created": results, "errors": errors, "total": len(results), "failed": len(errors)})
 
@@ -1906,11 +2328,7 @@ def peers_import_by_ip(peer_ip: str):
     if existing is not None:
         return jsonify(_enrich_peer_config_state(_peer_to_dict(existing)))
 
-    config_peer = None
-    for cp in _scan_peers_from_configs_dir():
-        if cp.get("ip") == ip:
-            config_peer = cp
-            break
+    config_peer = _config_peer_by_ip(ip)
     if config_peer is None:
         return jsonify({"error": "Peer config not found"}), 404
 
@@ -1931,6 +2349,7 @@ def peers_import_by_ip(peer_ip: str):
            VALUES (?, ?, 'phone', 'full', ?, ?, 'active', ?, 1, 0)""",
         (name, ip, now, now, config_peer.get("config_file")),
     )
+    _claim_ips(db, [ip])
     db.commit()
 
     sync_peers_to_json()
@@ -1958,7 +2377,9 @@ def peers_delete(peer_id: int):
         config_path.unlink(missing_ok=True)
 
     db.execute("DELETE FROM peers WHERE id = ?", (peer_id,))
+    _release_ips(db, [peer["ip"]])
     db.commit()
+    _artifacts.evict_owner(_artifact_owner(peer_id))
 
     sync_peers_to_json()
     audit("peer_deleted", peer["name"], {"ip": peer["ip"]})
@@ -2036,29 +2457,18 @@ def peers_config(peer_id: int):
     if peer is None:
         return jsonify({"error": "Peer not found"}), 404
 
-    config_path = _resolve_config_path(peer["config_file"])
-    if peer["private_key"]:
-        settings = _get_all_settings(db)
-        try:
-            server_info = _get_server_info()
-            content = _build_config(
-                peer["private_key"],
-                peer["ip"],
-                peer["preshared_key"] or "",
-                peer["type"],
-                settings,
-                server_info,
-            )
-            if config_path:
-                config_path.write_text(content, encoding="utf-8")
-        except Exception as exc:
-            return jsonify({"error": f"Failed to build live config: {exc}"}), 500
-    elif config_path:
-        content = config_path.read_text(encoding="utf-8")
-    else:
+    try:
+        artifact = _peer_config_artifact(db, peer)
+    except Exception as exc:
+        return jsonify({"error": f"Failed to build live config: {exc}"}), 500
+    if artifact is None:
         return jsonify({"error": "Config not available"}), 404
+    content, key = artifact
     if _config_has_placeholders(content):
         return jsonify({"error": "Config contains placeholder values (TODO_*). Regenerate peer config."}), 422
+    not_modified = _artifact_not_modified(key)
+    if not_modified is not None:
+        return not_modified
 
     _mark_config_downloaded(db, peer_id)
     safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", peer["name"])
@@ -2066,7 +2476,7 @@ def peers_config(peer_id: int):
     return Response(
         content,
         mimetype="text/plain",
-        headers={"Content-Disposition": f'attachment; filename="{safe_name}.conf"'},
+        headers=_artifact_headers(key, **{"Content-Disposition": f'attachment; filename="{safe_name}.conf"'}),
     )
 
 
@@ -2077,28 +2487,32 @@ def peers_config_by_ip(peer_ip: str):
     peer_ip = peer_ip.replace("_", ".")
     db = get_db()
     db_peer = db.execute("SELECT id, name, ip FROM peers WHERE ip = ?", (peer_ip,)).fetchone()
-    for cp in _scan_peers_from_configs_dir():
-        if cp["ip"] == peer_ip:
-            config_path = Path(cp["config_file"])
-            if not config_path.is_file():
-                config_path = CONFIGS_DIR / Path(cp["config_file"]).name
-            if config_path.is_file():
-                content = config_path.read_text(encoding="utf-8")
-                if _config_has_placeholders(content):
-                    return jsonify({"error": "Config contains placeholder values (TODO_*). Regenerate peer config."}), 422
-                safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", cp["name"])
-                if db_peer is not None:
-                    _mark_config_downloaded(db, int(db_peer["id"]))
-                    audit(
-                        "peer_config_downloaded",
-                        db_peer["name"],
-                        {"ip": db_peer["ip"], "peer_id": int(db_peer["id"]), "source": "by_ip"},
-                    )
-                return Response(
-                    content,
-                    mimetype="text/plain",
-                    headers={"Content-Disposition": f'attachment; filename="{safe_name}.conf"'},
+    cp = _config_peer_by_ip(peer_ip)
+    if cp is not None:
+        config_path = Path(cp["config_file"])
+        if not config_path.is_file():
+            config_path = CONFIGS_DIR / Path(cp["config_file"]).name
+        if config_path.is_file():
+            owner = _artifact_owner(db_peer["id"]) if db_peer is not None else None
+            content, key = _config_file_artifact(config_path, owner)
+            if _config_has_placeholders(content):
+                return jsonify({"error": "Config contains placeholder values (TODO_*). Regenerate peer config."}), 422
+            not_modified = _artifact_not_modified(key)
+            if not_modified is not None:
+                return not_modified
+            safe_name = re.sub(r"[^a-zA-Z0-9_-]", "_", cp["name"])
+            if db_peer is not None:
+                _mark_config_downloaded(db, int(db_peer["id"]))
+                audit(
+                    "peer_config_downloaded",
+                    db_peer["name"],
+                    {"ip": db_peer["ip"], "peer_id": int(db_peer["id"]), "source": "by_ip"},
                 )
+            return Response(
+                content,
+                mimetype="text/plain",
+                headers=_artifact_headers(key, **{"Content-Disposition": f'attachment; filename="{safe_name}.conf"'}),
+            )
     return jsonify({"error": "Config not found"}), 404
 
 
@@ -2111,43 +2525,182 @@ def peers_qr(peer_id: int):
     if peer is None:
         return jsonify({"error": "Peer not found"}), 404
 
-    config_path = _resolve_config_path(peer["config_file"])
-    if peer["private_key"]:
-        settings = _get_all_settings(db)
-        try:
-            server_info = _get_server_info()
-            content = _build_config(
-                peer["private_key"],
-                peer["ip"],
-                peer["preshared_key"] or "",
-                peer["type"],
-                settings,
-                server_info,
-            )
-            if config_path:
-                config_path.write_text(content, encoding="utf-8")
-        except Exception as exc:
-            return jsonify({"error": f"Failed to build live config: {exc}"}), 500
-    elif config_path:
-        content = config_path.read_text(encoding="utf-8")
-    else:
+    try:
+        artifact = _peer_config_artifact(db, peer)
+    except Exception as exc:
+        return jsonify({"error": f"Failed to build live config: {exc}"}), 500
+    if artifact is None:
         return jsonify({"error": "Config not available for QR"}), 404
+    content, config_key = artifact
     if _config_has_placeholders(content):
         return jsonify({"error": "Config contains placeholder values (TODO_*). Regenerate peer config before QR export."}), 422
 
+    key = artifact_key("qr", config_key)
+    not_modified = _artifact_not_modified(key)
+    if not_modified is not None:
+        return not_modified
     # Amnezia reliably imports QR with raw WG/AWG config text.
     # Keep QR payload identical to downloadable .conf content.
-    qr_b64 = _generate_qr_base64(content)
-    return jsonify({"qr_png_base64": qr_b64})
+    qr_b64 = _artifacts.get_or_build(
+        key, lambda: _generate_qr_base64(content).encode("ascii"), owner=_artifact_owner(peer_id)
+    ).decode("ascii")
+    response = jsonify({"qr_png_base64": qr_b64})
+    response.headers.update(_artifact_headers(key))
+    return response
+
+
+@app.route("/api/peers/<int:peer_id>/share-url", methods=["GET"])
+@auth_required
+def peers_share_url(peer_id: int):
+    """Get Amnezia share URL (vpn://...) for a peer's config."""
+    db = get_db()
+    peer = db.execute("SELECT * FROM peers WHERE id = ?", (peer_id,)).fetchone()
+    if peer is None:
+        return jsonify({"error": "Peer not found"}), 404
+
+    try:
+        artifact = _peer_config_artifact(db, peer)
+    except Exception as exc:
+        return jsonify({"error": f"Failed to build live config: {exc}"}), 500
+    if artifact is None:
+        return jsonify({"error": "Config not available"}), 404
+    content, config_key = artifact
+    if _config_has_placeholders(content):
+        return jsonify({"error": "Config contains placeholder values (TODO_*). Regenerate peer config."}), 422
+
+    description = peer["name"] or "VPN"
+    # hostName falls back to VPS1_IP when the config has no endpoint.
+    key = artifact_key("vpn-url", config_key, description, get_env("VPS1_IP"))
+    not_modified = _artifact_not_modified(key)
+    if not_modified is not None:
+        return not_modified
+    url = _artifacts.get_or_build(
+        key,
+        lambda: amnezia_share_url(content, description, get_env("VPS1_IP")).encode("ascii"),
+        owner=_artifact_owner(peer_id),
+    ).decode("ascii")
+    response = jsonify({"vpn_url": url})
+    response.headers.update(_artifact_headers(key))
+    return response
+
+
+EXPORT_PARTS = ("conf", "qr", "amnezia")
+
+
+def _render_peer_export(
+    peer: dict[str, Any],
+    settings: dict[str, str],
+    server_info: dict[str, str],
+    parts: tuple[str, ...],
+) -> list[tuple[str, bytes]]:
+    """Archive members of one peer, named by its safe name (runs on the export pool)."""
+    artifact = _peer_config_artifact(None, peer, settings, server_info)
+    if artifact is None:
+        raise ValueError("config not available")
+    content, config_key = artifact
+    if _config_has_placeholders(content):
+        raise ValueError("config contains placeholder values (TODO_*)")
+    name = peer["export_name"]
+    members: list[tuple[str, bytes]] = []
+    if "conf" in parts:
+        members.append((f"configs/{name}.conf", content.encode("utf-8")))
+    if "qr" in parts:
+        qr_b64 = _artifacts.get_or_build(
+            artifact_key("qr", config_key),
+            lambda: _generate_qr_base64(content).encode("ascii"),
+            owner=_artifact_owner(peer["id"]),
+        )
+        members.append((f"qr/{name}.png", base64.b64decode(qr_b64)))
+    if "amnezia" in parts:
+        payload = amnezia_payload(content, peer["name"] or "VPN", get_env("VPS1_IP"))
+        members.append((f"amnezia/{name}.json", json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")))
+    return members
+
+
+def _stream_peers_export(
+    peers: list[dict[str, Any]],
+    settings: dict[str, str],
+    server_info: dict[str, str],
+    parts: tuple[str, ...],
+):
+    errors: list[str] = []
+
+    def entries():
+        for peer, future in render_ordered(lambda p: _render_peer_export(p, settings, server_info, parts), peers):
+            try:
+                yield from future.result()
+            except Exception as exc:
+                errors.append(f"{peer['name']} ({peer['ip']}): {exc}")
+        if errors:
+            yield "export-errors.txt", ("\n".join(errors) + "\n").encode("utf-8")
+
+    return stream_zip(entries())
+
+
+@app.route("/api/peers/export", methods=["GET"])
+@auth_required
+def peers_export():
+    """Stream a ZIP of configs, QR PNGs and AmneziaVPN JSON for peers matching the filter."""
+    db = get_db()
+    conditions: list[str] = []
+    params: list[Any] = []
+    status = request.args.get("status")
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    group = request.args.get("group")
+    if group:
+        conditions.append("group_name = ?")
+        params.append(group)
+    ids_raw = (request.args.get("ids") or "").strip()
+    if ids_raw:
+        try:
+            ids = sorted({int(item) for item in ids_raw.split(",") if item.strip()})
+        except ValueError:
+            return jsonify({"error": "ids must be a comma separated list of integers"}), 400
+        conditions.append(f"id IN ({','.join('?' for _ in ids)})")
+        params.extend(ids)
+    parts = tuple(p.strip() for p in (request.args.get("include") or ",".join(EXPORT_PARTS)).split(",") if p.strip())
+    if not parts or any(p not in EXPORT_PARTS for p in parts):
+        return jsonify({"error": f"include must be a subset of {','.join(EXPORT_PARTS)}"}), 400
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    peers = [_peer_to_dict(r) for r in db.execute(f"SELECT * FROM peers{where} ORDER BY id", params).fetchall()]
+    if not peers:
+        return jsonify({"error": "No peers match the filter"}), 404
+    used_names: set[str] = set()
+    for peer in peers:
+        name = re.sub(r"[^a-zA-Z0-9_-]", "_", peer["name"] or "") or f"peer_{peer['id']}"
+        if name in used_names:
+            name = f"{name}_{peer['id']}"
+        used_names.add(name)
+        peer["export_name"] = name
+
+    settings = _get_all_settings(db)
+    try:
+        server_info = _get_server_info()
+    except Exception as exc:
+        return jsonify({"error": f"Failed to load server info: {exc}"}), 502
+
+    audit("peers_exported", "", {"count": len(peers), "status": status, "group": group, "ids": ids_raw or None, "include": list(parts)})
+    filename = f"peers-export-{dt.datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+    return Response(
+        _stream_peers_export(peers, settings, server_info, parts),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": ARTIFACT_CACHE_CONTROL,
+        },
+    )
 
 
 @app.route("/api/peers/stats", methods=["GET"])
 @auth_required
 def peers_stats():
-    """Return subnet statistics: total, used, available IPs."""
+    """Return pool statistics: total, used, available IPs (from the pool bitmaps)."""
     db = get_db()
-    total_range = 252  # 10.9.0.3 — 10.9.0.254
-    used = db.execute("SELECT COUNT(*) FROM peers").fetchone()[0]
+    with _ip_pools_locked(db) as pools:
+        stats = pool_stats(pools)
     by_status = db.execute(
         "SELECT status, COUNT(*) as cnt FROM peers GROUP BY status"
     ).fetchall()
@@ -2156,14 +2709,40 @@ def peers_stats():
     ).fetchall()
 
     return jsonify({
-        "total_range": total_range,
-        "used": used,
-        "available": total_range - used,
+        **stats,
         "by_status": {r["status"]: r["cnt"] for r in by_status},
         "by_type": {r["type"]: r["cnt"] for r in by_type},
     })
 
 
+@app.route("/api/peers/reconcile", methods=["GET"])
+@auth_required
+def peers_reconcile_report():
+    """Dry-run: show the DB vs awg1 diff without changing anything."""
+    prune = request.args.get("prune_unknown")
+    try:
+        report = _reconcile_peers(dry_run=True, prune_unknown=None if prune is None else prune.lower() in ("1", "true"))
+    except Exception as exc:
+        return jsonify({"error": f"Reconcile failed: {exc}"}), 502
+    last = _last_reconcile
+    report["last_applied"] = {k: last.get(k) for k in ("ts", "counts", "applied", "errors")} if last else None
+    return jsonify(report)
+
+
+@app.route("/api/peers/reconcile", methods=["POST"])
+@auth_required
+def peers_reconcile_apply():
+    """Apply the DB vs awg1 diff in one batched remote transaction."""
+    data = request.get_json(silent=True) or {}
+    prune = data.get("prune_unknown")
+    try:
+        report = _reconcile_peers(prune_unknown=None if prune is None else bool(prune))
+    except Exception as exc:
+        return jsonify({"error": f"Reconcile failed: {exc}"}), 502
+    audit("peers_reconciled", "", {"counts": report["counts"], "applied": report.get("applied")})
+    return jsonify(report)
+
+
 # =============================================================================
 # API: Monitoring
 # =============================================================================
@@ -2172,34 +2751,31 @@ def peers_stats():
 @app.route("/api/monitoring/data", methods=["GET"])
 @auth_required_or_local
 def monitoring_data():
-    """Return current monitoring data from scripts/monitor/vpn-output/data.json."""
-    monitor_path = _resolve_monitor_data_path()
-    if monitor_path is None:
+    """Return current monitoring data (pushed snapshot, else scripts/monitor/vpn-output/data.json)."""
+    try:
+        data, source = _read_monitor_data()
+    except (json.JSONDecodeError, OSError) as exc:
+        return jsonify({"error": f"Failed to read monitoring data: {exc}"}), 500
+    if data is None:
         return jsonify({
             "error": "Monitoring data not available",
             "paths": [str(MONITOR_DATA_PATH), str(MONITOR_DATA_FALLBACK_PATH)],
             "_monitor_running": False,
         }), 404
-    try:
-        data = json.loads(monitor_path.read_text(encoding="utf-8"))
-        data["_monitor_running"] = _is_monitor_running()
-        data["_monitor_path"] = str(monitor_path)
-        return jsonify(data)
-    except (json.JSONDecodeError, OSError) as exc:
-        return jsonify({"error": f"Failed to read monitoring data: {exc}"}), 500
+    data["_monitor_running"] = _is_monitor_running()
+    data["_monitor_path"] = source
+    return jsonify(data)
 
 
 @app.route("/api/monitoring/peers", methods=["GET"])
 @auth_required_or_local
 def monitoring_peers():
-    """Get active peers with handshake times and traffic from VPS1 via SSH."""
-    dump_cmd = _build_wg_dump_cmd()
-    try:
-        dump = _vps1_ssh(dump_cmd)
-    except Exception as exc:
-        log.warning("monitoring/peers SSH failed: %s (check VPS1_IP, VPS1_KEY in .env)", exc)
-        return jsonify({"error": f"SSH failed: {exc}"}), 502
-    return jsonify(_parse_wg_dump_peers(dump))
+    """Get active peers with handshake times and traffic from VPS1 (collector snapshot)."""
+    snapshot = _get_peer_metrics()
+    if snapshot.error and not snapshot.ts:
+        log.warning("monitoring/peers SSH failed: %s (check VPS1_IP, VPS1_KEY in .env)", snapshot.error)
+        return jsonify({"error": f"SSH failed: {snapshot.error}"}), 502
+    return jsonify(list(snapshot.peers))
 
 
 # WebSocket: real-time monitoring
@@ -2216,9 +2792,8 @@ def _monitor_loop() -> None:
     global _last_monitor_restart
     while not _monitor_stop.is_set():
         try:
-            monitor_path = _resolve_monitor_data_path()
-            if monitor_path is not None:
-                data = json.loads(monitor_path.read_text(encoding="utf-8"))
+            data, _ = _read_monitor_data()
+            if data is not None:
                 socketio.emit("monitoring_update", data, namespace="/")
             # Auto-restart monitor-web.sh if data.json is stale
             if not _is_monitor_running():
@@ -2247,6 +2822,294 @@ def _ws_disconnect():
     pass
 
 
+# =============================================================================
+# Metrics history (time series with 10s -> 1m -> 1h rollups)
+# =============================================================================
+
+METRICS_DB_PATH = Path(os.environ.get("ADMIN_METRICS_DB") or SCRIPT_DIR / "metrics.db")
+# (bucket seconds, retention seconds) per tier, finest first. Every sample is
+# folded into all tiers on write, so 24h/30d charts read pre-aggregated rows.
+METRICS_TIERS: tuple[tuple[int, int], ...] = (
+    (10, int(os.environ.get("ADMIN_METRICS_RETAIN_10S_HOURS", "24")) * 3600),
+    (60, int(os.environ.get("ADMIN_METRICS_RETAIN_1M_DAYS", "7")) * 86400),
+    (3600, int(os.environ.get("ADMIN_METRICS_RETAIN_1H_DAYS", "400")) * 86400),
+)
+METRICS_EVENTS_RETAIN_DAYS = int(os.environ.get("ADMIN_METRICS_EVENTS_RETAIN_DAYS", "90"))
+METRICS_MAX_POINTS = 2000
+METRICS_PRUNE_INTERVAL_SEC = 600
+
+# Numeric data.json fields recorded per VPS as "<vps>.<field>" series.
+HISTORY_VPS_METRICS = (
+    "online", "load1", "load5", "load15", "mem_used_mb", "mem_avail_mb", "disk_pct",
+    "rx_speed", "tx_speed", "vpn_rx_speed", "vpn_tx_speed", "tcp_est", "udp_conn",
+    "conntrack_count", "hs0_age", "hs1_age", "active_peers_awg1", "peers_awg1",
+)
+# Per-peer series "peer.<public_key>.<field>", written only when a value changes.
+HISTORY_PEER_METRICS = ("rx_bytes", "tx_bytes", "latest_handshake")
+
+_METRICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_series (
+    id    INTEGER PRIMARY KEY AUTOINCREMENT,
+    name  TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS metric_points (
+    tier       INTEGER NOT NULL,
+    series_id  INTEGER NOT NULL,
+    ts         INTEGER NOT NULL,
+    n          INTEGER NOT NULL,
+    sum        REAL NOT NULL,
+    min        REAL NOT NULL,
+    max        REAL NOT NULL,
+    last       REAL NOT NULL,
+    PRIMARY KEY (tier, series_id, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS monitoring_events (
+    id    INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts    INTEGER NOT NULL,
+    type  TEXT NOT NULL,
+    vps   TEXT,
+    data  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_monitoring_events_ts ON monitoring_events(ts);
+"""
+
+_METRICS_UPSERT = """
+INSERT INTO metric_points (tier, series_id, ts, n, sum, min, max, last)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (tier, series_id, ts) DO UPDATE SET
+    n = n + 1,
+    sum = sum + excluded.sum,
+    min = MIN(min, excluded.min),
+    max = MAX(max, excluded.max),
+    last = excluded.last
+"""
+
+
+class MetricsHistory:
+    """Embedded SQLite time-series store (separate file from admin.db).
+
+    Samples are upserted into every tier bucket in one transaction (n/sum/min/
+    max/last), so rollups never need a batch job; retention is a periodic
+    per-tier DELETE. One connection shared under a lock: writers are the SSE
+    producer and the peer metrics collector, readers are API requests.
+    """
+
+    def __init__(self, path: Path, tiers: tuple[tuple[int, int], ...]) -> None:
+        self.path = path
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._series: dict[str, int] = {}
+        self._last_vps_ts = 0
+        self._last_peer_values: dict[str, tuple] = {}
+        self._last_prune = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_METRICS_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _series_ids(self, conn: sqlite3.Connection, names: list[str], create: bool) -> dict[str, int]:
+        missing = [n for n in names if n not in self._series]
+        if missing and create:
+            conn.executemany("INSERT OR IGNORE INTO metric_series (name) VALUES (?)", [(n,) for n in missing])
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for sid, name in conn.execute(f"SELECT id, name FROM metric_series WHERE name IN ({marks})", chunk):
+                self._series[name] = sid
+        return {n: self._series[n] for n in names if n in self._series}
+
+    # --- writes -------------------------------------------------------------
+
+    def record(self, ts: int, samples: dict[str, float]) -> None:
+        """Fold one sample per series into every tier bucket."""
+        if not samples:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                ids = self._series_ids(conn, list(samples), create=True)
+                rows = []
+                for tier, (step, _) in enumerate(self.tiers):
+                    bucket = ts - ts % step
+                    for name, value in samples.items():
+                        rows.append((tier, ids[name], bucket, value, value, value, value))
+                conn.executemany(_METRICS_UPSERT, rows)
+                conn.commit()
+                if time.time() - self._last_prune >= METRICS_PRUNE_INTERVAL_SEC:
+                    self._prune_locked(conn)
+        except sqlite3.Error as exc:
+            log.warning("Metrics history write failed: %s", exc)
+
+    def record_vps(self, data: dict) -> None:
+        """Record per-VPS metrics from a monitoring snapshot (once per collector ts)."""
+        ts = int(data.get("ts") or 0)
+        if ts <= 0 or ts == self._last_vps_ts:
+            return
+        self._last_vps_ts = ts
+        samples: dict[str, float] = {}
+        for vps_key in ("vps1", "vps2"):
+            block = data.get(vps_key)
+            if not isinstance(block, dict):
+                continue
+            for field in HISTORY_VPS_METRICS:
+                value = block.get(field)
+                if isinstance(value, (int, float)):
+                    samples[f"{vps_key}.{field}"] = float(value)
+        self.record(ts, samples)
+
+    def record_peers(self, snapshot: PeerMetricsSnapshot) -> None:
+        """Record rx/tx/handshake for peers whose values changed since the last poll."""
+        samples: dict[str, float] = {}
+        for public_key, peer in snapshot.by_pub.items():
+            values = tuple(int(peer.get(field) or 0) for field in HISTORY_PEER_METRICS)
+            if self._last_peer_values.get(public_key) == values:
+                continue
+            self._last_peer_values[public_key] = values
+            for field, value in zip(HISTORY_PEER_METRICS, values):
+                samples[f"peer.{public_key}.{field}"] = float(value)
+        self.record(int(snapshot.ts), samples)
+
+    def add_events(self, events: list[dict]) -> None:
+        if not events:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.executemany(
+                    "INSERT INTO monitoring_events (ts, type, vps, data) VALUES (?, ?, ?, ?)",
+                    [
+                        (int(e.get("ts") or time.time()), str(e.get("type", "")), e.get("vps"),
+                         json.dumps(e, ensure_ascii=False))
+                        for e in events
+                    ],
+                )
+                conn.commit()
+        except sqlite3.Error as exc:
+            log.warning("Monitoring events write failed: %s", exc)
+
+    def _prune_locked(self, conn: sqlite3.Connection) -> None:
+        now = time.time()
+        self._last_prune = now
+        series_ids = [(sid,) for (sid,) in conn.execute("SELECT id FROM metric_series")]
+        for tier, (_, retention) in enumerate(self.tiers):
+            cutoff = int(now - retention)
+            # Per-series deletes walk the (tier, series_id, ts) primary key.
+            conn.executemany(
+                f"DELETE FROM metric_points WHERE tier = {tier} AND series_id = ? AND ts < {cutoff}",
+                series_ids,
+            )
+        conn.execute(
+            "DELETE FROM monitoring_events WHERE ts < ?",
+            (int(now - METRICS_EVENTS_RETAIN_DAYS * 86400),),
+        )
+        conn.commit()
+
+    # --- reads --------------------------------------------------------------
+
+    def pick_tier(self, start: int, end: int, resolution: int | None = None) -> int:
+        """Finest tier that still holds `start` and yields at most METRICS_MAX_POINTS."""
+        now = time.time()
+        for tier, (step, retention) in enumerate(self.tiers):
+            if resolution and step < resolution:
+                continue
+            if start >= now - retention and (end - start) / step <= METRICS_MAX_POINTS:
+                return tier
+        return len(self.tiers) - 1
+
+    def query(self, names: list[str], start: int, end: int,
+              resolution: int | None = None) -> tuple[int, dict[str, list[list[float]]]]:
+        """Return (bucket seconds, {series: [[ts, avg, min, max, last], ...]})."""
+        tier = self.pick_tier(start, end, resolution)
+        result: dict[str, list[list[float]]] = {name: [] for name in names}
+        with self._lock:
+            conn = self._db()
+            ids = self._series_ids(conn, names, create=False)
+            for name, sid in ids.items():
+                rows = conn.execute(
+                    "SELECT ts, sum / n, min, max, last FROM metric_points "
+                    "WHERE tier = ? AND series_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                    (tier, sid, start - start % self.tiers[tier][0], end),
+                ).fetchall()
+                result[name] = [[ts, round(avg, 3), mn, mx, last] for ts, avg, mn, mx, last in rows]
+        return self.tiers[tier][0], result
+
+    def events(self, start: int, end: int, limit: int, event_type: str | None = None) -> list[dict]:
+        sql = "SELECT data FROM monitoring_events WHERE ts >= ? AND ts <= ?"
+        params: list[Any] = [start, end]
+        if event_type:
+            sql += " AND type = ?"
+            params.append(event_type)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def recent_events(self, limit: int) -> list[dict]:
+        return self.events(0, 2**62, limit)
+
+
+_metrics_history = MetricsHistory(METRICS_DB_PATH, METRICS_TIERS)
+
+
+def _parse_epoch_arg(name: str, default: int) -> int:
+    raw = request.args.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(float(raw))
+    except ValueError:
+        raise ValueError(f"{name} must be a unix timestamp") from None
+
+
+@app.route("/api/monitoring/history", methods=["GET"])
+@auth_required_or_local
+def monitoring_history():
+    """Range query over metrics history.
+
+    Query: series=vps1.load1,vps1.rx_speed and/or peer=<public_key>,
+    from/to (unix seconds, default last hour), resolution (min bucket seconds).
+    Peer series are change-only: a missing bucket means the value did not change.
+    """
+    now = int(time.time())
+    try:
+        end = _parse_epoch_arg("to", now)
+        start = _parse_epoch_arg("from", end - 3600)
+        resolution = int(request.args.get("resolution", "0") or 0)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if start >= end:
+        return jsonify({"error": "from must be earlier than to"}), 400
+
+    names = [s.strip() for s in request.args.get("series", "").split(",") if s.strip()]
+    for public_key in request.args.getlist("peer"):
+        names.extend(f"peer.{public_key.strip()}.{field}" for field in HISTORY_PEER_METRICS)
+    if not names:
+        return jsonify({
+            "error": "series or peer is required",
+            "vps_metrics": [f"{vps}.{m}" for vps in ("vps1", "vps2") for m in HISTORY_VPS_METRICS],
+        }), 400
+    if len(names) > 50:
+        return jsonify({"error": "too many series (max 50)"}), 400
+
+    step, series = _metrics_history.query(names, start, end, resolution or None)
+    return jsonify({
+        "from": start,
+        "to": end,
+        "resolution": step,
+        "columns": ["ts", "avg", "min", "max", "last"],
+        "series": series,
+    })
+
+
 # =============================================================================
 # SSE: Real-time monitoring stream
 # =============================================================================
@@ -2256,35 +3119,12 @@ _events_lock = threading.Lock()
 _CONNECTED_HS_THRESHOLD = 55   # seconds — peer is "connected" when handshake < this
 _DISCONNECTED_HS_THRESHOLD = 180  # seconds — peer is "disconnected" when handshake > this
 
-# Previous monitoring snapshot for diff detection (shared across SSE clients)
+# Previous monitoring snapshot for event detection (owned by the SSE producer)
 _prev_monitor_snapshot: dict | None = None
-_prev_snapshot_lock = threading.Lock()
-
-# Cached peer metrics for SSE (refreshed every 2s to avoid SSH per-tick)
-_cached_peers: list[dict] = []
-_cached_peers_ts: float = 0.0
-_cached_peers_lock = threading.Lock()
-_PEER_CACHE_TTL = 2.0  # seconds
-
 
 def _get_cached_peers() -> list[dict]:
-    """Return cached WG peer metrics, refreshing via SSH if stale."""
-    global _cached_peers, _cached_peers_ts
-    now = time.time()
-    with _cached_peers_lock:
-        if now - _cached_peers_ts < _PEER_CACHE_TTL:
-            return _cached_peers
-    # Fetch outside lock to avoid blocking other threads
-    try:
-        dump = _vps1_ssh(_build_wg_dump_cmd())
-        peers = _parse_wg_dump_peers(dump)
-    except Exception as exc:
-        log.debug("SSE peer fetch failed: %s", exc)
-        peers = _cached_peers  # return stale on error
-    with _cached_peers_lock:
-        _cached_peers = peers
-        _cached_peers_ts = time.time()
-    return peers
+    """Return WG peer metrics for SSE from the collector snapshot (no SSH per tick)."""
+    return list(_get_peer_metrics().peers)
 
 
 def _detect_monitoring_events(prev: dict | None, curr: dict) -> list[dict]:
@@ -2392,104 +3232,240 @@ def _store_events(events: list[dict]) -> None:
     with _events_lock:
         for evt in events:
             _EVENTS_HISTORY.append(evt)
+    _metrics_history.add_events(events)
+
+
+def _load_events_history() -> None:
+    """Seed the in-memory events deque from the persisted history after a restart."""
+    try:
+        events = _metrics_history.recent_events(_EVENTS_HISTORY.maxlen or 200)
+    except sqlite3.Error as exc:
+        log.warning("Failed to load monitoring events history: %s", exc)
+        return
+    with _events_lock:
+        _EVENTS_HISTORY.extend(events)
 
 
 @app.route("/api/monitoring/events", methods=["GET"])
 @auth_required_or_local
 def monitoring_events():
-    """Return recent monitoring events (for initial page load)."""
+    """Return recent monitoring events (for initial page load); from/to/type query the persisted history."""
+    if request.args.get("from") or request.args.get("to"):
+        now = int(time.time())
+        try:
+            end = _parse_epoch_arg("to", now)
+            start = _parse_epoch_arg("from", end - 86400)
+            limit = min(int(request.args.get("limit", "500")), 5000)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify(_metrics_history.events(start, end, limit, request.args.get("type") or None))
     limit = min(int(request.args.get("limit", "100")), 200)
     with _events_lock:
         items = list(_EVENTS_HISTORY)
     return jsonify(items[-limit:])
 
 
-@app.route("/api/monitoring/stream")
-@auth_required_or_local
-def monitoring_stream():
-    """SSE endpoint: streams monitoring updates and events in real-time."""
-    global _prev_monitor_snapshot
+# Single SSE producer: detects changes once, encodes each message once and fans
+# it out to per-client bounded queues. Messages carry increasing ids and the
+# last SSE_REPLAY_SIZE are kept for Last-Event-ID resume.
+SSE_POLL_SEC = 0.5
+SSE_KEYFRAME_SEC = int(os.environ.get("ADMIN_SSE_KEYFRAME_SEC", "60"))
+SSE_CLIENT_QUEUE_SIZE = int(os.environ.get("ADMIN_SSE_CLIENT_QUEUE", "64"))
+SSE_REPLAY_SIZE = int(os.environ.get("ADMIN_SSE_REPLAY_SIZE", "256"))
+SSE_HEARTBEAT_SEC = 15
+
+
+def _json_delta(old: dict, new: dict) -> dict:
+    """Recursive object delta: changed keys carry new values (nested dicts are
+    diffed again), removed keys are listed under "$del". Lists are replaced whole."""
+    patch: dict[str, Any] = {}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif old[key] != value:
+            if isinstance(old[key], dict) and isinstance(value, dict):
+                patch[key] = _json_delta(old[key], value)
+            else:
+                patch[key] = value
+    removed = [key for key in old if key not in new]
+    if removed:
+        patch["$del"] = removed
+    return patch
+
+
+def _peer_stream_key(peer: dict) -> str:
+    """Key for peers in the delta state (mirrored in admin.html)."""
+    return f"{peer.get('interface') or ''}/{peer.get('public_key') or ''}"
+
+
+class _SSESubscriber:
+    __slots__ = ("queue", "lagged")
+
+    def __init__(self) -> None:
+        self.queue: queue.Queue[str] = queue.Queue(maxsize=SSE_CLIENT_QUEUE_SIZE)
+        self.lagged = False
+
+
+class _SSEHub:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: set[_SSESubscriber] = set()
+        self._replay: collections.deque[tuple[int, str]] = collections.deque(maxlen=SSE_REPLAY_SIZE)
+        self._seq = 0
+        self._thread: threading.Thread | None = None
+        self._data: dict | None = None  # latest full monitoring payload (with _peers list)
+        self._state: dict | None = None  # same, with _peers keyed for deltas
+
+    # --- subscribers --------------------------------------------------------
+
+    def subscribe(self, last_event_id: str | None) -> tuple[_SSESubscriber, list[str]]:
+        """Register a client; return it with the messages to send first."""
+        sub = _SSESubscriber()
+        with self._lock:
+            self._ensure_producer()
+            self._subscribers.add(sub)
+            backlog = self._resume_backlog(last_event_id)
+            if backlog is None:
+                backlog = self._initial_messages()
+        return sub, backlog
+
+    def unsubscribe(self, sub: _SSESubscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def keyframe(self) -> list[str]:
+        with self._lock:
+            return self._initial_messages()
+
+    def _resume_backlog(self, last_event_id: str | None) -> list[str] | None:
+        try:
+            last_id = int(last_event_id or "")
+        except ValueError:
+            return None
+        if not self._replay or last_id < self._replay[0][0] - 1 or last_id > self._seq:
+            return None
+        return [message for seq, message in self._replay if seq > last_id]
 
-    def generate():
+    def _initial_messages(self) -> list[str]:
+        messages = []
+        if self._data is not None:
+            messages.append(self._format("monitoring_update", self._data, self._seq))
+        with _events_lock:
+            history = list(_EVENTS_HISTORY)
+        if history:
+            messages.append(self._format("events_history", history))
+        return messages
+
+    # --- producer -----------------------------------------------------------
+
+    @staticmethod
+    def _format(event: str, payload: Any, seq: int | None = None) -> str:
+        head = f"id: {seq}\n" if seq is not None else ""
+        return f"{head}event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def _publish(self, event: str, payload: Any, data: dict | None = None, state: dict | None = None) -> None:
+        with self._lock:
+            if data is not None:
+                # Keyframes for new/lagged clients must match the id they get.
+                self._data, self._state = data, state
+            self._seq += 1
+            message = self._format(event, payload, self._seq)
+            self._replay.append((self._seq, message))
+            for sub in self._subscribers:
+                if sub.lagged:
+                    continue
+                try:
+                    sub.queue.put_nowait(message)
+                except queue.Full:
+                    # Slow client: drop its backlog and resync it with a keyframe.
+                    sub.lagged = True
+                    with contextlib.suppress(queue.Empty):
+                        while True:
+                            sub.queue.get_nowait()
+
+    def start(self) -> None:
+        """Run the producer without subscribers (events and history are recorded continuously)."""
+        with self._lock:
+            self._ensure_producer()
+
+    def _ensure_producer(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._produce, name="sse-producer", daemon=True)
+            self._thread.start()
+
+    def _produce(self) -> None:
         global _prev_monitor_snapshot
-        prev_mtime = 0.0
-        # Send initial snapshot immediately
-        path = _resolve_monitor_data_path()
-        if path is not None:
+        prev_version: Any = None
+        prev_peers_ts = -1.0
+        last_keyframe = 0.0
+        data: dict = {}
+        while True:
             try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-                data["_monitor_running"] = _is_monitor_running()
-                data["_peers"] = _get_cached_peers()
-                yield f"event: monitoring_update\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
-                prev_mtime = path.stat().st_mtime
-                with _prev_snapshot_lock:
+                changed = False
+                prev_version, fresh = _monitor_data_if_changed(prev_version)
+                if fresh is not None:
+                    fresh["_monitor_running"] = _is_monitor_running()
+                    fresh["_peers"] = data.get("_peers", [])
+                    data = fresh
+                    changed = True
+                    _metrics_history.record_vps(data)
+                    events = _detect_monitoring_events(_prev_monitor_snapshot, data)
                     _prev_monitor_snapshot = data
-            except Exception:
+                    if events:
+                        _store_events(events)
+                        for evt in events:
+                            self._publish("monitoring_event", evt)
+
+                # Peer metrics stream on their own, even before the first data.json snapshot.
+                peers = _peer_metrics
+                if peers.ts != prev_peers_ts:
+                    prev_peers_ts = peers.ts
+                    data = {**data, "_peers": list(peers.peers)}
+                    changed = True
+
+                if changed:
+                    state = {**data, "_peers": {_peer_stream_key(p): p for p in data.get("_peers", [])}}
+                    now = time.time()
+                    if self._state is None or now - last_keyframe >= SSE_KEYFRAME_SEC:
+                        self._publish("monitoring_update", data, data, state)
+                        last_keyframe = now
+                    else:
+                        patch = _json_delta(self._state, state)
+                        if patch:
+                            self._publish("monitoring_delta", patch, data, state)
+            except (json.JSONDecodeError, OSError):
                 pass
+            except Exception as exc:
+                log.debug("SSE producer error: %s", exc)
+            # Woken immediately by pushed snapshots; otherwise poll data.json.
+            _monitor_wakeup.wait(SSE_POLL_SEC)
+            _monitor_wakeup.clear()
 
-        # Send event history for event log panel initialization
-        with _events_lock:
-            history = list(_EVENTS_HISTORY)
-        if history:
-            yield f"event: events_history\ndata: {json.dumps(history, ensure_ascii=False)}\n\n"
 
-        last_peer_send: float = 0.0
-        last_data: dict = {}
+_sse_hub = _SSEHub()
 
-        while True:
-            try:
-                now = time.time()
-                sent_full = False
-                path = _resolve_monitor_data_path()
-                if path is not None:
-                    try:
-                        mtime = path.stat().st_mtime
-                    except OSError:
-                        time.sleep(0.5)
-                        continue
-                    if mtime != prev_mtime:
-                        prev_mtime = mtime
-                        try:
-                            data = json.loads(path.read_text(encoding="utf-8"))
-                        except (json.JSONDecodeError, OSError):
-                            time.sleep(0.5)
-                            continue
-                        data["_monitor_running"] = _is_monitor_running()
-                        data["_peers"] = _get_cached_peers()
-
-                        # Detect events by comparing with previous snapshot
-                        with _prev_snapshot_lock:
-                            events = _detect_monitoring_events(_prev_monitor_snapshot, data)
-                            _prev_monitor_snapshot = data
-
-                        # Store and emit events
-                        if events:
-                            _store_events(events)
-                            for evt in events:
-                                yield f"event: monitoring_event\ndata: {json.dumps(evt, ensure_ascii=False)}\n\n"
-
-                        # Emit full update
-                        yield f"event: monitoring_update\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
-                        last_peer_send = now
-                        last_data = data
-                        sent_full = True
-
-                # Send peer-only updates between full data.json cycles (every 2s)
-                if not sent_full and now - last_peer_send >= _PEER_CACHE_TTL:
-                    peers = _get_cached_peers()
-                    if peers:
-                        payload = dict(last_data) if last_data else {}
-                        payload["_peers"] = peers
-                        yield f"event: peers_update\ndata: {json.dumps(payload.get('_peers', peers), ensure_ascii=False)}\n\n"
-                        last_peer_send = now
-
-                # Keep-alive heartbeat every 15 seconds (via short sleep loop)
-                time.sleep(0.5)
-            except GeneratorExit:
-                return
-            except Exception as exc:
-                log.debug("SSE stream error: %s", exc)
-                time.sleep(1)
+
+@app.route("/api/monitoring/stream")
+@auth_required_or_local
+def monitoring_stream():
+    """SSE endpoint: keyframe + deltas and events from the shared producer (supports Last-Event-ID)."""
+    if _peer_metrics_thread is None:
+        _start_peer_metrics_collector()
+    sub, backlog = _sse_hub.subscribe(request.headers.get("Last-Event-ID") or request.args.get("last_event_id"))
+
+    def generate():
+        try:
+            yield from backlog
+            while True:
+                if sub.lagged:
+                    sub.lagged = False
+                    yield from _sse_hub.keyframe()
+                try:
+                    yield sub.queue.get(timeout=SSE_HEARTBEAT_SEC)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            _sse_hub.unsubscribe(sub)
 
     return Response(
         generate(),
@@ -2622,6 +3598,21 @@ def settings_update():
     return jsonify(_get_all_settings(db))
 
 
+@app.route("/api/server-profile/refresh", methods=["POST"])
+@auth_required
+def server_profile_refresh():
+    """Re-read .env/keys.env and awg1 server info now (e.g. after a deploy)."""
+    _refresh_server_profile()
+    try:
+        info = _get_server_info()
+    except Exception as exc:
+        return jsonify({"error": f"Failed to load server info: {exc}"}), 502
+    audit("server_profile_refreshed", "", {"server_port": info.get("server_port")})
+    profile = {key: info[key] for key in SERVER_INFO_KEYS if info.get(key)}
+    profile["loaded_at"] = _server_info_cache.loaded_at
+    return jsonify(profile)
+
+
 # =============================================================================
 # API: Audit
 # =============================================================================
@@ -2743,8 +3734,42 @@ def _resolve_monitor_data_path() -> Path | None:
     return existing[0][1]
 
 
+# Snapshots pushed by the collector over a Unix socket (see backend/core/monitor_push.py).
+# data.json remains the checkpoint and the fallback when nothing is being pushed.
+_monitor_wakeup = threading.Event()
+_monitor_push = SnapshotListener("admin", lambda _snapshot: _monitor_wakeup.set())
+
+
+def _read_monitor_data() -> tuple[dict | None, str]:
+    """Return (monitoring payload copy, source): the newer of a fresh pushed snapshot and data.json."""
+    path = _resolve_monitor_data_path()
+    pushed = _monitor_push.newer_than(path, MONITOR_STALE_SEC)
+    if pushed is not None:
+        return dict(pushed.data), f"push:{_monitor_push.path}"
+    if path is None:
+        return None, ""
+    return json.loads(path.read_text(encoding="utf-8")), str(path)
+
+
+def _monitor_data_if_changed(prev_version: Any) -> tuple[Any, dict | None]:
+    """Return (version, payload) where payload is None if nothing changed since prev_version."""
+    path = _resolve_monitor_data_path()
+    pushed = _monitor_push.newer_than(path, MONITOR_STALE_SEC)
+    if pushed is not None:
+        version: Any = ("push", pushed.seq)
+        return version, (dict(pushed.data) if version != prev_version else None)
+    if path is None:
+        return prev_version, None
+    version = ("file", str(path), path.stat().st_mtime)
+    if version == prev_version:
+        return version, None
+    return version, json.loads(path.read_text(encoding="utf-8"))
+
+
 def _is_monitor_running() -> bool:
     """Return True if monitor data is fresh enough for current poll/backoff interval."""
+    if _monitor_push.fresh(MONITOR_STALE_SEC) is not None:
+        return True
     monitor_path = _resolve_monitor_data_path()
     if monitor_path is None:
         return False
@@ -2830,8 +3855,18 @@ def main() -> None:
     _ensure_default_admin()
     _load_default_settings()
     _import_peers_from_json()
-    _sync_peers_to_server()
+    _rebuild_ip_pools()
+    _start_peer_metrics_collector()
+    _start_peer_reconciler()
+    _monitor_push.start()
+    atexit.register(_monitor_push.close)
+    _load_events_history()
+    _sse_hub.start()
     _start_monitor()
+    if hasattr(signal, "SIGHUP"):
+        # `systemctl reload vpn-admin` (ExecReload sends SIGHUP; deploy-vps1.sh runs it after
+        # rewriting awg1). Edits of .env/keys.env are caught by the cache's file watch.
+        signal.signal(signal.SIGHUP, lambda _signum, _frame: _server_profile_reload_requested.set())
 
     host = args.host or ("0.0.0.0" if args.prod else "127.0.0.1")
     port = args.port or (8443 if args.prod else 8081)
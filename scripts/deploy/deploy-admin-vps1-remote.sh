@@ -107,6 +107,7 @@ User=${ADMIN_USER}
 Group=${ADMIN_USER}
 WorkingDirectory=${PROJECT_DST}
 ExecStart=${PROJECT_DST}/scripts/admin/.venv/bin/python ${PROJECT_DST}/scripts/admin/admin-server.py --prod --host 0.0.0.0 --port ${ADMIN_PORT} --cert ${CERT_FILE} --key ${KEY_FILE}
+ExecReload=/bin/kill -HUP \$MAINPID
 Restart=always
 RestartSec=3
 Environment=PYTHONUNBUFFERED=1
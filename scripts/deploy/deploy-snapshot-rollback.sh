@@ -148,7 +148,7 @@ snapshot_local() {
     } > "${dir}/manifest.env"
 
     if [[ -d "${PROJECT_ROOT}/vpn-output" ]]; then
-        tar --exclude 'vpn-output/deploy-snapshots' \
+        tar --exclude 'vpn-output/deploy-snapshots' --exclude 'vpn-output/.artifact-cache' \
             -czf "${dir}/local-vpn-output.tar.gz" \
             -C "$PROJECT_ROOT" vpn-output
     fi
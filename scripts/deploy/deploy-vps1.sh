@@ -322,6 +322,10 @@ sleep 1
 systemctl restart awg-quick@awg1
 sleep 2
 awg show all
+# Админка на VPS1 кэширует профиль awg1 (ключ, порт, junk-параметры): перечитать.
+if systemctl is-active --quiet vpn-admin 2>/dev/null; then
+    systemctl reload vpn-admin || true
+fi
 echo VPS1_AWG_OK
 "
 ok "VPS1 настроен"
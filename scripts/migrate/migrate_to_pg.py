@@ -39,6 +39,8 @@ load_dotenv(PROJECT_ROOT / ".env", override=True)
 from sqlalchemy.orm import Session
 
 # Локальный импорт после path
+from backend.core.config import get_settings
+from backend.core.ip_pool import parse_pool_cidrs
 from backend.db.session import get_session_factory
 from backend.models import (
     AuditLog,
@@ -47,6 +49,7 @@ from backend.models import (
     User,
 )
 from backend.models.enums import RoleEnum
+from backend.services.ip_pool_service import IpPoolService
 
 logging.basicConfig(
     level=logging.INFO,
@@ -303,6 +306,16 @@ def migrate_peers_from_json(
         report.peers_before = len(data)
 
 
+def claim_peer_ips(session: Session, report: MigrationReport) -> None:
+    """Пометить IP всех peers_devices занятыми в ip_pools (битмап строится backend'ом один раз)."""
+    if report.dry_run:
+        return
+    from sqlalchemy import select
+
+    ips = [r[0] for r in session.execute(select(PeerDevice.ip)).fetchall()]
+    IpPoolService(parse_pool_cidrs(get_settings().PEER_IP_POOLS)).claim(session, ips)
+
+
 def migrate_settings(session: Session, admin_db: Path, report: MigrationReport) -> None:
     """Миграция settings (idempotent по key)."""
     if not admin_db.is_file():
@@ -389,6 +402,7 @@ def run_migration(
         migrate_users(session, admin_db, report)
         migrate_peers_from_sqlite(session, admin_db, report)
         migrate_peers_from_json(session, peers_json, report)
+        claim_peer_ips(session, report)
         migrate_settings(session, admin_db, report)
         migrate_audit_log(session, admin_db, report)
 
@@ -34,6 +34,9 @@ SSH_TIMEOUT="${VPN_MONITOR_SSH_TIMEOUT:-12}"
 JSON_FILE="./vpn-output/data.json"
 PID_FILE="./vpn-output/monitor-web.pid"
 LOG_FILE="./vpn-output/monitor.log"
+# Каталог сокетов push-слушателей (admin/backend), как PUSH_DIR в backend/core/monitor_push.py.
+VPN_MONITOR_PUSH_DIR="${VPN_MONITOR_PUSH_DIR:-$(cd "${SCRIPT_DIR}/../.." && pwd)/vpn-output/.monitor-push}"
+export VPN_MONITOR_PUSH_DIR
 LOG_LEVEL="INFO"
 PYTHON_CMD=()
 HTTP_WINDOWS_RUNTIME=0
@@ -43,6 +46,7 @@ TEMP_KEY_FILES=()
 LAST_ERR_VPS1=""
 LAST_ERR_VPS2=""
 HTTP_PID=""
+COLLECTOR_PID=""
 
 VPS1_PREV_RX=0
 VPS1_PREV_TX=0
@@ -116,6 +120,7 @@ load_alert_thresholds() {
 cleanup_all() {
     rm -f "$PID_FILE" 2>/dev/null || true
     [[ -n "$HTTP_PID" ]] && kill "$HTTP_PID" 2>/dev/null || true
+    [[ -n "$COLLECTOR_PID" ]] && kill "$COLLECTOR_PID" 2>/dev/null || true
     stop_ssh_masters
     cleanup_temp_keys
 }
@@ -927,6 +932,24 @@ data = {
     },
 }
 print(json.dumps(data, indent=2, ensure_ascii=False))
+
+# Push the snapshot to local listeners (admin server / backend, see
+# backend/core/monitor_push.py); data.json stays as the checkpoint/fallback.
+try:
+    import glob, socket
+    push_dir = os.environ.get('VPN_MONITOR_PUSH_DIR', '')
+    if push_dir and hasattr(socket, 'AF_UNIX'):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        for path in glob.glob(os.path.join(push_dir, '*.sock')):
+            try:
+                sock.sendto(payload, path)
+            except OSError:
+                pass
+        sock.close()
+except Exception:
+    pass
 PYEOF
 
     local rc=$?
@@ -1340,6 +1363,30 @@ echo "  Data JSON : http://127.0.0.1:${HTTP_PORT}/vpn-output/data.json"
 echo "  Fast poll : ${FAST_INTERVAL}s  |  Full poll: ${SLOW_INTERVAL}s  |  Ctrl+C to stop"
 echo ""
 
+# ---------------------------------------------------------------------------
+# Python collector (monitor_collector.py): same fast/full cycle and backoff,
+# persistent SSH sessions, one remote script per cycle, in-process data.json.
+# The bash loop below stays as the fallback when paramiko is not available
+# or VPN_MONITOR_ENGINE=bash.
+# ---------------------------------------------------------------------------
+
+if [[ "${VPN_MONITOR_ENGINE:-python}" == "python" ]] && "${PYTHON_CMD[@]}" -c "import paramiko" >/dev/null 2>&1; then
+    log_line "INFO" "using Python collector (monitor_collector.py)"
+    VPS1_IP="$VPS1_IP" VPS1_USER="$VPS1_USER" VPS1_KEY="$VPS1_KEY" VPS1_PASS="$VPS1_PASS" \
+    VPS2_IP="$VPS2_IP" VPS2_USER="$VPS2_USER" VPS2_KEY="$VPS2_KEY" VPS2_PASS="$VPS2_PASS" \
+    VPS1_INTERNAL="$VPS1_INTERNAL" VPS2_TUN_IP="$VPS2_TUN_IP" \
+    VPN_MONITOR_INTERVAL="$INTERVAL" VPN_MONITOR_FAST_INTERVAL="$FAST_INTERVAL" \
+    VPN_MONITOR_SLOW_INTERVAL="$SLOW_INTERVAL" VPN_MONITOR_POLL_VPS2_FAST="$POLL_VPS2_FAST" \
+    VPN_MONITOR_SSH_TIMEOUT="$SSH_TIMEOUT" \
+        "${PYTHON_CMD[@]}" "${SCRIPT_DIR}/monitor_collector.py" \
+            --json-file "$JSON_FILE" --log-file "$LOG_FILE" --parent-pid "$$" &
+    COLLECTOR_PID="$!"
+    wait "$COLLECTOR_PID"
+    rc=$?
+    COLLECTOR_PID=""
+    log_line "WARN" "Python collector exited rc=$rc; falling back to bash polling loop"
+fi
+
 check_internal_ips
 if [[ "$CONTROLMASTER_ENABLED" == "1" ]]; then
     log_line "INFO" "establishing SSH ControlMaster connections..."
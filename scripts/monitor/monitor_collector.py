@@ -0,0 +1,811 @@
+#!/usr/bin/env python3
+"""
+monitor_collector.py — Python-коллектор мониторинга VPS1/VPS2 (замена bash-цикла monitor-web.sh).
+
+Та же семантика циклов, что у monitor-web.sh: быстрый опрос каждые FAST_INTERVAL
+секунд (трафик, хендшейки, соединения), полный — раз в SLOW_INTERVAL, backoff
+при серии ошибок SSH. Отличия:
+  - одно постоянное SSH-соединение (paramiko) на сервер вместо ssh/sshpass на каждый цикл;
+  - на сервере за цикл выполняется один python3-скрипт, который читает /proc
+    напрямую и печатает JSON (без awk/sed/grep на каждую метрику);
+  - data.json собирается и пишется атомарно в этом же процессе, снапшот
+    отправляется подписчикам через backend/core/monitor_push.py.
+
+Использование:
+    python monitor_collector.py                     # настройки из .env / vpn-output/keys.env
+    python monitor_collector.py --once              # один полный цикл и выход
+    bash monitor-web.sh                             # запускает коллектор сам, если есть paramiko
+
+Модуль можно импортировать: MonitorCollector(config).run_forever() / run_cycle().
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+from pathlib import Path
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any
+
+import paramiko
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent.parent
+ENV_PATH = PROJECT_ROOT / ".env"
+KEYS_ENV_PATH = PROJECT_ROOT / "vpn-output" / "keys.env"
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from backend.core.monitor_push import publish_snapshot  # noqa: E402
+
+log = logging.getLogger("monitor-collector")
+
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_TAIL_LINES = 30
+BACKOFF_MAX_INTERVAL = 30
+SSH_KEEPALIVE_SEC = 3
+
+ALERT_DEFAULTS = {
+    "ALERT_LOAD_WARN_PCT": 120,
+    "ALERT_LOAD_CRIT_PCT": 180,
+    "ALERT_MEM_WARN_PCT": 80,
+    "ALERT_MEM_CRIT_PCT": 90,
+    "ALERT_SWAP_WARN_MB": 64,
+    "ALERT_SWAP_CRIT_MB": 256,
+    "ALERT_CONNTRACK_WARN_PCT": 70,
+    "ALERT_CONNTRACK_CRIT_PCT": 85,
+}
+
+# Поля data.json в порядке monitor-web.sh (write_json) и значения для офлайн-сервера.
+VPS1_FIELDS: tuple[tuple[str, Any], ...] = (
+    ("host", ""), ("cpus", 1), ("cpu_mhz", 0), ("uptime_s", 0), ("last_deploy_ts", 0),
+    ("load1", 0.0), ("load5", 0.0), ("load15", 0.0),
+    ("mem_used_mb", 0), ("mem_free_mb", 0), ("mem_total_mb", 0), ("swap", "0/0MB"),
+    ("disk_used", ""), ("disk_total", ""), ("disk_pct", 0),
+    ("net_if", ""), ("rx_speed", 0), ("tx_speed", 0),
+    ("tcp_est", 0), ("udp_conn", 0), ("conntrack_count", 0), ("conntrack_max", 0),
+    ("awg0", ""), ("awg1", ""), ("hs0_age", -1), ("hs1_age", -1), ("active_peers_awg1", 0),
+    ("peers_awg0", 0), ("peers_awg1", 0), ("tun_ping", ""),
+    ("rx_total", 0), ("tx_total", 0),
+    ("vpn_rx_speed", 0), ("vpn_tx_speed", 0), ("vpn_rx_total", 0), ("vpn_tx_total", 0),
+    ("mem_avail_mb", 0), ("mem_buffers_mb", 0), ("mem_cached_mb", 0),
+    ("disk_inodes", "0%"), ("proc_count", 0), ("open_files", 0),
+)
+VPS2_FIELDS: tuple[tuple[str, Any], ...] = (
+    ("host", ""), ("cpus", 1), ("cpu_mhz", 0), ("uptime_s", 0), ("last_deploy_ts", 0),
+    ("load1", 0.0), ("load5", 0.0), ("load15", 0.0),
+    ("mem_used_mb", 0), ("mem_free_mb", 0), ("mem_total_mb", 0), ("swap", "0/0MB"),
+    ("disk_used", ""), ("disk_total", ""), ("disk_pct", 0),
+    ("net_if", ""), ("rx_speed", 0), ("tx_speed", 0),
+    ("tcp_est", 0), ("udp_conn", 0), ("conntrack_count", 0), ("conntrack_max", 0),
+    ("awg0", ""), ("hs0_age", -1), ("peers_awg0", 0),
+    ("agh", ""), ("dns53", ""), ("web3000", ""), ("wan_ping", ""),
+    ("rx_total", 0), ("tx_total", 0),
+    ("vpn_rx_speed", 0), ("vpn_tx_speed", 0), ("vpn_rx_total", 0), ("vpn_tx_total", 0),
+    ("mem_avail_mb", 0), ("mem_buffers_mb", 0), ("mem_cached_mb", 0),
+    ("disk_inodes", "0%"), ("proc_count", 0), ("open_files", 0),
+)
+
+# =============================================================================
+# Remote script (python3 on VPS, stdlib only, Python 3.6+)
+# =============================================================================
+
+# argv: role (vps1|vps2), mode (fast|full), tunnel peer IP for the awg0 ping.
+# Prints one JSON object whose keys are data.json field names.
+REMOTE_SCRIPT = r'''
+import json, os, socket, subprocess, sys, time
+
+ROLE, MODE = sys.argv[1], sys.argv[2]
+TUN_IP = sys.argv[3] if len(sys.argv) > 3 else ""
+FULL = MODE == "full"
+SUDO = [] if os.geteuid() == 0 else ["sudo", "-n"]
+
+def run(cmd, timeout=5):
+    try:
+        p = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                           stderr=subprocess.DEVNULL, timeout=timeout, universal_newlines=True)
+        return p.returncode, p.stdout
+    except Exception:
+        return -1, ""
+
+def read(path, default=""):
+    try:
+        with open(path) as f:
+            return f.read()
+    except Exception:
+        return default
+
+def read_int(path):
+    try:
+        return int(read(path).split()[0])
+    except Exception:
+        return 0
+
+def net_dev():
+    out = {}
+    for line in read("/proc/net/dev").splitlines()[2:]:
+        name, _, rest = line.partition(":")
+        cols = rest.split()
+        if len(cols) >= 9:
+            out[name.strip()] = (int(cols[0]), int(cols[8]))
+    return out
+
+def main_if():
+    for line in read("/proc/net/route").splitlines()[1:]:
+        cols = line.split()
+        if len(cols) > 1 and cols[1] == "00000000":
+            return cols[0]
+    return ""
+
+def sockets(names, want_state=None, port=None):
+    count = 0
+    for name in names:
+        for line in read("/proc/net/" + name).splitlines()[1:]:
+            cols = line.split()
+            if len(cols) < 4:
+                continue
+            if want_state is not None and cols[3] != want_state:
+                continue
+            if port is not None and int(cols[1].rsplit(":", 1)[1], 16) != port:
+                continue
+            count += 1
+    return count
+
+def awg_dump():
+    # "show all dump" rows: interface name, then the per-interface dump columns.
+    # Peer rows have exactly 9 columns (pubkey, psk, endpoint, allowed-ips,
+    # latest-handshake, rx, tx, keepalive); the interface row of AmneziaWG has
+    # more (private key, public key, port, fwmark, Jc..H4) and is skipped.
+    rc, out = run(SUDO + ["awg", "show", "all", "dump"])
+    peers = {}
+    for line in out.splitlines():
+        cols = line.split("\t")
+        if len(cols) == 9:
+            peers.setdefault(cols[0], []).append(int(cols[5] or 0))
+    return peers
+
+def hs_age(handshakes, now):
+    if not handshakes:
+        return -1
+    return now - handshakes[0] if handshakes[0] > 0 else -1
+
+def is_active(units):
+    rc, out = run(SUDO + ["systemctl", "is-active"] + units)
+    states = out.split()
+    return [states[i] if i < len(states) else "unknown" for i in range(len(units))]
+
+def ping(args):
+    return "ok" if run(["ping", "-c", "1", "-W", "1"] + args, timeout=3)[0] == 0 else "fail"
+
+def free_m():
+    rc, out = run(["free", "-m"])
+    mem, swap = [0, 0, 0], [0, 0]
+    for line in out.splitlines():
+        cols = line.split()
+        if cols and cols[0] == "Mem:" and len(cols) >= 4:
+            mem = [int(cols[1]), int(cols[2]), int(cols[3])]
+        elif cols and cols[0] == "Swap:" and len(cols) >= 3:
+            swap = [int(cols[1]), int(cols[2])]
+    return mem, swap
+
+def df_row(flag):
+    rc, out = run(["df", flag, "/"])
+    lines = out.splitlines()
+    return lines[1].split() if len(lines) > 1 else []
+
+def meminfo_mb(key):
+    for line in read("/proc/meminfo").splitlines():
+        if line.startswith(key + ":"):
+            return int(line.split()[1]) // 1024
+    return 0
+
+def last_deploy_ts(candidates):
+    try:
+        ts = int(float(read("/etc/vpn-last-deploy.ts").split()[0]))
+    except Exception:
+        ts = 0
+    if ts > 0:
+        return ts
+    mtimes = [0]
+    for path in candidates:
+        try:
+            mtimes.append(int(os.stat(path).st_mtime))
+        except OSError:
+            pass
+    return max(mtimes)
+
+now = int(time.time())
+dev = net_dev()
+iface = main_if()
+rx, tx = dev.get(iface, (0, 0))
+vpn_ifaces = ["awg0", "awg1"] if ROLE == "vps1" else ["awg0"]
+vpn_rx = sum(dev.get(i, (0, 0))[0] for i in vpn_ifaces)
+vpn_tx = sum(dev.get(i, (0, 0))[1] for i in vpn_ifaces)
+hs = awg_dump()
+
+d = {
+    "net_if": iface or "n/a",
+    "rx_total": rx, "tx_total": tx,
+    "vpn_rx_total": vpn_rx, "vpn_tx_total": vpn_tx,
+    "tcp_est": sockets(["tcp", "tcp6"], "01"),
+    "udp_conn": sockets(["udp", "udp6"], "01"),
+    "conntrack_count": read_int("/proc/sys/net/netfilter/nf_conntrack_count"),
+    "hs0_age": hs_age(hs.get("awg0"), now),
+}
+if ROLE == "vps1":
+    d["hs1_age"] = hs_age(hs.get("awg1"), now)
+    d["active_peers_awg1"] = sum(1 for t in hs.get("awg1", []) if t > 0 and now - t <= 55)
+
+if FULL:
+    load = (read("/proc/loadavg").split() + ["0", "0", "0"])[:3]
+    mem, swap = free_m()
+    disk = df_row("-h")
+    inodes = df_row("-i")
+    mhz = [float(l.split(":")[1]) for l in read("/proc/cpuinfo").splitlines() if l.startswith("cpu MHz")]
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except Exception:
+        cpus = os.cpu_count() or 1
+    d.update({
+        "host": socket.gethostname() or "n/a",
+        "cpus": cpus,
+        "cpu_mhz": int(round(sum(mhz) / len(mhz))) if mhz else 0,
+        "uptime_s": int(float((read("/proc/uptime") or "0").split()[0])),
+        "load1": float(load[0]), "load5": float(load[1]), "load15": float(load[2]),
+        "mem_used_mb": mem[1], "mem_free_mb": mem[2], "mem_total_mb": mem[0],
+        "swap": "%d/%dMB" % (swap[1], swap[0]),
+        "disk_used": disk[2] if len(disk) > 4 else "",
+        "disk_total": disk[1] if len(disk) > 4 else "",
+        "disk_pct": int(disk[4].rstrip("%") or 0) if len(disk) > 4 and disk[4] != "-" else 0,
+        "conntrack_max": read_int("/proc/sys/net/netfilter/nf_conntrack_max"),
+        "peers_awg0": len(hs.get("awg0", [])),
+        "mem_avail_mb": meminfo_mb("MemAvailable"),
+        "mem_buffers_mb": meminfo_mb("Buffers"),
+        "mem_cached_mb": meminfo_mb("Cached"),
+        "disk_inodes": inodes[4] if len(inodes) > 4 else "0%",
+        "proc_count": sum(1 for p in os.listdir("/proc") if p.isdigit()),
+        "open_files": read_int("/proc/sys/fs/file-nr"),
+    })
+    if ROLE == "vps1":
+        d["awg0"], d["awg1"] = is_active(["awg-quick@awg0", "awg-quick@awg1"])
+        d["peers_awg1"] = len(hs.get("awg1", []))
+        d["tun_ping"] = ping(["-I", "awg0", TUN_IP]) if TUN_IP else "fail"
+        d["last_deploy_ts"] = last_deploy_ts(["/etc/amnezia/amneziawg/awg1.conf",
+                                              "/etc/amnezia/amneziawg/awg0.conf"])
+    else:
+        d["awg0"] = is_active(["awg-quick@awg0"])[0]
+        d["agh"] = "active" if "active" in is_active(["AdGuardHome", "adguardhome"]) else "inactive"
+        if sockets(["tcp", "tcp6"], "0A", 53) or sockets(["udp", "udp6"], "07", 53):
+            try:
+                socket.getaddrinfo("google.com", None, socket.AF_INET)
+                d["dns53"] = "up"
+            except OSError:
+                d["dns53"] = "degraded"
+        else:
+            d["dns53"] = "down"
+        d["web3000"] = "up" if sockets(["tcp", "tcp6"], "0A", 3000) else "down"
+        d["wan_ping"] = ping(["8.8.8.8"])
+        d["last_deploy_ts"] = last_deploy_ts(["/etc/amnezia/amneziawg/awg0.conf",
+                                              "/opt/AdGuardHome/AdGuardHome.yaml"])
+
+print(json.dumps(d))
+'''
+
+
+# =============================================================================
+# Config
+# =============================================================================
+
+
+def _read_kv_file(path: Path) -> dict[str, str]:
+    """KEY=VALUE файл (.env / keys.env): последнее значение побеждает, кавычки снимаются."""
+    result: dict[str, str] = {}
+    try:
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return result
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, _, value = line.partition("=")
+        result[key.strip()] = value.strip().strip("\"'").strip()
+    return result
+
+
+def _resolve_key(key_path: str) -> str:
+    if not key_path:
+        return ""
+    for candidate in (Path(os.path.expanduser(key_path)), PROJECT_ROOT / key_path):
+        if candidate.is_file():
+            return str(candidate)
+    return os.path.expanduser(key_path)
+
+
+@dataclass
+class ServerConfig:
+    name: str
+    ip: str
+    user: str = "root"
+    key: str = ""
+    password: str = ""
+    internal_ip: str = ""  # пробуется первым при (пере)подключении, если доступен
+
+
+@dataclass
+class CollectorConfig:
+    vps1: ServerConfig
+    vps2: ServerConfig
+    vps2_tun_ip: str = "10.8.0.2"
+    json_file: Path = SCRIPT_DIR / "vpn-output" / "data.json"
+    log_file: Path = SCRIPT_DIR / "vpn-output" / "monitor.log"
+    interval: int = 10
+    fast_interval: int = 10
+    slow_interval: int = 60
+    poll_vps2_fast: bool = False
+    ssh_timeout: int = 12
+    log_level: str = "INFO"
+    alerts: dict[str, int] = field(default_factory=lambda: dict(ALERT_DEFAULTS))
+
+    @classmethod
+    def from_env(cls, environ: dict[str, str] | None = None) -> "CollectorConfig":
+        """Приоритет как в monitor-web.sh: окружение > .env > vpn-output/keys.env > дефолты."""
+        environ = dict(os.environ if environ is None else environ)
+        files = _read_kv_file(KEYS_ENV_PATH)
+        files.update(_read_kv_file(ENV_PATH))
+
+        def get(key: str, default: str = "") -> str:
+            return (environ.get(key) or files.get(key) or default).strip()
+
+        def get_int(key: str, default: int) -> int:
+            try:
+                return int(get(key, str(default)))
+            except ValueError:
+                return default
+
+        tun_net = files.get("TUN_NET", "")
+        alerts = {key: get_int(key, default) for key, default in ALERT_DEFAULTS.items()}
+        return cls(
+            vps1=ServerConfig("VPS1", get("VPS1_IP"), get("VPS1_USER", "root"),
+                              _resolve_key(get("VPS1_KEY")), get("VPS1_PASS"),
+                              internal_ip=get("VPS1_INTERNAL", "10.9.0.1")),
+            vps2=ServerConfig("VPS2", get("VPS2_IP"), get("VPS2_USER", "root"),
+                              _resolve_key(get("VPS2_KEY")), get("VPS2_PASS")),
+            vps2_tun_ip=get("VPS2_TUN_IP", f"{tun_net}.2" if tun_net else "10.8.0.2"),
+            interval=get_int("VPN_MONITOR_INTERVAL", 10),
+            fast_interval=get_int("VPN_MONITOR_FAST_INTERVAL", 10),
+            slow_interval=get_int("VPN_MONITOR_SLOW_INTERVAL", 60),
+            poll_vps2_fast=get("VPN_MONITOR_POLL_VPS2_FAST", "0") == "1",
+            ssh_timeout=get_int("VPN_MONITOR_SSH_TIMEOUT", 12),
+            alerts=alerts,
+        )
+
+
+# =============================================================================
+# Log file (same format as monitor-web.sh log_line)
+# =============================================================================
+
+
+class MonitorLog:
+    """Пишет monitor.log в формате monitor-web.sh и держит хвост для поля data.json "log"."""
+
+    def __init__(self, path: Path, level: str = "INFO") -> None:
+        self.path = path
+        self.level = level
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._tail: collections.deque[str] = collections.deque(maxlen=LOG_TAIL_LINES)
+        try:
+            with self.path.open("r", encoding="utf-8", errors="replace") as f:
+                self._tail.extend(line.rstrip("\r\n") for line in f if line.strip())
+        except OSError:
+            pass
+
+    def write(self, level: str, msg: str) -> None:
+        if level == "DEBUG" and self.level != "DEBUG":
+            return
+        line = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] [{level}] {msg}"
+        with self._lock:
+            self._tail.append(line)
+            try:
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                if self.path.stat().st_size >= LOG_MAX_BYTES:
+                    os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+                    self.path.touch()
+            except OSError as exc:
+                log.warning("monitor.log write failed: %s", exc)
+
+    def tail(self) -> list[str]:
+        with self._lock:
+            return list(self._tail)
+
+
+# =============================================================================
+# Persistent SSH session per server
+# =============================================================================
+
+
+class RemoteHost:
+    """Постоянное SSH-соединение к серверу; переподключается после ошибки."""
+
+    def __init__(self, server: ServerConfig, ssh_timeout: int, monitor_log: MonitorLog) -> None:
+        self.server = server
+        self.ssh_timeout = ssh_timeout
+        self.last_error = ""
+        self.current_ip = server.ip
+        self._log = monitor_log
+        self._client: paramiko.SSHClient | None = None
+
+    def _pick_address(self) -> str:
+        """Внутренний VPN-адрес, если он доступен (клиент подключён), иначе публичный."""
+        internal = self.server.internal_ip
+        if internal:
+            try:
+                with socket.create_connection((internal, 22), timeout=1):
+                    return internal
+            except OSError:
+                pass
+        return self.server.ip
+
+    def _connect(self) -> paramiko.SSHClient:
+        self.current_ip = self._pick_address()
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        # StrictHostKeyChecking=accept-new, как в monitor-web.sh.
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        kwargs: dict[str, Any] = {
+            "hostname": self.current_ip,
+            "username": self.server.user,
+            "timeout": self.ssh_timeout,
+            "banner_timeout": self.ssh_timeout,
+            "auth_timeout": self.ssh_timeout,
+        }
+        if self.server.password:
+            kwargs.update(password=self.server.password, look_for_keys=False, allow_agent=False)
+        elif self.server.key:
+            kwargs["key_filename"] = self.server.key
+        client.connect(**kwargs)
+        transport = client.get_transport()
+        if transport is not None:
+            transport.set_keepalive(SSH_KEEPALIVE_SEC)
+        self._log.write("INFO", f"{self.server.name} SSH session established -> {self.server.user}@{self.current_ip}")
+        return client
+
+    def _alive(self) -> bool:
+        transport = self._client.get_transport() if self._client else None
+        return bool(transport and transport.is_active())
+
+    def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def collect(self, role: str, mode: str, tun_ip: str = "") -> dict[str, Any] | None:
+        """Выполнить REMOTE_SCRIPT; None при ошибке (текст ошибки — в last_error)."""
+        try:
+            if not self._alive():
+                self.close()
+                self._client = self._connect()
+            stdin, stdout, stderr = self._client.exec_command(
+                f"python3 - {role} {mode} {tun_ip}".rstrip(), timeout=self.ssh_timeout + 5
+            )
+            stdin.write(REMOTE_SCRIPT)
+            stdin.channel.shutdown_write()
+            out = stdout.read()
+            err = stderr.read().decode(errors="replace").strip()
+            rc = stdout.channel.recv_exit_status()
+            if rc != 0:
+                raise RuntimeError(f"rc={rc} {err or 'no stderr'}")
+            data = json.loads(out)
+            if not isinstance(data, dict):
+                raise ValueError("remote script returned non-object")
+        except Exception as exc:
+            self.last_error = str(exc) or exc.__class__.__name__
+            self._log.write(
+                "ERROR",
+                f"{self.server.name} ssh failed target={self.server.user}@{self.current_ip} err={self.last_error}",
+            )
+            self.close()
+            return None
+        self.last_error = ""
+        if err:
+            self._log.write("WARN", f"{self.server.name} ssh stderr: {err}")
+        return data
+
+
+# =============================================================================
+# Collector
+# =============================================================================
+
+
+class _Counters:
+    """Предыдущие счётчики байтов сервера для расчёта скоростей."""
+
+    __slots__ = ("rx", "tx", "vpn_rx", "vpn_tx")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.rx = self.tx = self.vpn_rx = self.vpn_tx = 0
+
+
+def _rate(cur: int, prev: int, elapsed: float) -> int:
+    return int(max(0, cur - prev) / elapsed)
+
+
+class MonitorCollector:
+    """Цикл быстрых/полных опросов VPS1 и VPS2 с записью data.json и push-рассылкой."""
+
+    def __init__(self, config: CollectorConfig) -> None:
+        self.config = config
+        self.log = MonitorLog(config.log_file, config.log_level)
+        self.hosts = {
+            "vps1": RemoteHost(config.vps1, config.ssh_timeout, self.log),
+            "vps2": RemoteHost(config.vps2, config.ssh_timeout, self.log),
+        }
+        self._last_full: dict[str, dict[str, Any] | None] = {"vps1": None, "vps2": None}
+        self._counters = {"vps1": _Counters(), "vps2": _Counters()}
+        self._fail_streak = {"vps1": 0, "vps2": 0}
+        self._prev_ts = 0.0
+        self._slow_counter = 0
+        self._last_sleep = 0
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="monitor-ssh")
+        self._stop = threading.Event()
+
+    # -- one cycle ------------------------------------------------------------
+
+    def _is_full_cycle(self) -> bool:
+        self._slow_counter += 1
+        slow_cycles = self.config.slow_interval // max(1, self.config.fast_interval)
+        if slow_cycles <= 0:
+            slow_cycles = 5
+        if self._slow_counter >= slow_cycles or self._last_full["vps1"] is None:
+            self._slow_counter = 0
+            return True
+        return False
+
+    def run_cycle(self, full: bool | None = None) -> dict[str, Any]:
+        """Один цикл опроса; возвращает записанный снапшот."""
+        if full is None:
+            full = self._is_full_cycle()
+        mode = "full" if full else "fast"
+        deadline = self.config.ssh_timeout + 10
+        f1 = self._pool.submit(self.hosts["vps1"].collect, "vps1", mode, self.config.vps2_tun_ip)
+        f2 = None
+        if full or self.config.poll_vps2_fast:
+            f2 = self._pool.submit(self.hosts["vps2"].collect, "vps2", mode)
+        raw = {"vps1": self._result(f1, deadline), "vps2": self._result(f2, deadline)}
+
+        merged: dict[str, dict[str, Any] | None] = {}
+        for key in ("vps1", "vps2"):
+            last = self._last_full[key]
+            if full:
+                merged[key] = raw[key] or last
+                if raw[key]:
+                    self._last_full[key] = raw[key]
+            else:
+                merged[key] = {**(last or {}), **(raw[key] or {})} or None
+
+        data = self.build_snapshot(merged["vps1"], merged["vps2"])
+        self.write_snapshot(data)
+
+        if full:
+            for key in ("vps1", "vps2"):
+                if merged[key]:
+                    self.evaluate_alerts(self.hosts[key].server.name, merged[key])
+
+        self._fail_streak["vps1"] = 0 if raw["vps1"] else self._fail_streak["vps1"] + 1
+        vps2_skipped = not full and not self.config.poll_vps2_fast and self._last_full["vps2"] is not None
+        self._fail_streak["vps2"] = 0 if raw["vps2"] or vps2_skipped else self._fail_streak["vps2"] + 1
+        return data
+
+    @staticmethod
+    def _result(future, timeout: float) -> dict[str, Any] | None:
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def _server_block(self, key: str, values: dict[str, Any] | None, elapsed: float) -> dict[str, Any]:
+        host = self.hosts[key]
+        fields = VPS1_FIELDS if key == "vps1" else VPS2_FIELDS
+        prev = self._counters[key]
+        block: dict[str, Any] = {"online": values is not None, "ip": host.server.ip}
+        values = values or {}
+        for name, default in fields:
+            block[name] = values.get(name, default)
+        block["load1"], block["load5"], block["load15"] = (
+            round(float(block[k]), 2) for k in ("load1", "load5", "load15")
+        )
+        if values:
+            if prev.rx > 0:
+                block["rx_speed"] = _rate(block["rx_total"], prev.rx, elapsed)
+                block["tx_speed"] = _rate(block["tx_total"], prev.tx, elapsed)
+            if prev.vpn_rx > 0:
+                block["vpn_rx_speed"] = _rate(block["vpn_rx_total"], prev.vpn_rx, elapsed)
+                block["vpn_tx_speed"] = _rate(block["vpn_tx_total"], prev.vpn_tx, elapsed)
+            prev.rx, prev.tx = block["rx_total"], block["tx_total"]
+            prev.vpn_rx, prev.vpn_tx = block["vpn_rx_total"], block["vpn_tx_total"]
+            block["error"] = None
+        else:
+            prev.reset()
+            block["error"] = host.last_error or "SSH connection failed"
+        return block
+
+    def build_snapshot(self, vps1: dict[str, Any] | None, vps2: dict[str, Any] | None) -> dict[str, Any]:
+        now = time.time()
+        elapsed = now - self._prev_ts if self._prev_ts else 1.0
+        if elapsed <= 0:
+            elapsed = 1.0
+        data = {
+            "ts": int(now),
+            "log": self.log.tail(),
+            "vps1": self._server_block("vps1", vps1, elapsed),
+            "vps2": self._server_block("vps2", vps2, elapsed),
+        }
+        self._prev_ts = now
+        return data
+
+    def write_snapshot(self, data: dict[str, Any]) -> None:
+        """Атомарная запись data.json (checkpoint) и push подписчикам."""
+        path = self.config.json_file
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+            self.log.write("DEBUG", f"wrote {path} ts={data['ts']}")
+        except OSError as exc:
+            self.log.write("ERROR", f"writing {path} failed: {exc}")
+        try:
+            publish_snapshot(data)
+        except Exception as exc:
+            log.debug("monitor push failed: %s", exc)
+
+    def evaluate_alerts(self, server: str, values: dict[str, Any]) -> None:
+        a = self.config.alerts
+
+        def pct(part: float, whole: float) -> int:
+            return int(round(part / whole * 100)) if whole > 0 else 0
+
+        try:
+            swap_used = int(str(values.get("swap", "0/0MB")).split("/", 1)[0] or 0)
+        except ValueError:
+            swap_used = 0
+        checks = (
+            ("cpu_load_pct", pct(float(values.get("load1", 0)), values.get("cpus", 1) or 1), "ALERT_LOAD"),
+            ("mem_used_pct", pct(values.get("mem_used_mb", 0), values.get("mem_total_mb", 0)), "ALERT_MEM"),
+            ("swap_used_mb", swap_used, "ALERT_SWAP"),
+        )
+        if values.get("conntrack_max", 0) > 0:
+            checks += (
+                ("conntrack_pct", pct(values.get("conntrack_count", 0), values["conntrack_max"]), "ALERT_CONNTRACK"),
+            )
+        for metric, value, prefix in checks:
+            unit = "_MB" if metric.endswith("_mb") else "_PCT"
+            crit, warn = a[f"{prefix}_CRIT{unit}"], a[f"{prefix}_WARN{unit}"]
+            if value >= crit:
+                self.log.write("ERROR", f"ALERT {server} {metric} value={value} threshold={crit}")
+            elif value >= warn:
+                self.log.write("WARN", f"ALERT {server} {metric} value={value} threshold={warn}")
+
+    # -- loop -----------------------------------------------------------------
+
+    def effective_interval(self) -> int:
+        """Backoff как compute_effective_interval: INTERVAL * 2^(streak-1), максимум 30 с."""
+        streak = max(self._fail_streak.values())
+        effective = self.config.interval
+        if streak > 1:
+            effective = self.config.interval * (1 << min(streak - 1, 3))
+        effective = min(effective, BACKOFF_MAX_INTERVAL)
+        return max(self.config.fast_interval, effective)
+
+    def run_forever(self, parent_pid: int | None = None) -> None:
+        cfg = self.config
+        self.log.write(
+            "INFO",
+            f"monitor collector started: vps1={cfg.vps1.user}@{cfg.vps1.ip} vps2={cfg.vps2.user}@{cfg.vps2.ip} "
+            f"fast={cfg.fast_interval}s full={cfg.slow_interval}s",
+        )
+        # Расписание от монотонных часов: длительность опроса не сдвигает следующий цикл.
+        next_run = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                if parent_pid and os.getppid() != parent_pid:
+                    self.log.write("INFO", "monitor collector: parent exited, stopping")
+                    break
+                self.run_cycle()
+                sleep = self.effective_interval()
+                if sleep != self._last_sleep:
+                    self.log.write(
+                        "INFO",
+                        f"poll interval: fast={cfg.fast_interval}s effective={sleep}s full_every={cfg.slow_interval}s "
+                        f"fail_streak_vps1={self._fail_streak['vps1']} fail_streak_vps2={self._fail_streak['vps2']}",
+                    )
+                    self._last_sleep = sleep
+                next_run += sleep
+                now = time.monotonic()
+                if next_run < now:
+                    next_run = now
+                self._stop.wait(next_run - now)
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        for host in self.hosts.values():
+            host.close()
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VPN monitoring collector (VPS1/VPS2 -> data.json)")
+    parser.add_argument("--vps1-ip")
+    parser.add_argument("--vps1-user")
+    parser.add_argument("--vps1-key")
+    parser.add_argument("--vps2-ip")
+    parser.add_argument("--vps2-user")
+    parser.add_argument("--vps2-key")
+    parser.add_argument("--vps2-tun-ip")
+    parser.add_argument("--interval", type=int)
+    parser.add_argument("--ssh-timeout", type=int)
+    parser.add_argument("--json-file", type=Path)
+    parser.add_argument("--log-file", type=Path)
+    parser.add_argument("--parent-pid", type=int, default=None, help="exit when this parent process is gone")
+    parser.add_argument("--once", action="store_true", help="run one full cycle and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    config = CollectorConfig.from_env()
+    for server, prefix in ((config.vps1, "vps1"), (config.vps2, "vps2")):
+        server.ip = getattr(args, f"{prefix}_ip") or server.ip
+        server.user = getattr(args, f"{prefix}_user") or server.user
+        server.key = _resolve_key(getattr(args, f"{prefix}_key") or "") or server.key
+    config.vps2_tun_ip = args.vps2_tun_ip or config.vps2_tun_ip
+    config.interval = args.interval or config.interval
+    config.ssh_timeout = args.ssh_timeout or config.ssh_timeout
+    config.json_file = args.json_file or config.json_file
+    config.log_file = args.log_file or config.log_file
+
+    if not config.vps1.ip or not config.vps2.ip:
+        print("Specify VPS1_IP/VPS2_IP in .env or --vps1-ip/--vps2-ip", file=sys.stderr)
+        sys.exit(1)
+
+    collector = MonitorCollector(config)
+    if args.once:
+        collector.run_cycle(full=True)
+        collector.close()
+        return
+    signal.signal(signal.SIGTERM, lambda *_: collector.stop())
+    try:
+        collector.run_forever(parent_pid=args.parent_pid)
+    except KeyboardInterrupt:
+        collector.stop()
+
+
+if __name__ == "__main__":
+    main()
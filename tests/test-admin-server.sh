@@ -135,8 +135,31 @@ echo "── 3c. Key features ──"
 check_pattern "Rate limiting"              "_check_rate_limit"
 check_pattern "Token blacklist (logout)"   "_blacklisted_tokens"
 check_pattern "MTU by device type"         "MTU_BY_TYPE"
-check_pattern "IP allocation 10.9.0.x"    "10\.9\.0\."
+check_pattern "IP allocation from PEER_IP_POOLS" "allocate_from\(pools"
+check_pattern "Client Address prefix from its pool" "address_prefix\(PEER_IP_POOL_CIDRS"
 check_pattern "Config builder"             "_build_config"
+check_pattern "One-shot peer provisioning" "_provision_peer_on_server"
+check_pattern "Local peer key generation" "generate_peer_keys"
+check_pattern "Batched peer provisioning" "_provision_peers_on_server"
+check_pattern "Peer reconciliation diff" "_compute_peer_diff"
+check_pattern "Reconcile dry-run endpoint" "/api/peers/reconcile"
+check_pattern "PSK-less peers never pruned" "unmanaged"
+check_pattern "Background peer reconciler" "ADMIN_PEER_RECONCILE_SEC"
+check_pattern "Shared awg1 peer editor" "build_apply_cmd"
+if grep -q "awg1.conf.lock" "$PROJECT_ROOT/backend/core/awg_apply.py" 2>/dev/null; then
+    pass "awg1.conf edit lock"
+else
+    fail "awg1.conf edit lock (backend/core/awg_apply.py)"
+fi
+check_pattern "Bulk peer removal" "_remove_peers_from_server"
+check_pattern "Peer metrics collector" "_start_peer_metrics_collector"
+check_pattern "Peer metrics interval env" "ADMIN_PEER_METRICS_INTERVAL_SEC"
+check_pattern "Shared SSE producer" "class _SSEHub"
+check_pattern "SSE Last-Event-ID resume" "Last-Event-ID"
+check_pattern "Monitor push listener" "SnapshotListener\(\"admin\""
+check_pattern "Metrics history store"      "class MetricsHistory"
+check_pattern "GET  /api/monitoring/history" "/api/monitoring/history"
+check_pattern "Persisted monitoring events" "_load_events_history"
 check_pattern "QR generation"              "_generate_qr_base64"
 check_pattern "peers.json sync"            "sync_peers_to_json"
 check_pattern "peers.json import"          "_import_peers_from_json"
@@ -145,6 +168,8 @@ check_pattern "Default settings loader"    "_load_default_settings"
 check_pattern "Audit logging function"     "def audit"
 check_pattern "SSH exec helper"            "def ssh_exec"
 check_pattern "SSH upload helper"          "def ssh_upload"
+check_pattern "SSH connection pool"        "class _SSHPool"
+check_pattern "SSH channel limit env"      "ADMIN_SSH_MAX_CHANNELS"
 check_pattern "WebSocket monitor"          "_monitor_loop"
 check_pattern "Monitor autostart path"     "MONITOR_SCRIPT_PATH"
 check_pattern "Monitor running check"      "_is_monitor_running"
@@ -153,7 +178,14 @@ check_pattern "Monitor running API field"  "_monitor_running"
 check_pattern "Auth decorator"             "def auth_required"
 check_pattern "Local bypass decorator"     "def auth_required_or_local"
 check_pattern "Monitoring peer_ip field"   "peer_ip"
-check_pattern "AllowedIPs IP extraction"   "_extract_peer_ip"
+check_pattern "AllowedIPs IP extraction"   "backend.core.wg_dump import"
+check_pattern "Config catalog (indexed .conf scan)" "_config_catalog.by_ip"
+check_pattern "Server profile cache (TTL + refresh)" "/api/server-profile/refresh"
+check_pattern "IP pool allocator (bitmap, BEGIN IMMEDIATE)" "_ip_pools_locked"
+check_pattern "Config/QR artifact cache (ETag)" "_artifact_not_modified"
+check_pattern "Artifact cache evicted on peer delete" "_artifacts.evict_owner"
+check_pattern "GET  /api/peers/<id>/share-url" "/share-url"
+check_pattern "GET  /api/peers/export (streamed ZIP)" "/api/peers/export"
 check_pattern "Peer online threshold env"   "ADMIN_PEER_ONLINE_HANDSHAKE_SEC"
 check_pattern "Peers response threshold"    "connection_threshold_sec"
 check_pattern "Pagination (audit)"         "per_page"
@@ -31,10 +31,13 @@ elif [[ -f "${BACKEND_DIR}/.venv/bin/python" ]] && "${BACKEND_DIR}/.venv/bin/pyt
 fi
 
 "$RUN_PYTHON" - <<'PY'
+import io
 import os
 from datetime import datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
+import shutil
+import zipfile
 
 from fastapi.testclient import TestClient
 
@@ -43,11 +46,9 @@ db_path = project_root / "vpn-output" / "admin-v1-test.sqlite3"
 output_dir = project_root / "vpn-output" / "test-artifacts-admin-v1"
 if db_path.exists():
     db_path.unlink()
-if output_dir.exists():
-    for conf in output_dir.glob("*"):
-        conf.unlink(missing_ok=True)
-else:
-    output_dir.mkdir(parents=True, exist_ok=True)
+# The artifact cache keeps rendered configs in a subdirectory of VPN_OUTPUT_DIR.
+shutil.rmtree(output_dir, ignore_errors=True)
+output_dir.mkdir(parents=True, exist_ok=True)
 
 os.environ["DATABASE_URL"] = f"sqlite+pysqlite:///{db_path.as_posix()}"
 os.environ["APP_ENV"] = "development"
@@ -178,12 +179,27 @@ assert peer_create.json().get("public_key"), "peer public key should be generate
 peer_list = client.get("/api/v1/admin/peers")
 assert peer_list.status_code == 200, peer_list.text
 assert any(item.get("id") == peer_id for item in peer_list.json())
+assert all("connection_status" in item and "handshake_age_sec" in item for item in peer_list.json())
+
+peer_page = client.get("/api/v1/admin/peers", params={"limit": 1, "fields": "name,ip"})
+assert peer_page.status_code == 200, peer_page.text
+assert len(peer_page.json()) == 1 and set(peer_page.json()[0]) == {"id", "name", "ip"}, peer_page.text
 
 peer_cfg = client.get(f"/api/v1/admin/peers/{peer_id}/config")
 assert peer_cfg.status_code == 200, peer_cfg.text
 assert "Address =" in peer_cfg.text
 assert "PrivateKey =" in peer_cfg.text
 assert "TODO_SERVER_" not in peer_cfg.text
+assert peer_cfg.headers.get("etag"), peer_cfg.headers
+peer_cfg_cached = client.get(f"/api/v1/admin/peers/{peer_id}/config", headers={"If-None-Match": peer_cfg.headers["etag"]})
+assert peer_cfg_cached.status_code == 304, peer_cfg_cached.status_code
+
+peer_export = client.get("/api/v1/admin/peers/export", params={"ids": str(peer_id), "include": "conf,amnezia"})
+assert peer_export.status_code == 200, peer_export.text
+assert peer_export.headers.get("content-type") == "application/zip", peer_export.headers
+with zipfile.ZipFile(io.BytesIO(peer_export.content)) as export_zip:
+    export_names = export_zip.namelist()
+assert any(n.startswith("configs/") for n in export_names) and any(n.startswith("amnezia/") for n in export_names), export_names
 
 mon_data = client.get("/api/v1/admin/monitoring/data")
 assert mon_data.status_code == 200, mon_data.text
@@ -208,9 +224,7 @@ assert logout.status_code == 200, logout.text
 post_logout = client.get("/api/v1/admin/auth/me")
 assert post_logout.status_code == 401, post_logout.text
 
-for conf in output_dir.glob("*"):
-    conf.unlink(missing_ok=True)
-output_dir.rmdir()
+shutil.rmtree(output_dir, ignore_errors=True)
 
 print("OK: Stage 3 admin API happy path passed")
 PY
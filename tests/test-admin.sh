@@ -209,7 +209,7 @@ check_py "Default settings"           "_load_default_settings"
 check_py "WebSocket monitor"          "_monitor_loop"
 check_py "MTU by device type"         "MTU_BY_TYPE"
 check_py "Monitoring peer_ip field"   "peer_ip"
-check_py "AllowedIPs IP extraction"   "_extract_peer_ip"
+check_py "AllowedIPs IP extraction"   "backend.core.wg_dump import"
 
 # ── 8. Deploy script structure ────────────────────────────────────────────────
 
@@ -284,6 +284,7 @@ check_html_api "Cookie session (credentials include)" "credentials: 'include'"
 check_html_api "Peer speed tooltip" "peer-speed-tooltip"
 check_html_api "Peers speed column" ">Speed<"
 check_html_api "Peers mobile card renderer" "peer-card"
+check_html_api "SSE delta stream" "monitoring_delta"
 
 # ── Summary ──────────────────────────────────────────────────────────────────
 
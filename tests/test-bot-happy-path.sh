@@ -73,7 +73,7 @@ with get_session() as session:
     session.flush()
     session.add(PlanOffer(plan_id=plan.id, duration_days=30, price=Decimal("199.00"), currency="RUB"))
 
-from backend.bot.main import app
+from backend.bot.main import app, update_pipeline
 
 client = TestClient(app)
 
@@ -93,6 +93,7 @@ resp = client.post(
     headers={"X-Telegram-Bot-Api-Secret-Token": "tg-secret"},
 )
 assert resp.status_code == 200, resp.text
+assert update_pipeline.join(timeout=10), update_pipeline.stats()
 
 tariff_payload = {
     "update_id": 2,
@@ -104,6 +105,7 @@ resp = client.post(
     headers={"X-Telegram-Bot-Api-Secret-Token": "tg-secret"},
 )
 assert resp.status_code == 200, resp.text
+assert update_pipeline.join(timeout=10), update_pipeline.stats()
 
 buy_payload = {
     "update_id": 3,
@@ -115,6 +117,7 @@ resp = client.post(
     headers={"X-Telegram-Bot-Api-Secret-Token": "tg-secret"},
 )
 assert resp.status_code == 200, resp.text
+assert update_pipeline.join(timeout=10), update_pipeline.stats()
 
 with get_session() as session:
     tx = session.scalar(select(Transaction).order_by(Transaction.id.desc()))
@@ -130,6 +133,10 @@ assert overview_resp.status_code == 200, overview_resp.text
 overview = overview_resp.json()
 assert overview["stats"]["telegram_users_total"] >= 1
 
+metrics_resp = client.get("/admin/bot/metrics?token=internal-token")
+assert metrics_resp.status_code == 200, metrics_resp.text
+assert metrics_resp.json()["updates"]["processed"] >= 3, metrics_resp.text
+
 activity_resp = client.get("/admin/bot/activity?token=internal-token&limit=20")
 assert activity_resp.status_code == 200, activity_resp.text
 assert isinstance(activity_resp.json().get("items"), list)
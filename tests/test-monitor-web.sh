@@ -55,6 +55,24 @@ else
     fail "scripts/monitor/monitor-web.sh: ssh_bin не определяется динамически"
 fi
 
+# Снимок пушится в Unix-сокеты слушателей (admin/backend), data.json остаётся чекпойнтом
+if grep -q "VPN_MONITOR_PUSH_DIR" scripts/monitor/monitor-web.sh && \
+   grep -q "hasattr(socket, 'AF_UNIX')" scripts/monitor/monitor-web.sh; then
+    ok "scripts/monitor/monitor-web.sh: push снимков через Unix-сокет (с fallback на data.json)"
+else
+    fail "scripts/monitor/monitor-web.sh: нет push снимков через Unix-сокет"
+fi
+
+# Основной цикл — Python-коллектор (постоянный SSH, один remote-скрипт), bash-цикл как fallback
+if [[ -f scripts/monitor/monitor_collector.py ]] && \
+   grep -q "monitor_collector.py" scripts/monitor/monitor-web.sh && \
+   grep -q "class MonitorCollector" scripts/monitor/monitor_collector.py && \
+   grep -q "REMOTE_SCRIPT" scripts/monitor/monitor_collector.py; then
+    ok "scripts/monitor/monitor-web.sh: сбор через monitor_collector.py (bash-цикл как fallback)"
+else
+    fail "scripts/monitor/monitor-web.sh: нет Python-коллектора monitor_collector.py"
+fi
+
 # Нет прямого вызова ssh.exe (только через переменную ssh_bin)
 if grep -qE 'timeout.*ssh\.exe' scripts/monitor/monitor-web.sh; then
     fail "scripts/monitor/monitor-web.sh: прямой вызов ssh.exe найден (должен использоваться \$ssh_bin)"
@@ -700,6 +718,111 @@ else
     fail "scripts/tools/diagnose.sh: нет rollback для legacy DNS при ошибке AdGuard"
 fi
 
+# ---------------------------------------------------------------------------
+# 13. monitor_collector.py: разбор "awg show all dump" (строки интерфейсов)
+# ---------------------------------------------------------------------------
+echo ""
+echo "--- 13. monitor_collector.py: awg show all dump ---"
+
+PY_BIN=""
+for cmd in python3 python; do
+    if command -v "$cmd" &>/dev/null; then
+        PY_BIN="$cmd"
+        break
+    fi
+done
+
+if [[ -z "$PY_BIN" ]]; then
+    fail "monitor_collector.py: python не найден, разбор awg dump не проверен"
+else
+    FAKE_BIN="$(mktemp -d)"
+    # Реальный вывод AmneziaWG: строка интерфейса (14 колонок) перед строками пиров.
+    cat > "$FAKE_BIN/awg" <<'AWG'
+#!/usr/bin/env bash
+now=$(date +%s)
+printf 'awg0\tkPRIVATEawg0xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx=\tPUBawg0yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy=\t51821\toff\t4\t40\t70\t0\t0\t1783627812\t1029384756\t1122334455\t998877665\n'
+printf 'awg0\tVPS2pub/zzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz=\tPSKawg0+qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq=\t203.0.113.2:51821\t0.0.0.0/0\t%s\t1000\t2000\t25\n' "$((now - 30))"
+printf 'awg1\tkPRIVATEawg1xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx=\tPUBawg1yyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyyy=\t51820\toff\t5\t50\t1000\t15\t20\t1318212312\t1736571622\t1521436842\t1246135433\n'
+printf 'awg1\tPEERone/aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa=\t(none)\t198.51.100.7:40000\t10.9.0.2/32\t%s\t500\t600\toff\n' "$((now - 10))"
+printf 'awg1\tPEERtwo+bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb=\t(none)\t(none)\t10.9.0.3/32\t0\t0\t0\toff\n'
+AWG
+    printf '#!/usr/bin/env bash\n[[ "$1" == "-n" ]] && shift\nexec "$@"\n' > "$FAKE_BIN/sudo"
+    printf '#!/usr/bin/env bash\nfor u in "$@"; do echo active; done\n' > "$FAKE_BIN/systemctl"
+    chmod +x "$FAKE_BIN/awg" "$FAKE_BIN/sudo" "$FAKE_BIN/systemctl"
+
+    if PATH="$FAKE_BIN:$PATH" "$PY_BIN" - <<'PY'
+import ast
+import json
+import subprocess
+import sys
+
+tree = ast.parse(open("scripts/monitor/monitor_collector.py", encoding="utf-8").read())
+remote = next(
+    node.value.value
+    for node in tree.body
+    if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", "") == "REMOTE_SCRIPT"
+)
+out = subprocess.run(
+    [sys.executable, "-", "vps1", "full", ""],
+    input=remote,
+    capture_output=True,
+    text=True,
+    check=True,
+)
+data = json.loads(out.stdout)
+assert data["peers_awg0"] == 1, data["peers_awg0"]
+assert data["peers_awg1"] == 2, data["peers_awg1"]
+assert 0 <= data["hs0_age"] <= 60, data["hs0_age"]
+assert 0 <= data["hs1_age"] <= 60, data["hs1_age"]
+assert data["active_peers_awg1"] == 1, data["active_peers_awg1"]
+PY
+    then
+        ok "monitor_collector.py: строки интерфейсов не считаются пирами, hs*_age по первому пиру"
+    else
+        fail "monitor_collector.py: неверный разбор awg show all dump (peers_awg*/hs*_age)"
+    fi
+    rm -rf "$FAKE_BIN"
+fi
+
+# ---------------------------------------------------------------------------
+# 14. monitor_push: снапшот больше буфера сокета по умолчанию (~212 KB)
+# ---------------------------------------------------------------------------
+echo ""
+echo "--- 14. monitor_push: большой снапшот одной датаграммой ---"
+
+if [[ -z "$PY_BIN" ]]; then
+    fail "monitor_push: python не найден, push большого снапшота не проверен"
+elif "$PY_BIN" -c 'import socket, sys; sys.exit(0 if hasattr(socket, "AF_UNIX") else 1)'; then
+    PUSH_TMP="$(mktemp -d)"
+    if PYTHONPATH=. PUSH_TMP="$PUSH_TMP" "$PY_BIN" - <<'PY'
+import os
+import time
+from pathlib import Path
+
+import backend.core.monitor_push as monitor_push
+
+push_dir = Path(os.environ["PUSH_TMP"])
+listener = monitor_push.SnapshotListener("test", push_dir=push_dir)
+assert listener.start()
+monitor_push._local_listeners.remove(listener)  # only the socket path is under test
+snapshot = {"peers": [{"public_key": "k%05d" % i, "rx_bytes": i} for i in range(20000)]}
+assert monitor_push.publish_snapshot(snapshot, push_dir=push_dir) == 1
+deadline = time.time() + 5
+while listener.latest is None and time.time() < deadline:
+    time.sleep(0.05)
+assert listener.latest is not None and len(listener.latest.data["peers"]) == 20000
+listener.close()
+PY
+    then
+        ok "monitor_push: снапшот > SO_SNDBUF по умолчанию доставлен одной датаграммой"
+    else
+        fail "monitor_push: большой снапшот не доставлен через сокет"
+    fi
+    rm -rf "$PUSH_TMP"
+else
+    ok "monitor_push: AF_UNIX недоступен, проверка пропущена"
+fi
+
 # ---------------------------------------------------------------------------
 # Итог
 # ---------------------------------------------------------------------------
@@ -114,6 +114,13 @@ for file in \
     fi
 done
 
+# Backend wg dump collector (asyncssh): accept-new over known_hosts, never disabled.
+FILE="$PROJECT_DIR/backend/services/peer_monitor_service.py"
+if [[ -f "$FILE" ]]; then
+    check "peer_monitor_service.py checks known_hosts" grep -q "read_known_hosts" "$FILE"
+    check_not "peer_monitor_service.py does not disable known_hosts" grep -q '"known_hosts": None' "$FILE"
+fi
+
 echo ""
 
 # ── 3. No hardcoded admin123 default ─────────────────────────────────────────
@@ -20,6 +20,110 @@ else
   grep -nE "notification_events|broadcast_campaigns|worker_job_runs|worker_dead_letters" alembic/versions/007_stage5_workers_notifications.py > /dev/null
 fi
 
+echo "[stage5] checking traffic accounting"
+test -f backend/services/traffic_accounting_service.py
+grep -nE "on_conflict_do_update" backend/services/traffic_accounting_service.py > /dev/null
+grep -nE "peer_traffic_usage" alembic/versions/009_peer_traffic_usage.py > /dev/null
+grep -nE "account_traffic" backend/workers/scheduler.py > /dev/null
+grep -nE "updated_at > table.c.updated_at" backend/services/traffic_accounting_service.py > /dev/null
+grep -nE "MONITOR_PEERS_ACCOUNTING: bool = False" backend/core/config.py > /dev/null
+grep -nE "over_limit_public_keys" backend/services/peer_monitor_service.py > /dev/null
+echo "[stage5] checking peer IP pools"
+grep -nE "with_for_update" backend/services/ip_pool_service.py > /dev/null
+grep -nE "address_prefix\(_ip_pools.cidrs" backend/api/routes/v1/peers_monitoring.py > /dev/null
+grep -nE "ip_pools" alembic/versions/011_ip_pools.py > /dev/null
+echo "[stage5] checking concurrent notification delivery"
+grep -nE "WORKER_DELIVERY_CONCURRENCY" backend/services/notifications_service.py > /dev/null
+grep -nE "write_audit_events|_apply_campaign_stats" backend/services/notifications_service.py > /dev/null
+grep -nE "ix_notification_events_user_outstanding" alembic/versions/012_notification_events_user_queue_index.py > /dev/null
+grep -nE "skip_locked=True" backend/services/notifications_service.py > /dev/null
+grep -nE "locked_until" alembic/versions/013_notification_events_lease.py > /dev/null
+grep -nE "fan_out_broadcasts" backend/workers/scheduler.py > /dev/null
+
+echo "[stage5] running bulk notification enqueue (dedupe, chunking)"
+RUN_PYTHON=""
+for cmd in python3 python py; do
+  if command -v "$cmd" >/dev/null 2>&1; then
+    RUN_PYTHON="$cmd"
+    break
+  fi
+done
+if [[ -f backend/.venv/Scripts/python.exe ]] && backend/.venv/Scripts/python.exe --version >/dev/null 2>&1; then
+  RUN_PYTHON="backend/.venv/Scripts/python.exe"
+elif [[ -f backend/.venv/bin/python ]] && backend/.venv/bin/python --version >/dev/null 2>&1; then
+  RUN_PYTHON="backend/.venv/bin/python"
+fi
+if [[ -z "$RUN_PYTHON" ]]; then
+  echo "Python not found"
+  exit 1
+fi
+
+"$RUN_PYTHON" - <<'PY'
+import os
+from pathlib import Path
+import tempfile
+
+db_dir = Path(tempfile.mkdtemp())
+os.environ["DATABASE_URL"] = f"sqlite+pysqlite:///{(db_dir / 'stage5-enqueue.sqlite3').as_posix()}"
+os.environ["APP_ENV"] = "development"
+
+from backend.core.config import get_settings
+import backend.db.session as db_session_module
+
+get_settings.cache_clear()
+db_session_module.engine = None
+db_session_module.SessionLocal = None
+
+from sqlalchemy import event, func, select
+
+from backend.db.session import Base, get_engine, get_session
+from backend.models import NotificationEvent, User
+import backend.services.notifications_service as notifications_module
+from backend.services.notifications_service import NotificationItem, NotificationsService
+
+Base.metadata.create_all(bind=get_engine())
+with get_session() as session:
+    users = [User(username=f"stage5-{i}", password_hash="x") for i in range(30)]
+    session.add_all(users)
+    session.flush()
+    user_ids = [user.id for user in users]
+
+statements: list[str] = []
+event.listen(get_engine(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+# Small chunks so one call spans several INSERT statements.
+notifications_module.ENQUEUE_CHUNK_SIZE = 8
+service = NotificationsService(gateway=None)
+items = [NotificationItem(user_id, "subscription_expiring_3d", "soon", f"exp3d:{user_id}") for user_id in user_ids]
+# A repeated dedupe_key inside the batch keeps the first item.
+items.append(NotificationItem(user_ids[0], "subscription_expiring_3d", "duplicate", f"exp3d:{user_ids[0]}"))
+
+with get_session() as session:
+    created = service.enqueue_notifications(session, items)
+assert created == 30, created
+inserts = [sql for sql in statements if sql.lstrip().upper().startswith("INSERT INTO NOTIFICATION_EVENTS")]
+assert len(inserts) == 4, len(inserts)
+
+# Re-running the job creates nothing; new keys are still queued.
+with get_session() as session:
+    created_again = service.enqueue_notifications(
+        session,
+        items[:10] + [NotificationItem(user_ids[0], "subscription_expired", "gone", f"expired:{user_ids[0]}")],
+    )
+assert created_again == 1, created_again
+with get_session() as session:
+    assert service.enqueue_notifications(session, []) == 0
+
+with get_session() as session:
+    total = session.scalar(select(func.count(NotificationEvent.id)))
+    texts = session.scalars(
+        select(NotificationEvent.payload).where(NotificationEvent.dedupe_key == f"exp3d:{user_ids[0]}")
+    ).all()
+assert total == 31, total
+assert len(texts) == 1 and '"soon"' in texts[0], texts
+print("bulk enqueue ok: 30 + 1 events, duplicates skipped")
+PY
+
 echo "[stage5] checking admin API endpoints"
 if command -v rg >/dev/null 2>&1; then
   rg -n "/broadcasts|/workers/runs|/workers/dlq" backend/api/routes/v1/admin.py > /dev/null